@@ -0,0 +1,82 @@
+# -*- coding:utf-8 -*-
+##############################################################
+# Created Date: Saturday, October 17th 2026
+# Contact Info: luoxiangyong01@gmail.com
+# Author/Copyright: Mr. Xiangyong Luo
+##############################################################
+
+"""Speed benchmark: agent generation for 1M agents.
+
+Builds 1,000 zones with 20 nodes each and an OD table whose volumes sum to ~1M.
+The previous implementation (one row lookup, one random.choice and one Agent
+object per agent) is timed on a sample of agents and extrapolated.
+
+    python benchmarks/bench_agent_demand.py
+"""
+
+from __future__ import absolute_import
+from pathlib import Path
+from random import choice, randint
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+try:
+    from grid2demand.func_lib.gen_agent_demand import gen_agent_based_demand
+    from grid2demand.utils_lib.net_utils import Node, Zone
+except ImportError:
+    root_path = Path(os.path.abspath(__file__)).parent.parent
+    os.chdir(root_path)
+    import sys
+    sys.path.append(str(root_path))
+    from grid2demand.func_lib.gen_agent_demand import gen_agent_based_demand
+    from grid2demand.utils_lib.net_utils import Node, Zone
+
+
+def gen_agents_row_by_row(node_dict: dict, zone_dict: dict, df_demand: pd.DataFrame, num_agent: int) -> list:
+    """The previous implementation: one python object per agent"""
+    agent_lst = []
+    for i in range(num_agent):
+        o_zone = zone_dict[df_demand.loc[i, "o_zone_name"]]
+        d_zone = zone_dict[df_demand.loc[i, "d_zone_name"]]
+        o_node = node_dict[choice(o_zone.node_id_list)]
+        d_node = node_dict[choice(d_zone.node_id_list)]
+        rand_time = randint(1, 60)
+        agent_lst.append({"id": i + 1, "o_node_id": o_node.id, "d_node_id": d_node.id,
+                          "geometry": f"LINESTRING({o_node.x_coord} {o_node.y_coord},"
+                                      f"{d_node.x_coord} {d_node.y_coord})",
+                          "departure_time": f"07{rand_time:02d}" if rand_time < 60 else "0800"})
+    return agent_lst
+
+
+if __name__ == "__main__":
+
+    num_zone, num_node_per_zone, num_sample = 1_000, 20, 20_000
+
+    rng = np.random.default_rng(0)
+    node_dict = {i: Node(id=i, x_coord=x, y_coord=y) for i, (x, y) in
+                 enumerate(zip(rng.uniform(-112, -111, num_zone * num_node_per_zone),
+                               rng.uniform(33, 34, num_zone * num_node_per_zone)))}
+    zone_dict = {f"Z{i}": Zone(id=i, name=f"Z{i}",
+                               node_id_list=list(range(i * num_node_per_zone, (i + 1) * num_node_per_zone)))
+                 for i in range(num_zone)}
+
+    o_id, d_id = np.divmod(np.arange(num_zone * num_zone), num_zone)
+    df_demand = pd.DataFrame({"o_zone_id": o_id, "d_zone_id": d_id,
+                              "o_zone_name": [f"Z{i}" for i in o_id], "d_zone_name": [f"Z{i}" for i in d_id],
+                              "volume": rng.exponential(1_000_000 / num_zone ** 2, num_zone * num_zone)})
+
+    time_start = time.time()
+    df_agent = gen_agent_based_demand(node_dict, zone_dict, df_demand=df_demand, seed=0)
+    time_vectorized = time.time() - time_start
+
+    time_start = time.time()
+    gen_agents_row_by_row(node_dict, zone_dict, df_demand, num_sample)
+    time_row = (time.time() - time_start) / num_sample * len(df_agent)
+
+    print(f"{num_zone} zones x {num_node_per_zone} nodes, {len(df_agent)} agents")
+    print(f"  row by row (extrapolated from {num_sample} agents): {time_row:10.2f}s")
+    print(f"  vectorized                                   : {time_vectorized:10.2f}s")
+    print(f"  speedup: {time_row / time_vectorized:.0f}x")
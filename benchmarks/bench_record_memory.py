@@ -0,0 +1,109 @@
+# -*- coding:utf-8 -*-
+##############################################################
+# Created Date: Saturday, October 17th 2026
+# Contact Info: luoxiangyong01@gmail.com
+# Author/Copyright: Mr. Xiangyong Luo
+##############################################################
+
+"""Memory benchmark: one generated class per record vs. one cached slotted class per schema.
+
+Builds node records from the Chicago node.csv files the way read_node does
+(one dict per node, then create_dataclass_from_dict) and reports traced memory,
+number of generated classes and pickled size for both approaches.
+
+    python benchmarks/bench_record_memory.py
+"""
+
+from __future__ import absolute_import
+from dataclasses import field, make_dataclass, asdict
+from pathlib import Path
+import os
+import pickle
+import time
+import tracemalloc
+
+import pandas as pd
+import shapely
+
+try:
+    from grid2demand.utils_lib.utils import create_dataclass_from_dict, get_record_class
+except ImportError:
+    root_path = Path(os.path.abspath(__file__)).parent.parent
+    os.chdir(root_path)
+    import sys
+    sys.path.append(str(root_path))
+    from grid2demand.utils_lib.utils import create_dataclass_from_dict, get_record_class
+
+
+def create_dataclass_from_dict_per_record(name: str, data: dict):
+    """The previous implementation: make_dataclass is called for every record"""
+
+    def __getitem__(self, key):
+        return getattr(self, key)
+
+    def __setitem__(self, key, value):
+        setattr(self, key, value)
+
+    def as_dict(self):
+        return asdict(self)
+
+    dataclass_fields = []
+    for key, value in data.items():
+        if isinstance(value, (list, dict, set)):
+            dataclass_fields.append((key, type(value), field(default_factory=lambda v=value: v)))
+        else:
+            dataclass_fields.append((key, type(value), field(default=value)))
+
+    DataClass = make_dataclass(cls_name=name, fields=dataclass_fields, bases=(),
+                               namespace={'__getitem__': __getitem__,
+                                          '__setitem__': __setitem__,
+                                          'as_dict': as_dict})
+    return DataClass(**data)
+
+
+def load_node_rows(node_file: str) -> list[dict]:
+    df_node = pd.read_csv(node_file, usecols=["node_id", "x_coord", "y_coord", "activity_type", "zone_id"])
+    return [{"id": int(row.node_id), "x_coord": row.x_coord, "y_coord": row.y_coord,
+             "production": 0, "attraction": 0, "zone_id": row.zone_id,
+             "geometry": shapely.Point(row.x_coord, row.y_coord), "_zone_id": -1,
+             "activity_type": row.activity_type}
+            for row in df_node.itertuples(index=False)]
+
+
+def measure(func, rows: list[dict]) -> dict:
+    tracemalloc.start()
+    time_start = time.time()
+    records = {row["id"]: func("Node", row) for row in rows}
+    time_used = time.time() - time_start
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    # records of per-record classes can not be found by pickle, so they can not be sent to Pool workers
+    try:
+        pickle_mb = f"{len(pickle.dumps(records)) / 1024 ** 2:6.2f} MB"
+    except Exception:
+        pickle_mb = "  n/a    "
+
+    return {"records": len(records),
+            "classes": len({type(rec) for rec in records.values()}),
+            "memory_mb": current / 1024 ** 2,
+            "peak_mb": peak / 1024 ** 2,
+            "pickle_mb": pickle_mb,
+            "seconds": time_used}
+
+
+if __name__ == "__main__":
+
+    node_files = ["datasets/Chicago_13K_nodes/node.csv",
+                  "datasets/Chicago_30K_nodes/auto/node.csv"]
+
+    for node_file in node_files:
+        rows = load_node_rows(node_file)
+        get_record_class.cache_clear()
+
+        print(f"{node_file}: {len(rows)} nodes")
+        for label, func in [("class per record", create_dataclass_from_dict_per_record),
+                            ("class per schema", create_dataclass_from_dict)]:
+            res = measure(func, rows)
+            print(f"  {label:>16}: {res['classes']:>6} classes, memory {res['memory_mb']:8.2f} MB, "
+                  f"peak {res['peak_mb']:8.2f} MB, pickle {res['pickle_mb']}, {res['seconds']:6.2f}s")
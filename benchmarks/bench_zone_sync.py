@@ -0,0 +1,74 @@
+# -*- coding:utf-8 -*-
+##############################################################
+# Created Date: Saturday, October 17th 2026
+# Contact Info: luoxiangyong01@gmail.com
+# Author/Copyright: Mr. Xiangyong Luo
+##############################################################
+
+"""Speed benchmark: point-in-polygon sync by linear zone scan vs. one STRtree bulk query.
+
+Builds a 100 x 100 grid of square zones (10K zones) and 1M random points.
+The linear scan (the previous sync implementation: shapely.within against every zone
+until a match) is timed on a sample of points and extrapolated to all points.
+
+    python benchmarks/bench_zone_sync.py
+"""
+
+from __future__ import absolute_import
+from pathlib import Path
+import os
+import time
+
+import numpy as np
+import shapely
+
+try:
+    from grid2demand.func_lib.gen_zone import _query_points_within_zones
+except ImportError:
+    root_path = Path(os.path.abspath(__file__)).parent.parent
+    os.chdir(root_path)
+    import sys
+    sys.path.append(str(root_path))
+    from grid2demand.func_lib.gen_zone import _query_points_within_zones
+
+
+def gen_grid_zones(num_x_blocks: int, num_y_blocks: int) -> list:
+    x_min, y_min = np.meshgrid(np.arange(num_x_blocks, dtype=float), np.arange(num_y_blocks, dtype=float))
+    return list(shapely.box(x_min.ravel(), y_min.ravel(), x_min.ravel() + 1, y_min.ravel() + 1))
+
+
+def query_points_linear_scan(zone_geometry: list, x_coord: np.ndarray, y_coord: np.ndarray) -> np.ndarray:
+    """The previous implementation: check every zone for every point"""
+    zone_pos = np.full(len(x_coord), -1, dtype=np.int64)
+    for i, (x, y) in enumerate(zip(x_coord, y_coord)):
+        point = shapely.Point(x, y)
+        for j, zone in enumerate(zone_geometry):
+            if shapely.within(point, zone):
+                zone_pos[i] = j
+                break
+    return zone_pos
+
+
+if __name__ == "__main__":
+
+    num_blocks, num_points, num_sample = 100, 1_000_000, 200
+
+    rng = np.random.default_rng(0)
+    zone_geometry = gen_grid_zones(num_blocks, num_blocks)
+    x_coord = rng.uniform(0, num_blocks, num_points)
+    y_coord = rng.uniform(0, num_blocks, num_points)
+
+    time_start = time.time()
+    zone_pos = _query_points_within_zones(zone_geometry, x_coord, y_coord)
+    time_tree = time.time() - time_start
+
+    time_start = time.time()
+    zone_pos_linear = query_points_linear_scan(zone_geometry, x_coord[:num_sample], y_coord[:num_sample])
+    time_linear = (time.time() - time_start) / num_sample * num_points
+
+    assert (zone_pos[:num_sample] == zone_pos_linear).all()
+
+    print(f"{len(zone_geometry)} zones x {num_points} points")
+    print(f"  linear scan (extrapolated from {num_sample} points): {time_linear:10.2f}s")
+    print(f"  STRtree bulk query                      : {time_tree:10.2f}s")
+    print(f"  speedup: {time_linear / time_tree:.0f}x")
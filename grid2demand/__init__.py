@@ -14,18 +14,31 @@ from .func_lib.read_node_poi import (read_node,
                                      read_poi,
                                      read_network,
                                      read_zone_by_geometry,
-                                     read_zone_by_centroid)
+                                     read_zone_by_centroid,
+                                     read_link)
 from .func_lib.trip_rate_production_attraction import (gen_poi_trip_rate,
                                                        gen_node_prod_attr)
 from .func_lib.gen_zone import (net2zone,
                                 sync_zone_geometry_and_node,
                                 sync_zone_geometry_and_poi,
+                                sync_zone_lattice_and_node,
+                                sync_zone_lattice_and_poi,
                                 sync_zone_centroid_and_node,
                                 sync_zone_centroid_and_poi,
                                 calc_zone_od_matrix)
 from .func_lib.gravity_model import (run_gravity_model,
-                                     calc_zone_production_attraction)
-from .func_lib.gen_agent_demand import gen_agent_based_demand
+                                     run_gravity_model_multi_purpose,
+                                     run_gravity_sweep,
+                                     calc_zone_production_attraction,
+                                     calc_zone_production_attraction_matrix)
+from .func_lib.gravity_calibration import (calibrate_gravity_model,
+                                           calc_trip_length_distribution)
+from .func_lib.network_impedance import calc_zone_od_network_matrix
+from .func_lib.departure_time import read_departure_profile
+from .func_lib.gen_agent_demand import (gen_agent_based_demand,
+                                        iter_agent_batches,
+                                        save_agent_batches,
+                                        save_agent_shards)
 from .utils_lib.pkg_settings import pkg_settings
 from ._grid2demand import GRID2DEMAND
 
@@ -55,13 +68,17 @@ check_python_version()
 # print('grid2demand, version 0.4.8, supports Python 3.10 or higher')
 
 __all__ = ["read_node", "read_poi", "read_network",
-           "read_zone_by_geometry", "read_zone_by_centroid",
+           "read_zone_by_geometry", "read_zone_by_centroid", "read_link",
            "gen_poi_trip_rate", "gen_node_prod_attr",
            "net2zone",
            "sync_zone_geometry_and_node", "sync_zone_geometry_and_poi",
+           "sync_zone_lattice_and_node", "sync_zone_lattice_and_poi",
            "sync_zone_centroid_and_node", "sync_zone_centroid_and_poi",
-           "calc_zone_od_matrix",
-           "run_gravity_model", "calc_zone_production_attraction",
-           "gen_agent_based_demand",
+           "calc_zone_od_matrix", "calc_zone_od_network_matrix",
+           "run_gravity_model", "run_gravity_model_multi_purpose", "run_gravity_sweep",
+           "calc_zone_production_attraction", "calc_zone_production_attraction_matrix",
+           "calibrate_gravity_model", "calc_trip_length_distribution",
+           "gen_agent_based_demand", "iter_agent_batches", "save_agent_batches",
+           "save_agent_shards", "read_departure_profile",
            "pkg_settings",
            "GRID2DEMAND"]
@@ -10,6 +10,7 @@
 import os
 import contextlib
 
+import numpy as np
 import pandas as pd
 import shapely
 from pyufunc import (path2linux,
@@ -19,24 +20,41 @@ from pyufunc import (path2linux,
 from grid2demand.utils_lib.pkg_settings import pkg_settings
 from grid2demand.utils_lib.net_utils import (Node,
                                              POI,
-                                             Zone)
+                                             Zone,
+                                             ColumnTable,
+                                             ODMatrix,
+                                             SparseODMatrix,
+                                             gen_od_geometry)
 from grid2demand.utils_lib.utils import check_required_files_exist
 
 from grid2demand.func_lib.read_node_poi import (read_node,
                                                 read_poi,
                                                 read_zone_by_geometry,
-                                                read_zone_by_centroid)
+                                                read_zone_by_centroid,
+                                                read_link)
 from grid2demand.func_lib.gen_zone import (net2zone,
                                            sync_zone_geometry_and_node,
                                            sync_zone_geometry_and_poi,
+                                           sync_zone_lattice_and_node,
+                                           sync_zone_lattice_and_poi,
                                            sync_zone_centroid_and_node,
                                            sync_zone_centroid_and_poi,
                                            calc_zone_od_matrix)
 from grid2demand.func_lib.trip_rate_production_attraction import (gen_poi_trip_rate,
                                                                   gen_node_prod_attr)
 from grid2demand.func_lib.gravity_model import (run_gravity_model,
-                                                calc_zone_production_attraction)
-from grid2demand.func_lib.gen_agent_demand import gen_agent_based_demand
+                                                run_gravity_model_multi_purpose,
+                                                run_gravity_sweep,
+                                                calc_zone_production_attraction,
+                                                calc_zone_production_attraction_matrix)
+from grid2demand.func_lib.gravity_calibration import calibrate_gravity_model
+from grid2demand.func_lib.network_impedance import calc_zone_od_network_matrix
+from grid2demand.func_lib.departure_time import read_departure_profile
+from grid2demand.func_lib.gen_agent_demand import (gen_agent_based_demand,
+                                                   gen_agent_file_name,
+                                                   iter_agent_batches,
+                                                   save_agent_batches,
+                                                   save_agent_shards)
 
 
 class GRID2DEMAND:
@@ -97,6 +115,9 @@ class GRID2DEMAND:
         self.is_geometry = False
         self.is_centroid = False
 
+        # lattice of grid zones, only available for zones generated by net2zone
+        self.zone_lattice = None
+
         # set default poi_trip_rate, node_prod_attr, zone_prod_attr as False
         self.is_poi_trip_rate = False
         self.is_node_prod_attr = False
@@ -104,6 +125,10 @@ class GRID2DEMAND:
         self.is_zone_od_dist_matrix = False
         self.is_sync_geometry = False
 
+        # trip purpose of the demand and departure time profiles of agents, see load_departure_profile()
+        self.trip_purpose = 1
+        self.departure_profile = None
+
     def __check_input_dir(self) -> None:
         """check input directory
 
@@ -198,7 +223,9 @@ class GRID2DEMAND:
         if not os.path.exists(self.node_file):
             raise FileNotFoundError(f"Error: File {self.node_file} does not exist.")
 
-        self.node_dict = read_node(self.node_file, self.pkg_settings.get("set_cpu_cores"), verbose=self.verbose)
+        self.node_dict = read_node(self.node_file, self.pkg_settings.get("set_cpu_cores"), verbose=self.verbose,
+                                   columnar=self.pkg_settings.get("columnar_node", False),
+                                   use_cache=self.pkg_settings.get("use_data_cache", True))
 
         # generate node_zone_pair {node_id: zone_id} for later use
         # the zone_id based on node.csv in field zone_id
@@ -255,7 +282,9 @@ class GRID2DEMAND:
         if not os.path.exists(self.poi_file):
             raise FileExistsError(f"Error: File {self.poi_file} does not exist.")
 
-        self.poi_dict = read_poi(self.poi_file, self.pkg_settings.get("set_cpu_cores"), verbose=self.verbose)
+        self.poi_dict = read_poi(self.poi_file, self.pkg_settings.get("set_cpu_cores"), verbose=self.verbose,
+                                 save_area=self.pkg_settings.get("save_poi_area", False),
+                                 use_cache=self.pkg_settings.get("use_data_cache", True))
         return self.poi_dict
 
     def load_network(self,
@@ -368,13 +397,16 @@ class GRID2DEMAND:
         else:
             node_dict = self.node_dict
 
-        self.zone_dict_with_gate = net2zone(node_dict,
-                                            num_x_blocks,
-                                            num_y_blocks,
-                                            cell_width,
-                                            cell_height,
-                                            unit,
-                                            verbose=self.verbose)
+        zone_grid = net2zone(node_dict,
+                             num_x_blocks,
+                             num_y_blocks,
+                             cell_width,
+                             cell_height,
+                             unit,
+                             verbose=self.verbose,
+                             return_lattice=True)
+        self.zone_dict_with_gate = zone_grid["zone_dict"]
+        self.zone_lattice = zone_grid["lattice"]
         self.zone_dict = {
             zone_name: zone for zone_name, zone in self.zone_dict_with_gate.items() if "gate" not in zone.name}
         self.is_geometry = True
@@ -483,14 +515,19 @@ class GRID2DEMAND:
         if self.verbose:
             print("  : Generating zone dictionary...")
 
+        # TAZs are not a regular lattice
+        self.zone_lattice = None
+
         # generate zone by centroid: zone_id, x_coord, y_coord
         if self.is_centroid:
             self.zone_dict = read_zone_by_centroid(
-                self.zone_file, self.pkg_settings.get("set_cpu_cores"))
+                self.zone_file, self.pkg_settings.get("set_cpu_cores"),
+                use_cache=self.pkg_settings.get("use_data_cache", True))
 
         # generate zone by geometry: zone_id, geometry
         elif self.is_geometry:
-            self.zone_dict = read_zone_by_geometry(self.zone_file, self.pkg_settings.get("set_cpu_cores"))
+            self.zone_dict = read_zone_by_geometry(self.zone_file, self.pkg_settings.get("set_cpu_cores"),
+                                                   use_cache=self.pkg_settings.get("use_data_cache", True))
 
         else:
             print(f"Error: {self.zone_file} does not contain valid zone fields.")
@@ -523,9 +560,15 @@ class GRID2DEMAND:
         if self.verbose:
             print("  : Synchronizing geometry between zone and node/poi...")
 
+        sync_mode = self.pkg_settings.get("sync_mode", "copy_on_write")
+        if sync_mode not in ["copy_on_write", "inplace"]:
+            raise ValueError(f"Unsupported sync_mode: {sync_mode}, choose from ['copy_on_write', 'inplace']")
+
         # update zone_dict, node_dict, poi_dict if specified
         if zone_dict:
             self.zone_dict = zone_dict
+            # user specified zones may not follow the lattice from net2zone
+            self.zone_lattice = None
         if node_dict:
             self.node_dict = node_dict
         if poi_dict:
@@ -538,12 +581,25 @@ class GRID2DEMAND:
         # synchronize zone with node
         if hasattr(self, "node_dict"):
             print("  : Synchronizing zone with node...\n")
-            if self.is_geometry:
+            if self.is_geometry and self.zone_lattice is not None:
+                try:
+                    zone_node_dict = sync_zone_lattice_and_node(self.zone_dict,
+                                                                self.node_dict,
+                                                                self.zone_lattice,
+                                                                verbose=self.verbose,
+                                                                mode=sync_mode)
+                    self.zone_dict = zone_node_dict.get('zone_dict')
+                    self.node_dict = zone_node_dict.get('node_dict')
+                except Exception as e:
+                    print("Could not synchronize zone with node.\n")
+                    print(f"The error occurred: {e}")
+            elif self.is_geometry:
                 try:
                     zone_node_dict = sync_zone_geometry_and_node(self.zone_dict,
                                                                  self.node_dict,
                                                                  self.pkg_settings.get("set_cpu_cores"),
-                                                                 verbose=self.verbose)
+                                                                 verbose=self.verbose,
+                                                                 mode=sync_mode)
                     self.zone_dict = zone_node_dict.get('zone_dict')
                     self.node_dict = zone_node_dict.get('node_dict')
                 except Exception as e:
@@ -551,9 +607,12 @@ class GRID2DEMAND:
                     print(f"The error occurred: {e}")
             elif self.is_centroid:
                 try:
-                    zone_node_dict = sync_zone_centroid_and_node(self.zone_dict,
-                                                                 self.node_dict,
-                                                                 verbose=self.verbose)
+                    zone_node_dict = sync_zone_centroid_and_node(
+                        self.zone_dict,
+                        self.node_dict,
+                        verbose=self.verbose,
+                        max_distance_km=self.pkg_settings.get("zone_centroid_max_distance_km"),
+                        mode=sync_mode)
                     self.zone_dict = zone_node_dict.get('zone_dict')
                     self.node_dict = zone_node_dict.get('node_dict')
                 except Exception as e:
@@ -563,11 +622,24 @@ class GRID2DEMAND:
         # synchronize zone with poi
         if hasattr(self, "poi_dict"):
             print("  : Synchronizing zone with poi...\n")
-            if self.is_geometry:
+            if self.is_geometry and self.zone_lattice is not None:
+                try:
+                    zone_poi_dict = sync_zone_lattice_and_poi(self.zone_dict,
+                                                              self.poi_dict,
+                                                              self.zone_lattice,
+                                                              verbose=self.verbose,
+                                                              mode=sync_mode)
+                    self.zone_dict = zone_poi_dict.get('zone_dict')
+                    self.poi_dict = zone_poi_dict.get('poi_dict')
+                except Exception as e:
+                    print("Could not synchronize zone with poi.\n")
+                    print(f"The error occurred: {e}")
+            elif self.is_geometry:
                 try:
                     zone_poi_dict = sync_zone_geometry_and_poi(self.zone_dict,
                                                                self.poi_dict,
-                                                               self.pkg_settings.get("set_cpu_cores"))
+                                                               self.pkg_settings.get("set_cpu_cores"),
+                                                               mode=sync_mode)
                     self.zone_dict = zone_poi_dict.get('zone_dict')
                     self.poi_dict = zone_poi_dict.get('poi_dict')
                 except Exception as e:
@@ -575,9 +647,12 @@ class GRID2DEMAND:
                     print(f"The error occurred: {e}")
             elif self.is_centroid:
                 try:
-                    zone_poi_dict = sync_zone_centroid_and_poi(self.zone_dict,
-                                                               self.poi_dict,
-                                                               verbose=self.verbose)
+                    zone_poi_dict = sync_zone_centroid_and_poi(
+                        self.zone_dict,
+                        self.poi_dict,
+                        verbose=self.verbose,
+                        max_distance_km=self.pkg_settings.get("zone_centroid_max_distance_km"),
+                        mode=sync_mode)
                     self.zone_dict = zone_poi_dict.get('zone_dict')
                     self.poi_dict = zone_poi_dict.get('poi_dict')
                 except Exception as e:
@@ -589,26 +664,83 @@ class GRID2DEMAND:
                 "node_dict": self.node_dict,
                 "poi_dict": self.poi_dict} if return_value else None
 
-    def calc_zone_od_distance_matrix(self, zone_dict: dict = "", return_value: bool = False) -> dict[tuple, float]:
+    def calc_zone_od_distance_matrix(self, zone_dict: dict = "", return_value: bool = False, *,
+                                     sparse: bool = None,
+                                     max_dist_km: float = None,
+                                     impedance: str = None,
+                                     link_file: str = "") -> ODMatrix | SparseODMatrix:
         """calculate zone-to-zone od distance matrix
 
         Args:
             zone_dict (dict, optional): the zone dictionary. Defaults to "".
                 if not specified, use self.zone_dict.
+            sparse (bool, optional): store OD pairs in a SparseODMatrix. Defaults to None, pkg_settings["sparse_od"].
+            max_dist_km (float, optional): keep only OD pairs within this distance (km), implies sparse.
+                Defaults to None, pkg_settings["od_max_dist_km"].
+            impedance (str, optional): "great_circle", "network_distance" (km) or "network_time" (minutes),
+                network impedance is stored in dist_km and used by the gravity model in its place.
+                Defaults to None, pkg_settings["od_impedance"].
+            link_file (str, optional): link.csv for network impedance. Defaults to "", link.csv in input_dir.
 
         Returns:
-            dict[tuple, float]: zone_od_matrix {(zone_id1, zone_id2): distance}
+            ODMatrix | SparseODMatrix: zone_od_matrix, distances in km with zones in the order of zone_dict.
+                the legacy dict {(o_zone_name, d_zone_name): {...}} is available as self.zone_od_dist_matrix
         """
 
         # if not specified, use self.zone_dict as input
         if zone_dict:
             self.zone_dict = zone_dict
 
-        self.zone_od_dist_matrix = calc_zone_od_matrix(self.zone_dict,
-                                                       self.pkg_settings.get("set_cpu_cores"),
-                                                       verbose=self.verbose)
+        if sparse is None:
+            sparse = self.pkg_settings.get("sparse_od", False)
+        if max_dist_km is None:
+            max_dist_km = self.pkg_settings.get("od_max_dist_km")
+
+        if impedance is None:
+            impedance = self.pkg_settings.get("od_impedance", "great_circle")
+
+        if impedance == "great_circle":
+            self.zone_od_matrix = calc_zone_od_matrix(self.zone_dict,
+                                                      self.pkg_settings.get("set_cpu_cores"),
+                                                      verbose=self.verbose,
+                                                      sparse=sparse,
+                                                      max_dist_km=max_dist_km)
+        else:
+            # zones need their member nodes for connectors
+            if not self.is_sync_geometry:
+                self.sync_geometry_between_zone_and_node_poi()
+
+            df_link = read_link(link_file or os.path.join(self.input_dir, "link.csv"), verbose=self.verbose)
+            self.zone_od_matrix = calc_zone_od_network_matrix(self.zone_dict,
+                                                              self.node_dict,
+                                                              df_link,
+                                                              impedance,
+                                                              self.pkg_settings.get("set_cpu_cores"),
+                                                              verbose=self.verbose,
+                                                              sparse=sparse,
+                                                              max_dist_km=max_dist_km)
+        self._zone_od_dist_matrix = None
         self.is_zone_od_dist_matrix = True
-        return self.zone_od_dist_matrix if return_value else None
+        return self.zone_od_matrix if return_value else None
+
+    @property
+    def zone_od_dist_matrix(self) -> dict[tuple[str, str], dict]:
+        """The zone-to-zone OD matrix in dict format, built from zone_od_matrix on first access"""
+        if not hasattr(self, "zone_od_matrix"):
+            raise AttributeError("zone_od_dist_matrix does not exist. Please run calc_zone_od_distance_matrix() first.")
+
+        if getattr(self, "_zone_od_dist_matrix", None) is None:
+            self._zone_od_dist_matrix = self.zone_od_matrix.to_dict()
+        return self._zone_od_dist_matrix
+
+    @zone_od_dist_matrix.setter
+    def zone_od_dist_matrix(self, value: dict) -> None:
+        self._zone_od_dist_matrix = value
+
+    @property
+    def zone_od_demand_matrix(self) -> dict[tuple[str, str], dict]:
+        """The zone-to-zone OD matrix in dict format, with volume from the gravity model"""
+        return self.zone_od_dist_matrix
 
     def gen_poi_trip_rate(self,
                           poi_dict: dict = "",
@@ -653,12 +785,26 @@ class GRID2DEMAND:
     def gen_node_prod_attr(self,
                            node_dict: dict = "",
                            poi_dict: dict = "",
-                           return_value: bool = False) -> dict[int, Node]:
+                           return_value: bool = False,
+                           *,
+                           residential_production: float = 10.0,
+                           residential_attraction: float = 10.0,
+                           boundary_production: float = 1000.0,
+                           boundary_attraction: float = 1000.0,
+                           default_production: float = 50.0,
+                           default_attraction: float = 50.0) -> dict[int, Node]:
         """generate production and attraction for each node based on poi trip rate
 
         Args:
             node_dict (dict, optional): Defaults to "". if not specified, use self.node_dict.
             poi_dict (dict, optional): Defaults to "". if not specified, use self.poi_dict.
+            return_value (bool, optional): return the updated node_dict. Defaults to False.
+            residential_production (float, optional): production of residential nodes. Defaults to 10.0.
+            residential_attraction (float, optional): attraction of residential nodes. Defaults to 10.0.
+            boundary_production (float, optional): production of boundary nodes. Defaults to 1000.0.
+            boundary_attraction (float, optional): attraction of boundary nodes. Defaults to 1000.0.
+            default_production (float, optional): production of other nodes. Defaults to 50.0.
+            default_attraction (float, optional): attraction of other nodes. Defaults to 50.0.
 
         Returns:
             dict[int, Node]: the updated node_dict {node_id: Node}
@@ -674,7 +820,12 @@ class GRID2DEMAND:
         if poi_dict:
             self.poi_dict = poi_dict
 
-        self.node_dict = gen_node_prod_attr(self.node_dict, self.poi_dict, verbose=self.verbose)
+        self.node_dict = gen_node_prod_attr(self.node_dict, self.poi_dict,
+                                            residential_production, residential_attraction,
+                                            boundary_production, boundary_attraction,
+                                            verbose=self.verbose,
+                                            default_production=default_production,
+                                            default_attraction=default_attraction)
         self.is_node_prod_attr = True
         return self.node_dict if return_value else None
 
@@ -731,6 +882,10 @@ class GRID2DEMAND:
                           *,
                           trip_rate_file: str = "",
                           trip_purpose: int = 1,
+                          doubly_constrained: bool = False,
+                          tol: float = 1e-6,
+                          max_iter: int = 100,
+                          volume_threshold: float = None,
                           return_value: bool = False) -> pd.DataFrame:
         """run gravity model to generate demand
 
@@ -741,9 +896,16 @@ class GRID2DEMAND:
             alpha (float, optional): parameter alpha. Defaults to 28507.
             beta (float, optional): parameter beta. Defaults to -0.02.
             gamma (float, optional): parameter gamma. Defaults to -0.123.
+            doubly_constrained (bool, optional): balance OD volumes to both zone production and attraction
+                by Furness / IPF. Defaults to False, production-constrained.
+            tol (float, optional): convergence tolerance of doubly-constrained balancing. Defaults to 1e-6.
+            max_iter (int, optional): max iterations of doubly-constrained balancing. Defaults to 100.
+            volume_threshold (float, optional): for a sparse OD matrix, drop OD pairs with volume below it.
+                Defaults to None, pkg_settings["od_volume_threshold"].
 
         Returns:
-            pd.DataFrame: the final demand dataframe
+            pd.DataFrame: the final demand dataframe.
+                the convergence telemetry of doubly-constrained balancing is kept in self.gravity_telemetry
         """
         # if not specified, use self.zone_dict, self.zone_od_dist_matrix as input
         # if not all([zone_dict, zone_od_dist_matrix]):
@@ -768,29 +930,220 @@ class GRID2DEMAND:
             self.calc_zone_prod_attr(trip_rate_file=trip_rate_file,
                                      trip_purpose=trip_purpose)
 
+        # calculate zone-to-zone distance matrix
+        if not self.is_zone_od_dist_matrix:
+            self.calc_zone_od_distance_matrix()
+
         # run gravity model to generate demand
-        self.zone_od_demand_matrix = run_gravity_model(self.zone_dict,
-                                                       self.zone_od_dist_matrix,
-                                                       trip_purpose,
-                                                       alpha,
-                                                       beta,
-                                                       gamma,
-                                                       verbose=self.verbose)
-        self.df_demand = pd.DataFrame(list(self.zone_od_demand_matrix.values()))
+        self.zone_od_matrix, self.gravity_telemetry = run_gravity_model(self.zone_dict,
+                                                                        self.zone_od_matrix,
+                                                                        trip_purpose,
+                                                                        alpha,
+                                                                        beta,
+                                                                        gamma,
+                                                                        verbose=self.verbose,
+                                                                        doubly_constrained=doubly_constrained,
+                                                                        tol=tol,
+                                                                        max_iter=max_iter,
+                                                                        volume_threshold=volume_threshold,
+                                                                        return_telemetry=True)
+        self._zone_od_dist_matrix = None
+        # o-d lines are built at export only, see save_demand(is_demand_with_geometry=True)
+        self.df_demand = self.zone_od_matrix.to_dataframe()
+        self.trip_purpose = trip_purpose
 
         print("  : Successfully generated OD demands.")
         return self.df_demand if return_value else None
 
+    def run_gravity_model_multi_purpose(self,
+                                        trip_purposes: list = (1, 2, 3),
+                                        *,
+                                        trip_rate_file: str = "",
+                                        doubly_constrained: bool = False,
+                                        tol: float = 1e-6,
+                                        max_iter: int = 100,
+                                        volume_threshold: float = None,
+                                        return_value: bool = False) -> pd.DataFrame:
+        """run gravity model to generate demand of several trip purposes in one pass
+
+        Zone production and attraction of all purposes are calculated at once and kept in
+        self.zone_prod_attr_matrix, the gravity model of each purpose uses its parameters in
+        pkg_settings["trip_purpose_dict"] and the same zone-to-zone distance matrix. node_dict, poi_dict and
+        zone_dict are not changed, so it can be re-run with other purposes or trip rates.
+
+        Args:
+            trip_purposes (list, optional): trip purposes. Defaults to (1, 2, 3).
+            trip_rate_file (str, optional): the path to trip rate file. Defaults to "", use the default trip rate.
+            doubly_constrained (bool, optional): balance both productions and attractions. Defaults to False.
+            tol (float, optional): convergence tolerance of doubly-constrained balancing. Defaults to 1e-6.
+            max_iter (int, optional): max iterations of doubly-constrained balancing. Defaults to 100.
+            volume_threshold (float, optional): for a sparse OD matrix, drop OD pairs with volume below it.
+                Defaults to None, pkg_settings["od_volume_threshold"].
+
+        Returns:
+            pd.DataFrame: the final demand dataframe with a trip_purpose column.
+                the convergence telemetry of each purpose is kept in self.gravity_telemetry
+        """
+        if trip_rate_file and not os.path.exists(trip_rate_file):
+            raise FileNotFoundError(f"Error: File {trip_rate_file} does not exist.")
+
+        # synchronize geometry between zone and node/poi
+        if not self.is_sync_geometry:
+            self.sync_geometry_between_zone_and_node_poi()
+
+        # calculate zone-to-zone distance matrix
+        if not self.is_zone_od_dist_matrix:
+            self.calc_zone_od_distance_matrix()
+
+        self.zone_prod_attr_matrix = calc_zone_production_attraction_matrix(self.node_dict,
+                                                                            self.poi_dict,
+                                                                            self.zone_dict,
+                                                                            trip_rate_file=trip_rate_file,
+                                                                            trip_purposes=trip_purposes,
+                                                                            verbose=self.verbose)
+
+        self.df_demand, self.gravity_telemetry = run_gravity_model_multi_purpose(
+            self.zone_prod_attr_matrix,
+            self.zone_od_matrix,
+            verbose=self.verbose,
+            doubly_constrained=doubly_constrained,
+            tol=tol,
+            max_iter=max_iter,
+            volume_threshold=volume_threshold,
+            return_telemetry=True)
+
+        print(f"  : Successfully generated OD demands of trip purposes {list(trip_purposes)}.")
+        return self.df_demand if return_value else None
+
+    def run_gravity_sweep(self,
+                          params: list,
+                          *,
+                          trip_rate_file: str = "",
+                          trip_purpose: int = 1,
+                          doubly_constrained: bool = False,
+                          tol: float = 1e-6,
+                          max_iter: int = 100,
+                          return_volume: bool = False,
+                          cpu_cores: int = 1) -> pd.DataFrame | tuple[pd.DataFrame, np.ndarray]:
+        """evaluate the gravity model for a grid of (alpha, beta, gamma) scenarios on the current
+        zone-to-zone distance matrix, without changing self.zone_od_matrix or self.df_demand
+
+        Args:
+            params (list): [(alpha, beta, gamma), ...], e.g. itertools.product(alphas, betas, gammas)
+            trip_rate_file (str, optional): trip rate file if zone production / attraction are not calculated yet.
+                Defaults to "".
+            trip_purpose (int, optional): trip purpose of zone production / attraction if not calculated yet.
+                Defaults to 1.
+            doubly_constrained (bool, optional): balance both productions and attractions. Defaults to False.
+            tol (float, optional): convergence tolerance of doubly-constrained balancing. Defaults to 1e-6.
+            max_iter (int, optional): max iterations of doubly-constrained balancing. Defaults to 100.
+            return_volume (bool, optional): also return the OD volumes of all scenarios. Defaults to False.
+            cpu_cores (int, optional): number of processes. Defaults to 1.
+
+        Returns:
+            pd.DataFrame | tuple[pd.DataFrame, np.ndarray]: summary per scenario, see run_gravity_sweep
+        """
+        if not self.is_sync_geometry:
+            self.sync_geometry_between_zone_and_node_poi()
+
+        if not self.is_zone_prod_attr:
+            self.calc_zone_prod_attr(trip_rate_file=trip_rate_file, trip_purpose=trip_purpose)
+
+        if not self.is_zone_od_dist_matrix:
+            self.calc_zone_od_distance_matrix()
+
+        return run_gravity_sweep(self.zone_dict, self.zone_od_matrix, list(params),
+                                 doubly_constrained=doubly_constrained,
+                                 tol=tol,
+                                 max_iter=max_iter,
+                                 return_volume=return_volume,
+                                 cpu_cores=cpu_cores,
+                                 verbose=self.verbose)
+
+    def calibrate_gravity_model(self,
+                                *,
+                                target_tlfd: str | pd.DataFrame = "",
+                                od_counts: str | pd.DataFrame = "",
+                                trip_rate_file: str = "",
+                                trip_purpose: int = 1,
+                                beta_bounds: tuple = (-3.0, 0.0),
+                                gamma_bounds: tuple = (-1.0, 0.0),
+                                tol: float = 1e-10,
+                                max_iter: int = 100) -> dict:
+        """fit beta and gamma of a trip purpose to a target trip length frequency distribution or to observed
+        OD counts on the current zone-to-zone distance matrix, and write them into
+        pkg_settings["trip_purpose_dict"] for the following run_gravity_model
+
+        Args:
+            target_tlfd (str | pd.DataFrame, optional): csv file or dataframe of [from_dist_km, to_dist_km, trips].
+                Defaults to "".
+            od_counts (str | pd.DataFrame, optional): csv file or dataframe of [o_zone_name, d_zone_name, volume]
+                (or o_zone_id, d_zone_id). Defaults to "".
+            trip_rate_file (str, optional): trip rate file if zone production / attraction are not calculated yet.
+                Defaults to "".
+            trip_purpose (int, optional): trip purpose to calibrate. Defaults to 1.
+            beta_bounds (tuple, optional): bounds of beta. Defaults to (-3.0, 0.0).
+            gamma_bounds (tuple, optional): bounds of gamma. Defaults to (-1.0, 0.0).
+            tol (float, optional): convergence tolerance. Defaults to 1e-10.
+            max_iter (int, optional): max iterations. Defaults to 100.
+
+        Returns:
+            dict: fitted parameters and goodness of fit, see calibrate_gravity_model
+        """
+        if isinstance(target_tlfd, str) and target_tlfd:
+            target_tlfd = pd.read_csv(target_tlfd)
+        if isinstance(od_counts, str) and od_counts:
+            od_counts = pd.read_csv(od_counts)
+
+        if not self.is_sync_geometry:
+            self.sync_geometry_between_zone_and_node_poi()
+
+        if not self.is_zone_prod_attr:
+            self.calc_zone_prod_attr(trip_rate_file=trip_rate_file, trip_purpose=trip_purpose)
+
+        if not self.is_zone_od_dist_matrix:
+            self.calc_zone_od_distance_matrix()
+
+        return calibrate_gravity_model(self.zone_dict, self.zone_od_matrix,
+                                       target_tlfd=target_tlfd if isinstance(target_tlfd, pd.DataFrame) else None,
+                                       od_counts=od_counts if isinstance(od_counts, pd.DataFrame) else None,
+                                       trip_purpose=trip_purpose,
+                                       beta_bounds=beta_bounds,
+                                       gamma_bounds=gamma_bounds,
+                                       tol=tol,
+                                       max_iter=max_iter,
+                                       verbose=self.verbose)
+
+    def load_departure_profile(self, profile_file: str = "") -> dict:
+        """load departure time profiles of trip purposes for agents
+
+        Args:
+            profile_file (str, optional): csv of 15-min bin weights per trip purpose, see read_departure_profile.
+                Defaults to "", departure_profile.csv in input_dir.
+
+        Returns:
+            dict: {trip_purpose: shares of 15-min bins}
+        """
+        if not profile_file:
+            profile_file = os.path.join(self.input_dir, "departure_profile.csv")
+
+        self.departure_profile = read_departure_profile(profile_file)
+        if self.verbose:
+            print(f"  : Successfully loaded departure profiles of trip purposes {list(self.departure_profile)}.")
+        return self.departure_profile
+
     def gen_agent_based_demand(self,
                                node_dict: dict = "",
                                zone_dict: dict = "",
-                               df_demand: pd.DataFrame = "") -> pd.DataFrame:
-        """generate agent-based demand
+                               df_demand: pd.DataFrame = "",
+                               seed: int = None) -> pd.DataFrame:
+        """generate agent-based demand, round(volume) agents per OD pair
 
         Args:
             node_dict (dict, optional): _description_. Defaults to "".
             zone_dict (dict, optional): _description_. Defaults to "".
             df_demand (pd.DataFrame, optional): _description_. Defaults to "".
+            seed (int, optional): seed of the random generator. Defaults to None.
 
         Returns:
             pd.DataFrame: the final agent-based demand dataframe
@@ -803,7 +1156,10 @@ class GRID2DEMAND:
             node_dict = self.node_dict
             zone_dict = self.zone_dict
 
-        self.df_agent = gen_agent_based_demand(node_dict, zone_dict, df_demand=df_demand, verbose=self.verbose)
+        self.df_agent = gen_agent_based_demand(node_dict, zone_dict, df_demand=df_demand,
+                                               verbose=self.verbose, seed=seed,
+                                               departure_profile=self.departure_profile,
+                                               trip_purpose=self.trip_purpose)
         return self.df_agent
 
     def save_results_to_csv(self, output_dir: str = "",
@@ -878,10 +1234,11 @@ class GRID2DEMAND:
 
             # df_demand_non_zero = self.df_demand[self.df_demand["volume"] > 0]
 
-            if is_demand_with_geometry:
-                col_name = ["o_zone_id", "d_zone_id", "dist_km", "volume", "geometry"]
-            else:
-                col_name = ["o_zone_id", "d_zone_id", "dist_km", "volume"]
+            col_name = ["o_zone_id", "d_zone_id", "dist_km", "volume"]
+
+            # demand of several trip purposes, see run_gravity_model_multi_purpose
+            if "trip_purpose" in self.df_demand.columns:
+                col_name.append("trip_purpose")
 
             # Re-generate demand based on mode type
             self.df_demand["volume"] = self.df_demand["volume"] * pkg_settings["mode_type"].get(self.mode_type, 1)
@@ -891,28 +1248,68 @@ class GRID2DEMAND:
             # fill name with 0
             df_demand_res.fillna(0, inplace=True)
 
+            # build o-d lines of the written rows in one pass, unless df_demand carries its own geometry
+            if is_demand_with_geometry:
+                if "geometry" in self.df_demand.columns:
+                    df_demand_res["geometry"] = self.df_demand["geometry"].fillna(0)
+                else:
+                    df_demand_res["geometry"] = gen_od_geometry(self.zone_od_matrix,
+                                                                self.df_demand["o_zone_name"],
+                                                                self.df_demand["d_zone_name"],
+                                                                wkt=True)
+
             df_demand_res.to_csv(path_output, index=False)
             print(f"  : Successfully saved demand.csv to {self.output_dir}")
         return None
 
     # @property
-    def save_agent(self, overwrite_file: bool = True) -> None:
-        """Generate agent.csv file"""
+    def save_agent(self, overwrite_file: bool = True, *,
+                   file_format: str = "csv",
+                   compression: str = None,
+                   batch_size: int = 0,
+                   seed: int = None,
+                   cpu_cores: int = 1) -> None:
+        """Generate agent.csv file
+
+        If gen_agent_based_demand() has not been run, agents are generated from df_demand and written batch
+        by batch, without keeping all agents in memory (self.df_agent is not set). With cpu_cores > 1, agents
+        are generated in parallel and each process writes a shard file agent_000.csv, agent_001.csv, ...;
+        for the same seed, the shards in order are identical to agent.csv of a single process.
 
-        if not hasattr(self, "df_agent"):
-            try:
-                self.gen_agent_based_demand()
-            except Exception:
-                print("  : Could not save agent file: df_agent does not exist."
-                      " Please run gen_agent_based_demand() first.")
-                return
+        Args:
+            overwrite_file (bool): whether to overwrite the existing file. Defaults to True.
+            file_format (str): "csv" or "parquet" (requires pyarrow). Defaults to "csv".
+            compression (str): csv: None, "gzip", "bz2" or "xz"; parquet: a pyarrow codec. Defaults to None.
+            batch_size (int): agents per batch, 0 for pkg_settings["agent_batch_size"]. Defaults to 0.
+            seed (int): seed of the random generator when generating agents. Defaults to None.
+            cpu_cores (int): number of processes when generating agents. Defaults to 1.
+        """
 
+        if hasattr(self, "df_agent"):
+            agent_batches = [self.df_agent]
+        elif isinstance(getattr(self, "df_demand", None), pd.DataFrame):
+            if cpu_cores > 1:
+                save_agent_shards(self.node_dict, self.zone_dict, self.df_demand, self.output_dir,
+                                  batch_size=batch_size, seed=seed, cpu_cores=cpu_cores,
+                                  departure_profile=self.departure_profile, trip_purpose=self.trip_purpose,
+                                  file_format=file_format, compression=compression, verbose=True)
+                return None
+            agent_batches = iter_agent_batches(self.node_dict, self.zone_dict, self.df_demand,
+                                               batch_size=batch_size, seed=seed,
+                                               departure_profile=self.departure_profile,
+                                               trip_purpose=self.trip_purpose)
+        else:
+            print("  : Could not save agent file: df_agent does not exist."
+                  " Please run gen_agent_based_demand() first.")
+            return
+
+        agent_file = gen_agent_file_name("agent", file_format, compression)
         if overwrite_file:
-            path_output = path2linux(os.path.join(self.output_dir, "agent.csv"))
+            path_output = path2linux(os.path.join(self.output_dir, agent_file))
         else:
-            path_output = generate_unique_filename(path2linux(os.path.join(self.output_dir, "agent.csv")))
-        self.df_agent.to_csv(path_output, index=False)
-        print(f"  : Successfully saved agent.csv to {self.output_dir}")
+            path_output = generate_unique_filename(path2linux(os.path.join(self.output_dir, agent_file)))
+        num_agent = save_agent_batches(agent_batches, path_output, file_format=file_format, compression=compression)
+        print(f"  : Successfully saved {agent_file} ({num_agent} agents) to {self.output_dir}")
         return None
 
     # @property
@@ -951,7 +1348,10 @@ class GRID2DEMAND:
         else:
             path_output = generate_unique_filename(path2linux(os.path.join(self.output_dir, "node.csv")))
 
-        node_df = pd.DataFrame(self.node_dict.values())
+        if isinstance(self.node_dict, ColumnTable):
+            node_df = self.node_dict.to_dataframe()
+        else:
+            node_df = pd.DataFrame(self.node_dict.values())
 
         # update node data if centroid is used, ignore zone_id if original zone_id is empty
         # if self.is_centroid:
@@ -962,7 +1362,7 @@ class GRID2DEMAND:
 
         if self.use_zone_id:
             node_df["zone_id"] = ""
-            node_is_zone_df = pd.DataFrame(self._node_is_zone.values())
+            node_is_zone_df = pd.DataFrame([node.as_dict() for node in self._node_is_zone.values()])
             node_is_zone_df["zone_id"] = node_is_zone_df["_zone_id"]
 
             node_df = pd.concat([node_df, node_is_zone_df], ignore_index=True)
@@ -1026,13 +1426,16 @@ class GRID2DEMAND:
         else:
             path_output = generate_unique_filename(path2linux(os.path.join(self.output_dir, "zone_od_dist_table.csv")))
 
-        # check if zone_od_dist_matrix exists
-        if not hasattr(self, "zone_od_dist_matrix"):
+        # check if zone_od_matrix exists
+        if not hasattr(self, "zone_od_matrix"):
             print("  : zone_od_dist_matrix does not exist. Please run calc_zone_od_distance_matrix() first.")
         else:
-            zone_od_dist_table_df = pd.DataFrame(self.zone_od_dist_matrix.values())
-            zone_od_dist_table_df = zone_od_dist_table_df[["o_zone_id", "d_zone_id",
-                                                            "dist_km", "geometry"]]
+            df_od = self.zone_od_matrix.to_dataframe()
+            zone_od_dist_table_df = df_od[["o_zone_id", "d_zone_id", "dist_km"]].copy()
+            zone_od_dist_table_df["geometry"] = gen_od_geometry(self.zone_od_matrix,
+                                                                df_od["o_zone_name"],
+                                                                df_od["d_zone_name"],
+                                                                wkt=True)
             zone_od_dist_table_df.to_csv(path_output, index=False)
             print(f"  : Successfully saved zone_od_dist_table.csv to {self.output_dir}")
         return None
@@ -1046,18 +1449,20 @@ class GRID2DEMAND:
         else:
             path_output = generate_unique_filename(path2linux(os.path.join(self.output_dir, "zone_od_dist_matrix.csv")))
 
-        # check if zone_od_dist_matrix exists
-        if not hasattr(self, "zone_od_dist_matrix"):
+        # check if zone_od_matrix exists
+        if not hasattr(self, "zone_od_matrix"):
             print(
                 "  : zone_od_dist_matrix does not exist. Please run calc_zone_od_distance_matrix() first.")
         else:
-            zone_od_dist_table_df = pd.DataFrame(self.zone_od_dist_matrix.values())
-            zone_od_dist_table_df = zone_od_dist_table_df[["o_zone_id", "o_zone_name", "d_zone_id",
-                                                            "d_zone_name", "dist_km", "geometry"]]
-
-            zone_od_dist_matrix_df = zone_od_dist_table_df.pivot(index='o_zone_name',
-                                                                    columns='d_zone_name',
-                                                                    values='dist_km')
+            # zone names sorted on both axes, same as pivoting the od table,
+            # pairs not stored in a sparse matrix are empty
+            zone_od_matrix = self.zone_od_matrix
+            if isinstance(zone_od_matrix, SparseODMatrix):
+                zone_od_matrix = zone_od_matrix.to_dense()
+            zone_od_dist_matrix_df = pd.DataFrame(zone_od_matrix.dist_km,
+                                                  index=pd.Index(zone_od_matrix.zone_name, name="o_zone_name"),
+                                                  columns=pd.Index(zone_od_matrix.zone_name, name="d_zone_name"))
+            zone_od_dist_matrix_df = zone_od_dist_matrix_df.sort_index(axis=0).sort_index(axis=1)
 
             zone_od_dist_matrix_df.to_csv(path_output)
             print(f"  : Successfully saved zone_od_dist_matrix.csv to {self.output_dir}")
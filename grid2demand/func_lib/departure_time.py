@@ -0,0 +1,166 @@
+# -*- coding:utf-8 -*-
+##############################################################
+# Created Date: Saturday, October 17th 2026
+# Contact Info: luoxiangyong01@gmail.com
+# Author/Copyright: Mr. Xiangyong Luo
+##############################################################
+
+import os
+
+import numpy as np
+import pandas as pd
+from pyufunc import path2linux
+
+from grid2demand.utils_lib.pkg_settings import pkg_settings
+
+# departure time profiles are shares of 15-min bins over 24 hours
+DEPARTURE_BIN_SECONDS = 900
+NUM_DEPARTURE_BINS = 24 * 3600 // DEPARTURE_BIN_SECONDS
+
+
+def _time_to_seconds(time_str: str) -> int:
+    """Convert HH:MM or HH:MM:SS to seconds after midnight"""
+    time_parts = [int(part) for part in str(time_str).strip().split(":")]
+    return sum(value * unit for value, unit in zip(time_parts, [3600, 60, 1]))
+
+
+def gen_uniform_departure_profile(start_time: str = "07:00", end_time: str = "08:00") -> np.ndarray:
+    """Departure profile with equal shares in 15-min bins between start_time and end_time
+
+    Args:
+        start_time (str): start of the period, HH:MM. Defaults to "07:00".
+        end_time (str): end of the period (exclusive), HH:MM. Defaults to "08:00".
+
+    Returns:
+        np.ndarray: shares of NUM_DEPARTURE_BINS bins, sum to 1
+    """
+    bin_start = _time_to_seconds(start_time) // DEPARTURE_BIN_SECONDS
+    bin_end = -(-_time_to_seconds(end_time) // DEPARTURE_BIN_SECONDS)
+    if not 0 <= bin_start < bin_end <= NUM_DEPARTURE_BINS:
+        raise ValueError(f"Invalid departure period: {start_time} - {end_time}")
+
+    profile = np.zeros(NUM_DEPARTURE_BINS)
+    profile[bin_start:bin_end] = 1
+    return profile / profile.sum()
+
+
+def read_departure_profile(profile_file: str) -> dict:
+    """Read departure time profiles of trip purposes from a csv file
+
+    The csv has a time_period column with the start of each 15-min bin (HH:MM), and one column of relative
+    weights per trip purpose, named by trip purpose id or name in pkg_settings["trip_purpose_dict"].
+    Bins not listed have no departures.
+
+    Example:
+        time_period,1,2,3
+        07:00,0.3,0.1,0.2
+        07:15,0.4,0.1,0.2
+
+    Args:
+        profile_file (str): path of the departure profile csv file
+
+    Raises:
+        FileNotFoundError: profile_file does not exist
+        ValueError: bins not aligned to 15 minutes, unknown trip purpose or negative / all-zero weights
+
+    Returns:
+        dict: {trip_purpose: np.ndarray of NUM_DEPARTURE_BINS shares}
+    """
+    profile_file = path2linux(profile_file)
+    if not os.path.isfile(profile_file):
+        raise FileNotFoundError(f"Error: File {profile_file} does not exist.")
+
+    df_profile = pd.read_csv(profile_file)
+    if "time_period" not in df_profile.columns:
+        raise ValueError(f"Error: {profile_file} must have a time_period column.")
+
+    bin_seconds = df_profile["time_period"].map(_time_to_seconds).to_numpy()
+    if (bin_seconds % DEPARTURE_BIN_SECONDS).any() or (bin_seconds >= 24 * 3600).any():
+        raise ValueError(f"Error: time_period in {profile_file} must be starts of 15-min bins within 24 hours.")
+    bin_idx = bin_seconds // DEPARTURE_BIN_SECONDS
+
+    purpose_id_by_name = {str(value["name"]): key for key, value in pkg_settings["trip_purpose_dict"].items()}
+    purpose_id_by_name.update({str(key): key for key in pkg_settings["trip_purpose_dict"]})
+
+    departure_profile = {}
+    for col in df_profile.columns.drop("time_period"):
+        if col.strip() not in purpose_id_by_name:
+            raise ValueError(f"Error: unknown trip purpose {col} in {profile_file}, "
+                             f"choose from {list(purpose_id_by_name)}")
+
+        weight = df_profile[col].fillna(0).to_numpy(dtype=np.float64)
+        if (weight < 0).any() or weight.sum() <= 0:
+            raise ValueError(f"Error: weights of trip purpose {col} in {profile_file} must be >= 0 and not all 0.")
+
+        profile = np.bincount(bin_idx, weights=weight, minlength=NUM_DEPARTURE_BINS)
+        departure_profile[purpose_id_by_name[col.strip()]] = profile / profile.sum()
+
+    return departure_profile
+
+
+def calc_departure_profile_cdf(departure_profile: dict, trip_purposes: list) -> np.ndarray:
+    """Cumulative shares of departure bins, one row per trip purpose
+
+    Args:
+        departure_profile (dict): {trip_purpose: shares of bins}, None for pkg_settings["departure_time_period"]
+            for all trip purposes
+        trip_purposes (list): trip purposes, the order of rows
+
+    Returns:
+        np.ndarray: shape (len(trip_purposes), NUM_DEPARTURE_BINS), each row ends with 1
+    """
+    if departure_profile is None:
+        departure_profile = {}
+    default_profile = None
+
+    profile_cdf = np.empty((len(trip_purposes), NUM_DEPARTURE_BINS))
+    for i, trip_purpose in enumerate(trip_purposes):
+        if trip_purpose in departure_profile:
+            profile = np.asarray(departure_profile[trip_purpose], dtype=np.float64)
+        elif not departure_profile:
+            if default_profile is None:
+                default_profile = gen_uniform_departure_profile(*pkg_settings["departure_time_period"])
+            profile = default_profile
+        else:
+            raise ValueError(f"Error: no departure profile for trip purpose {trip_purpose}.")
+
+        if profile.shape != (NUM_DEPARTURE_BINS,):
+            raise ValueError(f"Error: departure profile must have {NUM_DEPARTURE_BINS} bins of 15 minutes.")
+        if (profile < 0).any() or profile.sum() <= 0:
+            raise ValueError(f"Error: departure profile of trip purpose {trip_purpose} must be >= 0 and not all 0.")
+
+        # exactly 1 from the last bin with departures, so no draw falls into trailing empty bins
+        profile_cdf[i] = np.cumsum(profile / profile.sum())
+        profile_cdf[i, np.flatnonzero(profile)[-1]:] = 1
+    return profile_cdf
+
+
+def sample_departure_time(rng: np.random.Generator, profile_cdf: np.ndarray, profile_pos: np.ndarray) -> np.ndarray:
+    """Sample departure times in seconds after midnight, uniform within 15-min bins
+
+    One uniform draw per agent is inverted through the piecewise-linear cdf of its profile:
+    the draw picks the bin, and its position inside the bin picks the second.
+
+    Args:
+        rng (np.random.Generator): random generator
+        profile_cdf (np.ndarray): cumulative shares from calc_departure_profile_cdf
+        profile_pos (np.ndarray): row of profile_cdf of each agent
+
+    Returns:
+        np.ndarray: integer departure times in seconds
+    """
+    rand = rng.random(len(profile_pos))
+
+    # search all profiles at once: row i of the cdf is shifted by i
+    num_profile, num_bin = profile_cdf.shape
+    bin_idx = np.searchsorted((profile_cdf + np.arange(num_profile)[:, None]).ravel(), rand + profile_pos,
+                              side="right") - profile_pos * num_bin
+    bin_idx = np.minimum(bin_idx, num_bin - 1)
+
+    cdf_flat_idx = profile_pos * num_bin + bin_idx
+    cdf_low = np.where(bin_idx > 0, profile_cdf.ravel()[cdf_flat_idx - 1], 0)
+    cdf_high = profile_cdf.ravel()[cdf_flat_idx]
+    bin_frac = (rand - cdf_low) / np.maximum(cdf_high - cdf_low, np.finfo(np.float64).tiny)
+
+    second_in_bin = np.clip((bin_frac * DEPARTURE_BIN_SECONDS).astype(np.int64), 0, DEPARTURE_BIN_SECONDS - 1)
+    return bin_idx * DEPARTURE_BIN_SECONDS + second_in_bin
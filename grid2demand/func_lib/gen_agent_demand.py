@@ -7,20 +7,204 @@
 ##############################################################
 '''
 
-from random import choice, uniform
-import math
+import bz2
+import gzip
+import itertools
+import lzma
+import os
+from typing import Iterator
 
+import numpy as np
 import pandas as pd
-from pyufunc import gmns_geo
+from pyufunc import path2linux
+
+from grid2demand.func_lib.departure_time import calc_departure_profile_cdf, sample_departure_time
+from grid2demand.utils_lib.net_utils import ColumnTable
+from grid2demand.utils_lib.pkg_settings import pkg_settings
+from grid2demand.utils_lib.parallel import parallel_map
+
+# column order of agent.csv, same as the GMNS agent table
+AGENT_COLUMNS = ["id", "agent_type", "o_zone_id", "d_zone_id", "o_zone_name", "d_zone_name",
+                 "o_node_id", "d_node_id", "path_node_seq", "path_link_seq",
+                 "b_generated", "b_complete_trip", "geometry", "departure_time"]
+
+# file openers for compressed csv output
+CSV_COMPRESSION_OPENER = {"gzip": gzip.open, "bz2": bz2.open, "xz": lzma.open}
+AGENT_FILE_SUFFIX = {"csv": ".csv", "parquet": ".parquet", "gzip": ".gz", "bz2": ".bz2", "xz": ".xz"}
+
+
+def build_zone_node_csr(zone_dict: dict, node_dict: dict) -> dict:
+    """Build the zone membership of nodes in CSR format (offsets + node arrays)
+
+    Nodes of the i-th zone in zone_dict are node_id[offsets[i]:offsets[i + 1]].
+
+    Args:
+        zone_dict (dict): dictionary of zone objects, with node_id_list
+        node_dict (dict): dictionary of node objects
+
+    Returns:
+        dict: {"zone_index": {zone_name: i}, "offsets": np.ndarray, "node_id": np.ndarray,
+               "x_coord": np.ndarray, "y_coord": np.ndarray}
+    """
+    zone_names = list(zone_dict)
+    counts = np.array([len(zone_dict[zone_name].node_id_list) for zone_name in zone_names], dtype=np.int64)
+    node_id = np.array(list(itertools.chain.from_iterable(zone_dict[zone_name].node_id_list
+                                                          for zone_name in zone_names)))
+
+    if isinstance(node_dict, ColumnTable):
+        rows = np.array([node_dict._row_of[i] for i in node_id.tolist()], dtype=np.int64)
+        x_coord = node_dict.column("x_coord")[rows].astype(np.float64)
+        y_coord = node_dict.column("y_coord")[rows].astype(np.float64)
+    else:
+        x_coord = np.fromiter((node_dict[i].x_coord for i in node_id.tolist()), dtype=np.float64, count=len(node_id))
+        y_coord = np.fromiter((node_dict[i].y_coord for i in node_id.tolist()), dtype=np.float64, count=len(node_id))
+
+    return {"zone_index": {zone_name: i for i, zone_name in enumerate(zone_names)},
+            "offsets": np.concatenate([[0], np.cumsum(counts)]),
+            "node_id": node_id,
+            "x_coord": x_coord,
+            "y_coord": y_coord}
+
+
+def calc_agent_count(volume: np.ndarray) -> np.ndarray:
+    """Number of agents of each OD pair: volume rounded to the nearest integer, missing or negative as 0"""
+    volume = np.nan_to_num(np.asarray(volume, dtype=np.float64), nan=0.0)
+    return np.maximum(np.round(volume), 0).astype(np.int64)
+
+
+def _prepare_agent_sampling(node_dict: dict, zone_dict: dict, df_demand: pd.DataFrame,
+                            departure_profile: dict = None, trip_purpose: int = 1) -> dict:
+    """Arrays shared by all agent batches: zone membership, agent counts, departure profiles
+    and od columns of the demand table"""
+    zone_node = build_zone_node_csr(zone_dict, node_dict)
+    zone_node_count = np.diff(zone_node["offsets"])
+
+    # zone position of each od pair, -1 for zones not in zone_dict
+    od_o_pos = df_demand["o_zone_name"].map(zone_node["zone_index"]).fillna(-1).to_numpy(dtype=np.int64)
+    od_d_pos = df_demand["d_zone_name"].map(zone_node["zone_index"]).fillna(-1).to_numpy(dtype=np.int64)
+
+    # number of agents per od pair, od pairs without nodes in origin or destination zone have no agents
+    agent_count = calc_agent_count(df_demand["volume"].to_numpy())
+    agent_count[(od_o_pos < 0) | (od_d_pos < 0)] = 0
+    agent_count[(zone_node_count[od_o_pos] == 0) | (zone_node_count[od_d_pos] == 0)] = 0
+
+    # departure profile of each od pair by its trip purpose column, or trip_purpose for all od pairs
+    if "trip_purpose" in df_demand.columns:
+        trip_purposes, od_profile_pos = np.unique(df_demand["trip_purpose"].to_numpy(), return_inverse=True)
+    else:
+        trip_purposes, od_profile_pos = [trip_purpose], np.zeros(len(df_demand), dtype=np.int64)
+
+    return {"offsets": zone_node["offsets"],
+            "zone_node_count": zone_node_count,
+            "node_id": zone_node["node_id"],
+            # coordinate text formatted once per node
+            "node_coord_text": np.array([f"{x} {y}" for x, y in zip(zone_node["x_coord"].tolist(),
+                                                                    zone_node["y_coord"].tolist())], dtype=object),
+            "od_o_pos": od_o_pos,
+            "od_d_pos": od_d_pos,
+            "agent_end": np.cumsum(agent_count),
+            "profile_cdf": calc_departure_profile_cdf(departure_profile, list(trip_purposes)),
+            "od_profile_pos": od_profile_pos,
+            "od_columns": {col: df_demand[col].to_numpy()
+                           for col in ["o_zone_id", "d_zone_id", "o_zone_name", "d_zone_name"]}}
+
+
+def _calc_num_agent(sampling: dict) -> int:
+    return int(sampling["agent_end"][-1]) if len(sampling["agent_end"]) else 0
+
+
+def _gen_agent_batch(sampling: dict, batch_id: int, batch_size: int, entropy: int, agent_type: str) -> pd.DataFrame:
+    """Generate agents batch_id * batch_size to (batch_id + 1) * batch_size - 1
+
+    The random generator of each batch is spawned from SeedSequence(entropy) by batch id, so a batch is the same
+    whichever process generates it and in whatever order.
+    """
+    agent_id = np.arange(batch_id * batch_size, min((batch_id + 1) * batch_size, _calc_num_agent(sampling)))
+    offsets, zone_node_count = sampling["offsets"], sampling["zone_node_count"]
+
+    # od pair of each agent in the batch
+    od_idx = np.searchsorted(sampling["agent_end"], agent_id, side="right")
+    o_pos, d_pos = sampling["od_o_pos"][od_idx], sampling["od_d_pos"][od_idx]
+
+    # sample origin / destination nodes and departure times
+    rng = np.random.default_rng(np.random.SeedSequence(entropy, spawn_key=(batch_id,)))
+    o_node_idx = offsets[o_pos] + rng.integers(0, zone_node_count[o_pos])
+    d_node_idx = offsets[d_pos] + rng.integers(0, zone_node_count[d_pos])
+    departure_time = sample_departure_time(rng, sampling["profile_cdf"], sampling["od_profile_pos"][od_idx])
+
+    node_coord_text = sampling["node_coord_text"]
+    return pd.DataFrame({
+        "id": agent_id + 1,
+        "agent_type": agent_type,
+        **{col: values[od_idx] for col, values in sampling["od_columns"].items()},
+        "o_node_id": sampling["node_id"][o_node_idx],
+        "d_node_id": sampling["node_id"][d_node_idx],
+        "path_node_seq": "[]",
+        "path_link_seq": "[]",
+        "b_generated": False,
+        "b_complete_trip": False,
+        # straight line from origin node to destination node
+        "geometry": "LINESTRING(" + node_coord_text[o_node_idx] + ", " + node_coord_text[d_node_idx] + ")",
+        "departure_time": departure_time,
+    }, columns=AGENT_COLUMNS)
+
+
+def _calc_seed_entropy(seed: int = None) -> int:
+    """Root entropy of agent sampling: the seed itself, or fresh OS entropy if seed is None"""
+    return np.random.SeedSequence(seed).entropy
+
+
+def iter_agent_batches(node_dict: dict, zone_dict: dict, df_demand: pd.DataFrame,
+                       agent_type: str = "v",
+                       batch_size: int = 0,
+                       seed: int = None,
+                       departure_profile: dict = None,
+                       trip_purpose: int = 1) -> Iterator[pd.DataFrame]:
+    """Generate agents from the demand table in batches of at most batch_size agents
+
+    Each OD pair is expanded into round(volume) agents. The origin and destination node of each agent
+    are sampled uniformly from the nodes of its origin and destination zone, and its departure time (seconds
+    after midnight) from the departure profile of its trip purpose. OD pairs with a zone without nodes are
+    skipped. Only one batch of agents is held in memory at a time.
+
+    Every batch draws from its own generator spawned from SeedSequence(seed), so the agents only depend on
+    the demand table, the seed and the batch size, see save_agent_shards for parallel generation.
+
+    Args:
+        node_dict (dict): dictionary of node objects
+        zone_dict (dict): dictionary of zone objects
+        df_demand (pd.DataFrame): demand table with o_zone_id, d_zone_id, o_zone_name, d_zone_name and volume
+        agent_type (str): specify the agent type. Defaults to "v".
+        batch_size (int): maximum number of agents per batch, 0 for pkg_settings["agent_batch_size"].
+        seed (int): seed of the random generator for node sampling and departure times. Defaults to None.
+        departure_profile (dict): {trip_purpose: shares of 15-min bins}, see read_departure_profile.
+            Defaults to None, uniform within pkg_settings["departure_time_period"].
+        trip_purpose (int): trip purpose of all od pairs if df_demand has no trip_purpose column. Defaults to 1.
+
+    Yields:
+        pd.DataFrame: agents of one batch, columns in AGENT_COLUMNS, ids continue across batches
+    """
+    batch_size = batch_size or pkg_settings["agent_batch_size"]
+    entropy = _calc_seed_entropy(seed)
+
+    sampling = _prepare_agent_sampling(node_dict, zone_dict, df_demand, departure_profile, trip_purpose)
+    num_batch = -(-_calc_num_agent(sampling) // batch_size)
+    for batch_id in range(num_batch):
+        yield _gen_agent_batch(sampling, batch_id, batch_size, entropy, agent_type)
 
 
 def gen_agent_based_demand(node_dict: dict, zone_dict: dict,
                            path_demand: str = "",
                            df_demand: pd.DataFrame = "",
                            agent_type: str = "v",
-                           verbose: bool = False) -> pd.DataFrame:
+                           verbose: bool = False,
+                           seed: int = None,
+                           departure_profile: dict = None,
+                           trip_purpose: int = 1) -> pd.DataFrame:
     """Generate agent-based demand data
 
+    Each OD pair is expanded into round(volume) agents, see iter_agent_batches.
+
     Args:
         node_dict (dict): dictionary of node objects
         zone_dict (dict): dictionary of zone objects
@@ -28,9 +212,13 @@ def gen_agent_based_demand(node_dict: dict, zone_dict: dict,
         df_demand (pd.DataFrame): user provided demand dataframe. Defaults to "".
         agent_type (str): specify the agent type. Defaults to "v".
         verbose (bool): whether to print out processing message. Defaults to False.
+        seed (int): seed of the random generator for node sampling and departure times. Defaults to None.
+        departure_profile (dict): {trip_purpose: shares of 15-min bins}, see read_departure_profile.
+            Defaults to None, uniform within pkg_settings["departure_time_period"].
+        trip_purpose (int): trip purpose of all od pairs if df_demand has no trip_purpose column. Defaults to 1.
 
     Returns:
-        pd.DataFrame: _description_
+        pd.DataFrame: agents, one row per agent
     """
     # either path_demand or df_demand must be provided
 
@@ -43,40 +231,144 @@ def gen_agent_based_demand(node_dict: dict, zone_dict: dict,
         print("Error: No demand data provided.")
         return pd.DataFrame()
 
-    agent_lst = []
-    for i in range(len(df_demand)):
-        o_zone_id = df_demand.loc[i, 'o_zone_id']
-        d_zone_id = df_demand.loc[i, 'd_zone_id']
-        o_zone_name = df_demand.loc[i, 'o_zone_name']
-        d_zone_name = df_demand.loc[i, 'd_zone_name']
-        o_node_id = choice(zone_dict[o_zone_name].node_id_list + [""])
-        d_node_id = choice(zone_dict[d_zone_name].node_id_list + [""])
-
-        if o_node_id and d_node_id:
-            rand_time = math.ceil(uniform(1, 60))
-            if rand_time == 60:
-                departure_time = "0800"
-            elif rand_time < 10:
-                departure_time = f"070{rand_time}"
-            else:
-                departure_time = f"07{rand_time}"
-
-            agent_lst.append(
-                gmns_geo.Agent(
-                    id=i + 1,
-                    agent_type=agent_type,
-                    o_zone_id=o_zone_id,
-                    d_zone_id=d_zone_id,
-                    o_zone_name=o_zone_name,
-                    d_zone_name=d_zone_name,
-                    o_node_id=o_node_id,
-                    d_node_id=d_node_id,
-                    geometry=f"LINESTRING({node_dict[o_node_id].x_coord} {node_dict[o_node_id].y_coord}, {node_dict[d_node_id].x_coord} {node_dict[d_node_id].y_coord})",
-                    departure_time=departure_time
-                )
-            )
+    agent_batches = list(iter_agent_batches(node_dict, zone_dict, df_demand, agent_type=agent_type, seed=seed,
+                                            departure_profile=departure_profile, trip_purpose=trip_purpose))
+    df_agent = pd.concat(agent_batches, ignore_index=True) if agent_batches else pd.DataFrame(columns=AGENT_COLUMNS)
+
+    if verbose:
+        print(f"  : Successfully generated agent-based demand data: {len(df_agent)} agents.")
+
+    return df_agent
+
+
+def gen_agent_file_name(file_stem: str = "agent", file_format: str = "csv", compression: str = None) -> str:
+    """File name of agent output, e.g. agent.csv, agent.csv.gz, agent.parquet"""
+    file_name = file_stem + AGENT_FILE_SUFFIX.get(file_format, f".{file_format}")
+    if file_format == "csv" and compression:
+        file_name += AGENT_FILE_SUFFIX.get(compression, "")
+    return file_name
+
+
+def save_agent_batches(agent_batches: Iterator[pd.DataFrame], path_output: str,
+                       file_format: str = "csv",
+                       compression: str = None) -> int:
+    """Write batches of agents to one file, appending batch by batch
+
+    Args:
+        agent_batches (Iterator[pd.DataFrame]): agent batches, e.g. from iter_agent_batches
+        path_output (str): output file path
+        file_format (str): "csv" or "parquet" (requires pyarrow). Defaults to "csv".
+        compression (str): csv: None, "gzip", "bz2" or "xz"; parquet: a pyarrow codec such as "snappy" or "zstd".
+            Defaults to None.
+
+    Returns:
+        int: number of agents written
+    """
+    num_agent = 0
+
+    if file_format == "csv":
+        if compression and compression not in CSV_COMPRESSION_OPENER:
+            raise ValueError(f"Unsupported csv compression: {compression}, "
+                             f"choose from {list(CSV_COMPRESSION_OPENER)}")
+        opener = CSV_COMPRESSION_OPENER[compression] if compression else open
+        with opener(path_output, "wt", newline="") as f:
+            f.write(",".join(AGENT_COLUMNS) + "\n")
+            for df_batch in agent_batches:
+                df_batch.to_csv(f, index=False, header=False)
+                num_agent += len(df_batch)
+        return num_agent
+
+    if file_format == "parquet":
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        writer = None
+        try:
+            for df_batch in agent_batches:
+                table = pa.Table.from_pandas(df_batch, preserve_index=False)
+                if writer is None:
+                    writer = pq.ParquetWriter(path_output, table.schema, compression=compression or "snappy")
+                writer.write_table(table.cast(writer.schema))
+                num_agent += len(df_batch)
+        finally:
+            if writer is not None:
+                writer.close()
+        if writer is None:
+            pq.write_table(pa.Table.from_pandas(pd.DataFrame(columns=AGENT_COLUMNS), preserve_index=False),
+                           path_output)
+        return num_agent
+
+    raise ValueError(f"Unsupported agent file format: {file_format}, choose from ['csv', 'parquet']")
+
+
+def _write_agent_shard(shared: dict, start: int, end: int) -> int:
+    """Task of parallel_map: generate the batches of shards start:end and write each to its shard file"""
+    num_agent = 0
+    for shard_id in range(start, end):
+        batch_ids = range(shared["batch_bounds"][shard_id], shared["batch_bounds"][shard_id + 1])
+        agent_batches = (_gen_agent_batch(shared["sampling"], batch_id, shared["batch_size"], shared["entropy"],
+                                          shared["agent_type"]) for batch_id in batch_ids)
+        num_agent += save_agent_batches(agent_batches, shared["path_shards"][shard_id],
+                                        file_format=shared["file_format"], compression=shared["compression"])
+    return num_agent
+
+
+def save_agent_shards(node_dict: dict, zone_dict: dict, df_demand: pd.DataFrame, output_dir: str,
+                      agent_type: str = "v",
+                      batch_size: int = 0,
+                      seed: int = None,
+                      departure_profile: dict = None,
+                      trip_purpose: int = 1,
+                      cpu_cores: int = 1,
+                      file_format: str = "csv",
+                      compression: str = None,
+                      verbose: bool = False) -> list:
+    """Generate agents in parallel, each process writes a shard file of consecutive agent batches
+
+    Shard files are agent_000.csv, agent_001.csv, ... in output_dir. For the same seed and batch size, the
+    shards concatenated in order are identical to the output of iter_agent_batches in a single process.
+
+    Args:
+        node_dict (dict): dictionary of node objects
+        zone_dict (dict): dictionary of zone objects
+        df_demand (pd.DataFrame): demand table with o_zone_id, d_zone_id, o_zone_name, d_zone_name and volume
+        output_dir (str): directory of shard files
+        agent_type (str): specify the agent type. Defaults to "v".
+        batch_size (int): maximum number of agents per batch, 0 for pkg_settings["agent_batch_size"].
+        seed (int): seed of the random generator, None for a random seed shared by all shards. Defaults to None.
+        departure_profile (dict): {trip_purpose: shares of 15-min bins}, see read_departure_profile.
+            Defaults to None, uniform within pkg_settings["departure_time_period"].
+        trip_purpose (int): trip purpose of all od pairs if df_demand has no trip_purpose column. Defaults to 1.
+        cpu_cores (int): number of processes, also the number of shards. Defaults to 1.
+        file_format (str): "csv" or "parquet" (requires pyarrow). Defaults to "csv".
+        compression (str): compression of shard files, see save_agent_batches. Defaults to None.
+        verbose (bool): whether to print out processing message. Defaults to False.
+
+    Returns:
+        list: paths of shard files
+    """
+    batch_size = batch_size or pkg_settings["agent_batch_size"]
+    entropy = _calc_seed_entropy(seed)
+
+    sampling = _prepare_agent_sampling(node_dict, zone_dict, df_demand, departure_profile, trip_purpose)
+    num_batch = -(-_calc_num_agent(sampling) // batch_size)
+
+    # split batches into cpu_cores contiguous ranges, one shard per range
+    num_shard = max(min(cpu_cores, num_batch), 1)
+    batch_bounds = np.linspace(0, num_batch, num_shard + 1).astype(int)
+
+    path_shards = [path2linux(os.path.join(output_dir, gen_agent_file_name(f"agent_{i:03d}", file_format, compression)))
+                   for i in range(num_shard)]
+
+    shared = {"sampling": sampling, "batch_bounds": batch_bounds, "batch_size": batch_size, "entropy": entropy,
+              "agent_type": agent_type, "path_shards": path_shards, "file_format": file_format,
+              "compression": compression}
+
+    if verbose and num_shard > 1:
+        print(f"  : Parallel generating agents using Pool with {num_shard} CPUs. Please wait...")
+    num_agent = parallel_map(_write_agent_shard, shared, num_shard, cpu_cores=num_shard, chunk_size=1)
 
     if verbose:
-        print("  :Successfully generated agent-based demand data.")
+        print(f"  : Successfully saved {sum(num_agent)} agents to {num_shard} shard files in {output_dir}")
 
-    return pd.DataFrame(agent_lst)
+    return path_shards
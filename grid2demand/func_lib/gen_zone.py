@@ -6,23 +6,25 @@
 ##############################################################
 
 from __future__ import absolute_import
-import itertools
-import copy
-from multiprocessing import Pool
+from dataclasses import fields
 
 import pandas as pd
 import shapely
 import numpy as np
 import shapely.geometry
-from tqdm import tqdm
 from pyufunc import (calc_distance_on_unit_sphere,
                      cvt_int_to_alpha,
-                     func_running_time,
-                     find_closest_point)
+                     func_running_time)
 
-from grid2demand.utils_lib.net_utils import Zone, Node
-from grid2demand.utils_lib.pkg_settings import pkg_settings
-from tqdm.contrib.concurrent import process_map
+from grid2demand.utils_lib.net_utils import Zone, Node, ColumnTable, ZoneLattice, ODMatrix, SparseODMatrix
+
+EARTH_RADIUS_KM = 6371.0
+
+# how sync functions return zone assignments:
+# copy_on_write: new dicts, records and zones that change are shallow-copied, the others are shared with the inputs
+# inplace: update and return the input dicts
+# assignment: leave the input dicts untouched and return only the zone assignment of records
+SYNC_MODES = ["copy_on_write", "inplace", "assignment"]
 
 
 # supporting functions
@@ -53,86 +55,388 @@ def _get_lng_lat_min_max(node_dict: dict[int, Node]) -> list:
     return [coord_x_min - 0.000001, coord_x_max + 0.000001, coord_y_min - 0.000001, coord_y_max + 0.000001]
 
 
-def _sync_zones_geometry_with_node(args: tuple) -> tuple:
-    # node is dictionary here, pool.imap or process_map will not work for dataclass object
+def _get_record_coords(record_dict: dict) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Get record ids and x, y coordinates as arrays, in the iteration order of record_dict
+
+    Args:
+        record_dict (dict): {id: Node} or {id: POI}, or a column-backed table
+
+    Returns:
+        tuple[np.ndarray, np.ndarray, np.ndarray]: record ids, x coordinates, y coordinates
+    """
+    if isinstance(record_dict, ColumnTable):
+        rows = record_dict.rows
+        return (record_dict.column(record_dict.id_col)[rows],
+                record_dict.column("x_coord")[rows].astype(np.float64),
+                record_dict.column("y_coord")[rows].astype(np.float64))
+
+    record_ids = np.array(list(record_dict), dtype=object)
+    x_coord = np.fromiter((record_dict[i].x_coord for i in record_ids), dtype=np.float64, count=len(record_ids))
+    y_coord = np.fromiter((record_dict[i].y_coord for i in record_ids), dtype=np.float64, count=len(record_ids))
+    return record_ids, x_coord, y_coord
+
 
-    node_id, node, zone_dict = args
-    for zone_name in zone_dict:
-        if isinstance(node["geometry"], str):
-            node["geometry"] = shapely.from_wkt(node["geometry"])
+def _query_points_within_zones(zone_geometry: list, x_coord: np.ndarray, y_coord: np.ndarray) -> np.ndarray:
+    """Find the zone each point lies within, using one bulk query on a STRtree of zone geometries
 
-        if isinstance(zone_dict[zone_name].geometry, str):
-            zone_dict[zone_name].geometry = shapely.from_wkt(
-                zone_dict[zone_name].geometry)
+    Args:
+        zone_geometry (list): zone geometries (shapely geometry or wkt)
+        x_coord (np.ndarray): x coordinates of points
+        y_coord (np.ndarray): y coordinates of points
 
-        if shapely.within(node["geometry"], zone_dict[zone_name].geometry):
-            node["zone_id"] = zone_dict[zone_name].id
-            zone_dict[zone_name].node_id_list.append(node_id)
-            return node_id, node, zone_name
+    Returns:
+        np.ndarray: the position of the zone in zone_geometry for each point, -1 if the point is in no zone
+    """
+    zone_geometry = [shapely.from_wkt(geo) if isinstance(geo, str) and geo else geo for geo in zone_geometry]
+    zone_tree = shapely.STRtree([geo if isinstance(geo, shapely.Geometry) else None for geo in zone_geometry])
 
-    return node_id, node, None
+    point_idx, zone_idx = zone_tree.query(shapely.points(x_coord, y_coord), predicate="within")
 
+    # for overlapping zones, take the first zone in order, same as scanning the zones one by one
+    order = np.lexsort((zone_idx, point_idx))
+    point_idx, zone_idx = point_idx[order], zone_idx[order]
+    first = np.unique(point_idx, return_index=True)[1]
 
-def _sync_zones_geometry_with_poi(args: tuple) -> tuple:
+    zone_pos = np.full(len(x_coord), -1, dtype=np.int64)
+    zone_pos[point_idx[first]] = zone_idx[first]
+    return zone_pos
 
-    # poi is dictionary here
-    # pool.imap or process_map will not work for dataclass object
 
-    poi_id, poi, zone_dict = args
-    for zone_name in zone_dict:
-        if isinstance(poi["geometry"], str):
-            poi["geometry"] = shapely.from_wkt(poi["geometry"])
-        if isinstance(zone_dict[zone_name].geometry, str):
-            zone_dict[zone_name].geometry = shapely.from_wkt(
-                zone_dict[zone_name].geometry)
+def _copy_record(record):
+    """Shallow copy of a record (Node, POI or Zone), attribute values such as geometry are shared"""
+    record_cp = object.__new__(record.__class__)
+    if hasattr(record, "__dict__"):
+        record_cp.__dict__.update(record.__dict__)
+    else:
+        for record_field in fields(record):
+            object.__setattr__(record_cp, record_field.name, getattr(record, record_field.name))
+    return record_cp
 
-        if shapely.within(poi["geometry"], zone_dict[zone_name].geometry):
-            poi["zone_id"] = zone_dict[zone_name].id
-            zone_dict[zone_name].poi_id_list.append(poi_id)
-            return poi_id, poi, zone_name
 
-    return poi_id, poi, None
+def _assign_records_to_zones(zone_dict: dict, zone_names: list, record_dict: dict,
+                             record_ids: np.ndarray, zone_pos: np.ndarray, id_list_attr: str,
+                             mode: str = "inplace") -> dict:
+    """Update zone_id of records and append record ids to id_list_attr of zones, as specified by mode
 
+    Args:
+        zone_dict (dict): Zone cells
+        zone_names (list): zone names, zone_pos refers to positions in this list
+        record_dict (dict): Nodes or POIs
+        record_ids (np.ndarray): record ids, in the iteration order of record_dict
+        zone_pos (np.ndarray): the zone position of each record, -1 if the record is in no zone
+        id_list_attr (str): the zone attribute to store record ids, node_id_list or poi_id_list
+        mode (str, optional): one of SYNC_MODES. Defaults to "inplace".
 
-def _sync_zones_centroid_with_node(args: tuple) -> tuple:
-    # node is dictionary here
-    node_id, node, multipoint_zone, zone_point_id = args
-    node_point = shapely.geometry.Point(node["x_coord"], node["y_coord"])
-    closest_zone_point = find_closest_point(node_point, multipoint_zone)[0]
-    zone_id = zone_point_id[closest_zone_point]
-    return node_id, zone_id
+    Returns:
+        dict: {"zone_dict", "record_dict", "zone_assignment"}, zone_assignment is a pd.DataFrame
+            [id, zone_id, zone_name] of records within zones, in record order; no dicts for mode "assignment"
+    """
+    if mode not in SYNC_MODES:
+        raise ValueError(f"Unsupported sync mode: {mode}, choose from {SYNC_MODES}")
+
+    zone_ids = np.array([zone_dict[zone_name].id for zone_name in zone_names], dtype=object)
+
+    assigned = np.flatnonzero(zone_pos >= 0)
+    zone_assignment = pd.DataFrame({"id": record_ids[assigned],
+                                    "zone_id": zone_ids[zone_pos[assigned]],
+                                    "zone_name": np.array(zone_names, dtype=object)[zone_pos[assigned]]})
+    if mode == "assignment":
+        return {"zone_assignment": zone_assignment}
+
+    # records within zones, grouped by zone and kept in record order inside each zone
+    assigned = assigned[np.argsort(zone_pos[assigned], kind="stable")]
+    zone_groups = [group for group in np.split(assigned, np.flatnonzero(np.diff(zone_pos[assigned])) + 1)
+                   if len(group)]
+
+    if mode == "copy_on_write":
+        # only the zone_id column, updated records and zones with new record ids are copied
+        if isinstance(record_dict, ColumnTable):
+            record_dict = record_dict.copy(copy_columns=["zone_id"])
+        else:
+            record_dict = dict(record_dict)
+            for record_id in record_ids[assigned].tolist():
+                record_dict[record_id] = _copy_record(record_dict[record_id])
+
+        zone_dict = dict(zone_dict)
+        for group in zone_groups:
+            zone_name = zone_names[zone_pos[group[0]]]
+            zone_dict[zone_name] = _copy_record(zone_dict[zone_name])
+            setattr(zone_dict[zone_name], id_list_attr, list(getattr(zone_dict[zone_name], id_list_attr)))
+
+    # update zone_id for records
+    if isinstance(record_dict, ColumnTable):
+        record_dict.set_column("zone_id", zone_ids[zone_pos[assigned]].tolist(), record_dict.rows[assigned])
+    else:
+        for i in assigned:
+            record_dict[record_ids[i]]["zone_id"] = zone_ids[zone_pos[i]]
 
+    # update node_id_list or poi_id_list for zones
+    for group in zone_groups:
+        getattr(zone_dict[zone_names[zone_pos[group[0]]]], id_list_attr).extend(record_ids[group].tolist())
 
-def _sync_zones_centroid_with_poi(args: tuple) -> tuple:
+    return {"zone_dict": zone_dict, "record_dict": record_dict, "zone_assignment": zone_assignment}
 
-    # poi is dictionary here
-    # pool.imap or process_map will not work for dataclass object
 
-    poi_id, poi, multipoint_zone, zone_point_id = args
-    poi_point = shapely.geometry.Point(poi["x_coord"], poi["y_coord"])
-    closest_zone_point = find_closest_point(poi_point, multipoint_zone)[0]
-    zone_id = zone_point_id[closest_zone_point]
-    return poi_id, zone_id
+def _sync_zones_geometry_with_records(zone_dict: dict, record_dict: dict, id_list_attr: str,
+                                      mode: str = "inplace") -> dict:
+    """Assign records (nodes or POIs) to the zone geometry they lie within
 
+    Args:
+        zone_dict (dict): Zone cells
+        record_dict (dict): Nodes or POIs
+        id_list_attr (str): the zone attribute to store record ids, node_id_list or poi_id_list
+        mode (str, optional): one of SYNC_MODES. Defaults to "inplace".
+
+    Returns:
+        dict: see _assign_records_to_zones
+    """
+    zone_names = list(zone_dict)
+    record_ids, x_coord, y_coord = _get_record_coords(record_dict)
+    zone_pos = _query_points_within_zones([zone_dict[zone_name].geometry for zone_name in zone_names],
+                                          x_coord, y_coord)
+    return _assign_records_to_zones(zone_dict, zone_names, record_dict, record_ids, zone_pos, id_list_attr, mode)
+
+
+def _sync_zones_lattice_with_records(zone_dict: dict, record_dict: dict, zone_lattice: ZoneLattice,
+                                     id_list_attr: str, mode: str = "inplace") -> dict:
+    """Assign records (nodes or POIs) to grid zone cells by floor division on coordinates
+
+    Args:
+        zone_dict (dict): Zone cells generated by net2zone
+        record_dict (dict): Nodes or POIs
+        zone_lattice (ZoneLattice): the lattice of zone_dict returned by net2zone
+        id_list_attr (str): the zone attribute to store record ids, node_id_list or poi_id_list
+        mode (str, optional): one of SYNC_MODES. Defaults to "inplace".
+
+    Returns:
+        dict: see _assign_records_to_zones
+    """
+    if not set(zone_lattice.zone_names).issubset(zone_dict):
+        raise ValueError("zone_lattice does not match zone_dict, please use the lattice returned by net2zone")
+
+    record_ids, x_coord, y_coord = _get_record_coords(record_dict)
+    zone_pos = zone_lattice.locate(x_coord, y_coord)
+    return _assign_records_to_zones(zone_dict, zone_lattice.zone_names, record_dict, record_ids, zone_pos,
+                                    id_list_attr, mode)
+
+
+def _project_lng_lat_to_km(lng: np.ndarray, lat: np.ndarray, lat_ref: float) -> tuple[np.ndarray, np.ndarray]:
+    """Project longitude and latitude to planar x, y in km (equirectangular around lat_ref)
+
+    Euclidean distances in the projected space approximate great-circle distances for study areas
+    up to a few hundred km, unlike distances in degrees, which stretch with latitude.
+    """
+    x_coord = np.radians(np.asarray(lng, dtype=np.float64)) * EARTH_RADIUS_KM * np.cos(np.radians(lat_ref))
+    y_coord = np.radians(np.asarray(lat, dtype=np.float64)) * EARTH_RADIUS_KM
+    return x_coord, y_coord
 
-def _distance_calculation(args: tuple) -> tuple:
-    i, j, df_zone = args
-    return (
-        (df_zone.loc[i, 'name'], df_zone.loc[j, 'name']),
-        {
-            "o_zone_id": df_zone.loc[i, 'id'],
-            "o_zone_name": df_zone.loc[i, 'name'],
-            "d_zone_id": df_zone.loc[j, 'id'],
-            "d_zone_name": df_zone.loc[j, 'name'],
-            "dist_km": calc_distance_on_unit_sphere(
-                df_zone.loc[i, 'centroid'],
-                df_zone.loc[j, 'centroid'],
-                unit='km'),
-            "volume": 0,
-            "geometry": shapely.LineString(
-                [df_zone.loc[i, 'centroid'], df_zone.loc[j, 'centroid']]),
-        }
-    )
+
+def _query_nearest_zones(zone_x: np.ndarray, zone_y: np.ndarray, x_coord: np.ndarray, y_coord: np.ndarray,
+                         max_distance_km: float = None) -> tuple[np.ndarray, np.ndarray]:
+    """Find the nearest zone centroid for each point, using one bulk query on a STRtree of zone centroids
+
+    Args:
+        zone_x (np.ndarray): longitude of zone centroids
+        zone_y (np.ndarray): latitude of zone centroids
+        x_coord (np.ndarray): longitude of points
+        y_coord (np.ndarray): latitude of points
+        max_distance_km (float, optional): points farther than this from every zone centroid get no zone.
+            Defaults to None, no limit.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: the position of the nearest zone for each point (-1 if none),
+            and the distance to it in km (nan if none)
+    """
+    lat_ref = float(np.nanmean(zone_y))
+    zone_tree = shapely.STRtree(shapely.points(*_project_lng_lat_to_km(zone_x, zone_y, lat_ref)))
+    points = shapely.points(*_project_lng_lat_to_km(x_coord, y_coord, lat_ref))
+
+    (point_idx, zone_idx), dist_km = zone_tree.query_nearest(points,
+                                                             max_distance=max_distance_km or None,
+                                                             return_distance=True,
+                                                             all_matches=True)
+
+    # for equally near zones, take the first zone in order
+    order = np.lexsort((zone_idx, point_idx))
+    point_idx, zone_idx, dist_km = point_idx[order], zone_idx[order], dist_km[order]
+    first = np.unique(point_idx, return_index=True)[1]
+
+    zone_pos = np.full(len(points), -1, dtype=np.int64)
+    zone_pos[point_idx[first]] = zone_idx[first]
+    zone_dist = np.full(len(points), np.nan)
+    zone_dist[point_idx[first]] = dist_km[first]
+    return zone_pos, zone_dist
+
+
+def _query_k_nearest_zones(zone_x: np.ndarray, zone_y: np.ndarray, x_coord: np.ndarray, y_coord: np.ndarray,
+                           k_nearest: int, chunk_size: int = 1_000_000) -> tuple[np.ndarray, np.ndarray]:
+    """Find the k nearest zone centroids for each point, in chunks of points
+
+    Args:
+        zone_x (np.ndarray): longitude of zone centroids
+        zone_y (np.ndarray): latitude of zone centroids
+        x_coord (np.ndarray): longitude of points
+        y_coord (np.ndarray): latitude of points
+        k_nearest (int): number of nearest zones
+        chunk_size (int, optional): max number of point-zone distances held in memory. Defaults to 1_000_000.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: zone positions and distances in km, shape (points, k), nearest first
+    """
+    lat_ref = float(np.nanmean(zone_y))
+    zone_x, zone_y = _project_lng_lat_to_km(zone_x, zone_y, lat_ref)
+    x_coord, y_coord = _project_lng_lat_to_km(x_coord, y_coord, lat_ref)
+
+    k_nearest = min(k_nearest, len(zone_x))
+    zone_pos = np.empty((len(x_coord), k_nearest), dtype=np.int64)
+    zone_dist = np.empty((len(x_coord), k_nearest))
+
+    rows = max(1, chunk_size // max(1, len(zone_x)))
+    for start in range(0, len(x_coord), rows):
+        end = min(start + rows, len(x_coord))
+        dist = np.hypot(x_coord[start:end, None] - zone_x[None, :], y_coord[start:end, None] - zone_y[None, :])
+
+        # stable sort on distance keeps equally near zones in zone order
+        nearest = np.argsort(dist, axis=1, kind="stable")[:, :k_nearest]
+        zone_pos[start:end] = nearest
+        zone_dist[start:end] = np.take_along_axis(dist, nearest, axis=1)
+    return zone_pos, zone_dist
+
+
+def _sync_zones_centroid_with_records(zone_dict: dict, record_dict: dict, id_list_attr: str,
+                                      max_distance_km: float = None, k_nearest: int = 1,
+                                      mode: str = "inplace") -> dict:
+    """Assign records (nodes or POIs) to the nearest zone centroid
+
+    Args:
+        zone_dict (dict): Zone cells
+        record_dict (dict): Nodes or POIs
+        id_list_attr (str): the zone attribute to store record ids, node_id_list or poi_id_list
+        max_distance_km (float, optional): max distance from a record to its zone centroid. Defaults to None.
+        k_nearest (int, optional): if greater than 1, also return the k nearest zones of each record. Defaults to 1.
+        mode (str, optional): one of SYNC_MODES. Defaults to "inplace".
+
+    Returns:
+        dict: see _assign_records_to_zones, plus "k_nearest_zone" if k_nearest > 1: the k nearest zones
+            of each record, columns: [id, rank, zone_id, zone_name, dist_km]
+    """
+    zone_names = list(zone_dict)
+    zone_x = np.array([zone_dict[zone_name].x_coord for zone_name in zone_names], dtype=np.float64)
+    zone_y = np.array([zone_dict[zone_name].y_coord for zone_name in zone_names], dtype=np.float64)
+
+    record_ids, x_coord, y_coord = _get_record_coords(record_dict)
+    zone_pos, _ = _query_nearest_zones(zone_x, zone_y, x_coord, y_coord, max_distance_km)
+    sync_result = _assign_records_to_zones(zone_dict, zone_names, record_dict, record_ids, zone_pos,
+                                           id_list_attr, mode)
+
+    if k_nearest <= 1:
+        return sync_result
+
+    k_zone_pos, k_zone_dist = _query_k_nearest_zones(zone_x, zone_y, x_coord, y_coord, k_nearest)
+    num_k = k_zone_pos.shape[1]
+    zone_ids = np.array([zone_dict[zone_name].id for zone_name in zone_names], dtype=object)
+    sync_result["k_nearest_zone"] = pd.DataFrame({"id": np.repeat(record_ids, num_k),
+                                                  "rank": np.tile(np.arange(1, num_k + 1), len(record_ids)),
+                                                  "zone_id": zone_ids[k_zone_pos.ravel()],
+                                                  "zone_name": np.array(zone_names, dtype=object)[k_zone_pos.ravel()],
+                                                  "dist_km": k_zone_dist.ravel()})
+    return sync_result
+
+
+def _rename_sync_result(sync_result: dict, record_key: str) -> dict:
+    """Name the records of a sync result as node_dict or poi_dict, with zone_dict first"""
+    renamed = {}
+    if "zone_dict" in sync_result:
+        renamed["zone_dict"] = sync_result["zone_dict"]
+        renamed[record_key] = sync_result["record_dict"]
+    renamed.update({key: value for key, value in sync_result.items() if key not in ("zone_dict", "record_dict")})
+    return renamed
+
+
+def calc_haversine_distance(o_x: np.ndarray, o_y: np.ndarray, d_x: np.ndarray, d_y: np.ndarray) -> np.ndarray:
+    """Calculate the great-circle distance (km) between origin and destination points element-wise
+
+    Inputs are broadcast against each other, e.g. o_x[k], o_y[k] to d_x[k], d_y[k] for arrays of the same length.
+    """
+    o_lng, o_lat = np.radians(np.asarray(o_x, dtype=np.float64)), np.radians(np.asarray(o_y, dtype=np.float64))
+    d_lng, d_lat = np.radians(np.asarray(d_x, dtype=np.float64)), np.radians(np.asarray(d_y, dtype=np.float64))
+    hav = np.sin((d_lat - o_lat) / 2) ** 2 + np.cos(o_lat) * np.cos(d_lat) * np.sin((d_lng - o_lng) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(hav, 0, 1)))
+
+
+def calc_haversine_matrix(o_x: np.ndarray, o_y: np.ndarray, d_x: np.ndarray, d_y: np.ndarray,
+                          dtype: type = np.float64, chunk_size: int = 0) -> np.ndarray:
+    """Calculate the great-circle distance (km) between every origin and destination point
+
+    The matrix is computed by NumPy broadcasting, block by block of origin rows to bound the memory of
+    temporary arrays.
+
+    Args:
+        o_x (np.ndarray): longitude of origins
+        o_y (np.ndarray): latitude of origins
+        d_x (np.ndarray): longitude of destinations
+        d_y (np.ndarray): latitude of destinations
+        dtype (type, optional): dtype of the returned matrix, np.float64 or np.float32. Defaults to np.float64.
+        chunk_size (int, optional): number of origin rows per block. Defaults to 0,
+            blocks of about 4M matrix cells.
+
+    Returns:
+        np.ndarray: distance matrix in km, shape (len(o_x), len(d_x))
+    """
+    o_lng, o_lat = np.radians(np.asarray(o_x, dtype=np.float64)), np.radians(np.asarray(o_y, dtype=np.float64))
+    d_lng, d_lat = np.radians(np.asarray(d_x, dtype=np.float64)), np.radians(np.asarray(d_y, dtype=np.float64))
+    cos_d_lat = np.cos(d_lat)
+
+    dist_km = np.empty((len(o_lng), len(d_lng)), dtype=dtype)
+    chunk_size = chunk_size or max(1, (1 << 22) // max(1, len(d_lng)))
+
+    for start in range(0, len(o_lng), chunk_size):
+        end = min(start + chunk_size, len(o_lng))
+        hav = (np.sin((d_lat[None, :] - o_lat[start:end, None]) / 2) ** 2
+               + np.cos(o_lat[start:end, None]) * cos_d_lat[None, :]
+               * np.sin((d_lng[None, :] - o_lng[start:end, None]) / 2) ** 2)
+        dist_km[start:end] = 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(hav, 0, 1)))
+
+    return dist_km
+
+
+def calc_haversine_pairs(o_x: np.ndarray, o_y: np.ndarray, d_x: np.ndarray, d_y: np.ndarray,
+                         max_dist_km: float = None, chunk_size: int = 0) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Calculate the great-circle distance (km) of origin-destination pairs within max_dist_km
+
+    Distances are computed block by block of origin rows by calc_haversine_matrix, only pairs within
+    max_dist_km are kept, so the memory is bounded by one block and the kept pairs.
+
+    Args:
+        o_x (np.ndarray): longitude of origins
+        o_y (np.ndarray): latitude of origins
+        d_x (np.ndarray): longitude of destinations
+        d_y (np.ndarray): latitude of destinations
+        max_dist_km (float, optional): distance cutoff in km, None for all pairs. Defaults to None.
+        chunk_size (int, optional): number of origin rows per block. Defaults to 0,
+            blocks of about 4M pairs.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray, np.ndarray]: origin index, destination index and distance of pairs,
+            in row-major order
+    """
+    o_x, o_y = np.asarray(o_x, dtype=np.float64), np.asarray(o_y, dtype=np.float64)
+    chunk_size = chunk_size or max(1, (1 << 22) // max(1, len(d_x)))
+
+    o_idx_lst, d_idx_lst, dist_lst = [], [], []
+    for start in range(0, len(o_x), chunk_size):
+        end = min(start + chunk_size, len(o_x))
+        dist_km = calc_haversine_matrix(o_x[start:end], o_y[start:end], d_x, d_y, chunk_size=end - start)
+        o_idx, d_idx = np.nonzero(dist_km <= max_dist_km) if max_dist_km is not None else \
+            np.indices(dist_km.shape).reshape(2, -1)
+        o_idx_lst.append(o_idx + start)
+        d_idx_lst.append(d_idx)
+        dist_lst.append(dist_km[o_idx, d_idx])
+
+    if not dist_lst:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64), np.zeros(0)
+    return (np.concatenate(o_idx_lst).astype(np.int64), np.concatenate(d_idx_lst).astype(np.int64),
+            np.concatenate(dist_lst))
 
 
 # Main functions
@@ -144,7 +448,8 @@ def net2zone(node_dict: dict[int, Node],
              cell_width: float = 0,
              cell_height: float = 0,
              unit: str = "km",
-             verbose: bool = False) -> dict[str, Zone]:
+             verbose: bool = False,
+             return_lattice: bool = False) -> dict[str, Zone]:
     """convert node_dict to zone_dict by grid.
     The grid can be defined by num_x_blocks and num_y_blocks, or cell_width and cell_height.
     if num_x_blocks and num_y_blocks are specified, the grid will be divided into num_x_blocks * num_y_blocks.
@@ -161,12 +466,15 @@ def net2zone(node_dict: dict[int, Node],
         unit (str, optional): the unit of cell_width and cell_height. Defaults to "km". Options:"meter", "km", "mile".
         use_zone_id (bool, optional): whether to use zone_id in node_dict. Defaults to False.
         verbose (bool, optional): print processing information. Defaults to False.
+        return_lattice (bool, optional): also return the ZoneLattice of grid zone cells,
+            for fast node/poi synchronization by coordinates. Defaults to False.
 
     Raises
         ValueError: Please provide num_x_blocks and num_y_blocks or cell_width and cell_height
 
     Returns
         Zone: dictionary, Zone cells with keys are zone names, values are Zone
+            if return_lattice is True, {"zone_dict": zone_dict, "lattice": ZoneLattice}
 
     Examples:
         >>> zone_dict = net2zone(node_dict, num_x_blocks=10, num_y_blocks=10)
@@ -311,6 +619,17 @@ def net2zone(node_dict: dict[int, Node],
             # update zone id
             zone_id_flag += 1
 
+    # lattice of grid zone cells, zone cells are in row-major order from north to south
+    zone_lattice = ZoneLattice(x_min=coord_x_min,
+                               y_min=coord_y_min,
+                               x_block_width=x_block_width,
+                               y_block_height=y_block_height,
+                               num_x_blocks=len(x_block_minmax_list),
+                               num_y_blocks=len(y_block_minmax_list),
+                               x_edges=np.array(x_block_min_lst + [coord_x_max]),
+                               y_edges=np.array(y_block_min_lst + [coord_y_max]),
+                               zone_names=list(zone_dict))
+
     # generate outside boundary centroids
     upper_points = [shapely.geometry.Point(zone_dict[zone_name].x_coord,
                                            zone_dict[zone_name].y_coord + y_block_height
@@ -340,245 +659,253 @@ def net2zone(node_dict: dict[int, Node],
         print(
             f"  : Successfully generated zone dictionary: {len(zone_dict) - 4 * len(zone_upper_row)} Zones generated,")
         print(f"  : plus {4 * len(zone_upper_row)} boundary gates (points)")
+
+    if return_lattice:
+        return {"zone_dict": zone_dict, "lattice": zone_lattice}
     return zone_dict
 
 
 @func_running_time
-def sync_zone_geometry_and_node(zone_dict: dict, node_dict: dict, cpu_cores: int = 1, verbose: bool = False) -> dict:
+def sync_zone_geometry_and_node(zone_dict: dict, node_dict: dict, cpu_cores: int = 1, verbose: bool = False,
+                                mode: str = "copy_on_write") -> dict:
     """Map nodes to zone cells
 
     Parameters
         node_dict: dict, Nodes
         zone_dict: dict, zone cells
+        cpu_cores: int, not used, kept for compatibility. All nodes are mapped in one STRtree query.
+        mode: str, "copy_on_write" (default) returns new dicts sharing unchanged nodes and zones with the inputs,
+            "inplace" updates and returns the input dicts, "assignment" leaves the input dicts untouched and
+            returns only the zone assignment.
 
     Returns
         node_dict and zone_dict: dict, Update Nodes with zone id, update zone cells with node id list
+            (not for mode "assignment"), plus zone_assignment: pd.DataFrame [id, zone_id, zone_name]
 
     """
-    # Create a pool of worker processes
     if verbose:
-        print(f"  : Parallel synchronizing Nodes and Zones using Pool with {cpu_cores} CPUs. Please wait...")
+        print("  : Synchronizing Nodes and Zones using STRtree of zone geometries. Please wait...")
 
-    # create deepcopy of zone_dict and node_dict to avoid modifying the original dict
-    zone_cp = copy.deepcopy(zone_dict)
-    node_cp = copy.deepcopy(node_dict)
+    sync_result = _sync_zones_geometry_with_records(zone_dict, node_dict, "node_id_list", mode)
 
-    # Prepare arguments for the pool
-    args_list = [(node_id, node.as_dict(), zone_cp)
-                 for node_id, node in node_cp.items()]
+    if verbose:
+        print("  : Successfully synchronized zone and node geometry")
 
-    with Pool(processes=cpu_cores) as pool:
-        results = list(tqdm(pool.map(_sync_zones_geometry_with_node, args_list), total=len(args_list)))
-        pool.close()
-        pool.join()
-    # results = process_map(_sync_zones_geometry_with_node, args_list, workers=cpu_cores)
+    return _rename_sync_result(sync_result, "node_dict")
 
-    # Gather results
-    for node_id, node, zone_name in results:
-        if zone_name is not None:
-            zone_cp[zone_name].node_id_list.append(node_id)
-        node_cp[node_id] = node
+
+@func_running_time
+def sync_zone_lattice_and_node(zone_dict: dict, node_dict: dict, zone_lattice: ZoneLattice,
+                               verbose: bool = False, mode: str = "copy_on_write") -> dict:
+    """Map nodes to grid zone cells generated by net2zone, by floor division on node coordinates
+
+    Args:
+        zone_dict (dict): Zone cells generated by net2zone
+        node_dict (dict): Nodes
+        zone_lattice (ZoneLattice): the lattice returned by net2zone(..., return_lattice=True)
+        verbose (bool, optional): print processing information. Defaults to False.
+        mode (str, optional): "copy_on_write" returns new dicts sharing unchanged nodes and zones with the inputs,
+            "inplace" updates and returns the input dicts, "assignment" leaves the input dicts untouched and
+            returns only the zone assignment. Defaults to "copy_on_write".
+
+    Returns:
+        dict: the updated zone_dict and node_dict (not for mode "assignment"),
+            plus "zone_assignment": pd.DataFrame [id, zone_id, zone_name] of nodes within zones
+    """
+    if verbose:
+        print("  : Synchronizing Nodes and grid Zones by coordinates. Please wait...")
+
+    sync_result = _sync_zones_lattice_with_records(zone_dict, node_dict, zone_lattice, "node_id_list", mode)
 
     if verbose:
         print("  : Successfully synchronized zone and node geometry")
 
-    return {"zone_dict": zone_cp, "node_dict": node_cp}
+    return _rename_sync_result(sync_result, "node_dict")
 
 
-def sync_zone_centroid_and_node(zone_dict: dict, node_dict: dict, verbose: bool = False) -> dict:
+@func_running_time
+def sync_zone_centroid_and_node(zone_dict: dict, node_dict: dict, verbose: bool = False,
+                                max_distance_km: float = None, k_nearest: int = 1,
+                                mode: str = "copy_on_write") -> dict:
     """Synchronize zone in centroids and nodes to update zone_id attribute for nodes
 
+    Each node is assigned to the nearest zone centroid. All nodes are matched in one query
+    on a STRtree of zone centroids, with distances measured in km.
+
     Args:
         zone_dict (dict): Zone cells
         node_dict (dict): Nodes
+        verbose (bool, optional): print processing information. Defaults to False.
+        max_distance_km (float, optional): nodes farther than this from every zone centroid
+            are not assigned to any zone. Defaults to None, no limit.
+        k_nearest (int, optional): if greater than 1, also return the k nearest zones of each node
+            for diagnostics, e.g. nodes almost equally near to two zones. Defaults to 1.
+        mode (str, optional): "copy_on_write" returns new dicts sharing unchanged nodes and zones with the inputs,
+            "inplace" updates and returns the input dicts, "assignment" leaves the input dicts untouched and
+            returns only the zone assignment. Defaults to "copy_on_write".
 
     Returns:
-        dict: the updated zone_dict and node_dict
+        dict: the updated zone_dict and node_dict (not for mode "assignment"),
+            plus "zone_assignment": pd.DataFrame [id, zone_id, zone_name] of nodes within zones,
+            plus "k_nearest_zone": pd.DataFrame [id, rank, zone_id, zone_name, dist_km] if k_nearest > 1
 
     """
+    if verbose:
+        print("  : Synchronizing Nodes and Zones using STRtree of zone centroids. Please wait...")
 
-    # node_point_id = {
-    #     shapely.geometry.Point(
-    #         node_dict[node_id].x_coord, node_dict[node_id].x_coord
-    #     ): node_id
-    #     for node_id in node_dict
-    # }
-
-    # Deepcopy the dictionary
-    zone_cp = copy.deepcopy(zone_dict)
-    node_cp = copy.deepcopy(node_dict)
-
-    # Create zone_point_id dictionary
-    zone_point_id = {
-        shapely.geometry.Point(
-            zone_cp[zone_id].x_coord, zone_cp[zone_id].y_coord
-        ): zone_id
-        for zone_id in zone_cp
-    }
-
-    # create multipoint object for zone centroids
-    multipoint_zone = shapely.geometry.MultiPoint(
-        [shapely.geometry.Point(zone_cp[i].x_coord, zone_cp[i].y_coord) for i in zone_cp])
-
-    # Prepare data for multiprocessing
-    args = [(node_id, node.as_dict(), multipoint_zone, zone_point_id) for node_id, node in node_cp.items()]
-
-    cpu_cores = pkg_settings["set_cpu_cores"]
-
-    with Pool(cpu_cores) as pool:
-        results = list(tqdm(pool.imap(_sync_zones_centroid_with_node, args), total=len(node_cp)))
-        pool.close()
-        pool.join()
-
-    # Update zone_cp with the results
-    for node_id, zone_id in results:
-        node_cp[node_id].zone_id = zone_id
-        zone_cp[zone_id].node_id_list.append(node_id)
-
-    # flag = 0
-    # for node_id, node in tqdm(node_cp.items()):
-    #     if flag + 1 % 1000 == 0:
-    #         print(f"Processing node {flag + 1}/{len(node_cp)}")
-    #     node_point = shapely.geometry.Point(node.x_coord, node.y_coord)
-    #     closest_zone_point = find_closest_point(node_point, multipoint_zone)[0]
-    #     zone_id = zone_point_id[closest_zone_point]
-    #     node.zone_id = zone_id
-    #     zone_cp[zone_id].node_id_list.append(node_id)
+    sync_result = _sync_zones_centroid_with_records(zone_dict, node_dict, "node_id_list", max_distance_km, k_nearest,
+                                                    mode)
 
     if verbose:
         print("  : Successfully synchronized zone and node geometry")
 
-    return {"zone_dict": zone_cp, "node_dict": node_cp}
+    return _rename_sync_result(sync_result, "node_dict")
 
 
 @func_running_time
-def sync_zone_geometry_and_poi(zone_dict: dict, poi_dict: dict, cpu_cores: int = 1, verbose: bool = False) -> dict:
+def sync_zone_geometry_and_poi(zone_dict: dict, poi_dict: dict, cpu_cores: int = 1, verbose: bool = False,
+                               mode: str = "copy_on_write") -> dict:
     """Synchronize zone cells and POIs to update zone_id attribute for POIs and poi_id_list attribute for zone cells
 
+    A POI belongs to the zone its centroid lies within.
+
     Args:
         zone_dict (dict): Zone cells
         poi_dict (dict): POIs
+        cpu_cores (int, optional): not used, kept for compatibility. Defaults to 1.
+        mode (str, optional): "copy_on_write" returns new dicts sharing unchanged POIs and zones with the inputs,
+            "inplace" updates and returns the input dicts, "assignment" leaves the input dicts untouched and
+            returns only the zone assignment. Defaults to "copy_on_write".
 
     Returns:
-        dict: the updated zone_dict and poi_dict
+        dict: the updated zone_dict and poi_dict (not for mode "assignment"),
+            plus "zone_assignment": pd.DataFrame [id, zone_id, zone_name] of POIs within zones
     """
 
-    # Create a pool of worker processes
     if verbose:
-        print(f"  : Parallel synchronizing POIs and Zones using Pool with {cpu_cores} CPUs. Please wait...")
-
-    # create deepcopy of zone_dict and poi_dict to avoid modifying the original dict
-    zone_cp = copy.deepcopy(zone_dict)
-    poi_cp = copy.deepcopy(poi_dict)
-
-    # Prepare arguments for the pool
-    args_list = [(poi_id, poi.as_dict(), zone_cp) for poi_id, poi in poi_cp.items()]
-
-    with Pool(processes=cpu_cores) as pool:
-        # Distribute work to the pool
-        results = list(tqdm(pool.map(_sync_zones_geometry_with_poi, args_list), total=len(args_list)))
-        pool.close()
-        pool.join()
-
-    # results = process_map(_sync_zones_geometry_with_poi, args_list)
+        print("  : Synchronizing POIs and Zones using STRtree of zone geometries. Please wait...")
 
-    # Gather results
-    for poi_id, poi, zone_name in results:
-        if zone_name is not None:
-            zone_cp[zone_name].poi_id_list.append(poi_id)
-        poi_cp[poi_id] = poi
+    sync_result = _sync_zones_geometry_with_records(zone_dict, poi_dict, "poi_id_list", mode)
 
     if verbose:
         print("  : Successfully synchronized zone and poi geometry")
-    return {"zone_dict": zone_cp, "poi_dict": poi_cp}
+    return _rename_sync_result(sync_result, "poi_dict")
 
 
-def sync_zone_centroid_and_poi(zone_dict: dict, poi_dict: dict, verbose: bool = False) -> dict:
-    """Synchronize zone in centroids and nodes to update zone_id attribute for nodes
+@func_running_time
+def sync_zone_lattice_and_poi(zone_dict: dict, poi_dict: dict, zone_lattice: ZoneLattice,
+                              verbose: bool = False, mode: str = "copy_on_write") -> dict:
+    """Map POIs to grid zone cells generated by net2zone, by floor division on POI centroid coordinates
 
     Args:
-        zone_dict (dict): Zone cells
-        node_dict (dict): Nodes
+        zone_dict (dict): Zone cells generated by net2zone
+        poi_dict (dict): POIs
+        zone_lattice (ZoneLattice): the lattice returned by net2zone(..., return_lattice=True)
+        verbose (bool, optional): print processing information. Defaults to False.
+        mode (str, optional): "copy_on_write" returns new dicts sharing unchanged POIs and zones with the inputs,
+            "inplace" updates and returns the input dicts, "assignment" leaves the input dicts untouched and
+            returns only the zone assignment. Defaults to "copy_on_write".
 
     Returns:
-        dict: the updated zone_dict and node_dict
-
+        dict: the updated zone_dict and poi_dict (not for mode "assignment"),
+            plus "zone_assignment": pd.DataFrame [id, zone_id, zone_name] of POIs within zones
     """
+    if verbose:
+        print("  : Synchronizing POIs and grid Zones by coordinates. Please wait...")
+
+    sync_result = _sync_zones_lattice_with_records(zone_dict, poi_dict, zone_lattice, "poi_id_list", mode)
+
+    if verbose:
+        print("  : Successfully synchronized zone and poi geometry")
+    return _rename_sync_result(sync_result, "poi_dict")
 
-    zone_cp = copy.deepcopy(zone_dict)
-    poi_cp = copy.deepcopy(poi_dict)
 
-    zone_point_id = {
-        shapely.geometry.Point(
-            zone_cp[zone_id].x_coord, zone_cp[zone_id].y_coord
-        ): zone_id
-        for zone_id in zone_cp
-    }
+@func_running_time
+def sync_zone_centroid_and_poi(zone_dict: dict, poi_dict: dict, verbose: bool = False,
+                               max_distance_km: float = None, k_nearest: int = 1,
+                               mode: str = "copy_on_write") -> dict:
+    """Synchronize zone in centroids and POIs to update zone_id attribute for POIs
 
-    multipoint_zone = shapely.geometry.MultiPoint(
-        [shapely.geometry.Point(zone_cp[i].x_coord, zone_cp[i].y_coord) for i in zone_cp])
+    Each POI is assigned to the nearest zone centroid. All POIs are matched in one query
+    on a STRtree of zone centroids, with distances measured in km.
 
-    # Prepare data for multiprocessing
-    args = [(poi_id, poi.as_dict(), multipoint_zone, zone_point_id) for poi_id, poi in poi_cp.items()]
-    cpu_cores = pkg_settings["set_cpu_cores"]
+    Args:
+        zone_dict (dict): Zone cells
+        poi_dict (dict): POIs
+        verbose (bool, optional): print processing information. Defaults to False.
+        max_distance_km (float, optional): POIs farther than this from every zone centroid
+            are not assigned to any zone. Defaults to None, no limit.
+        k_nearest (int, optional): if greater than 1, also return the k nearest zones of each POI
+            for diagnostics. Defaults to 1.
+        mode (str, optional): "copy_on_write" returns new dicts sharing unchanged POIs and zones with the inputs,
+            "inplace" updates and returns the input dicts, "assignment" leaves the input dicts untouched and
+            returns only the zone assignment. Defaults to "copy_on_write".
 
-    with Pool(cpu_cores) as pool:
-        results = list(tqdm(pool.imap(_sync_zones_centroid_with_poi, args), total=len(poi_cp)))
-        pool.close()
-        pool.join()
+    Returns:
+        dict: the updated zone_dict and poi_dict (not for mode "assignment"),
+            plus "zone_assignment": pd.DataFrame [id, zone_id, zone_name] of POIs within zones,
+            plus "k_nearest_zone": pd.DataFrame [id, rank, zone_id, zone_name, dist_km] if k_nearest > 1
 
-    # Update zone_cp with the results
-    for poi_id, zone_id in results:
-        poi_cp[poi_id].zone_id = zone_id
-        zone_cp[zone_id].poi_id_list.append(poi_id)
+    """
+    if verbose:
+        print("  : Synchronizing POIs and Zones using STRtree of zone centroids. Please wait...")
 
-    # for poi_id, poi in tqdm(poi_cp.items()):
-    #     poi_point = shapely.geometry.Point(poi.x_coord, poi.y_coord)
-    #     closest_zone_point = find_closest_point(poi_point, multipoint_zone)[0]
-    #     zone_id = zone_point_id[closest_zone_point]
-    #     poi.zone_id = zone_id
-    #     zone_cp[zone_id].poi_id_list.append(poi_id)
+    sync_result = _sync_zones_centroid_with_records(zone_dict, poi_dict, "poi_id_list", max_distance_km, k_nearest,
+                                                    mode)
 
     if verbose:
         print("  : Successfully synchronized zone and poi geometry")
 
-    return {"zone_dict": zone_cp, "poi_dict": poi_cp}
+    return _rename_sync_result(sync_result, "poi_dict")
 
 
 @func_running_time
-def calc_zone_od_matrix(zone_dict: dict, cpu_cores: int = 1, verbose: bool = False) -> dict[tuple[str, str], dict]:
+def calc_zone_od_matrix(zone_dict: dict, cpu_cores: int = 1, verbose: bool = False,
+                        dtype: type = np.float64, chunk_size: int = 0,
+                        return_dict: bool = False,
+                        sparse: bool = False,
+                        max_dist_km: float = None) -> ODMatrix | SparseODMatrix | dict[tuple[str, str], dict]:
     """Calculate the zone-to-zone distance matrix
 
+    Distances between zone centroids are great-circle distances in km, computed in one vectorized pass.
+
     Args:
         zone_dict (dict): Zone cells
+        cpu_cores (int, optional): not used, kept for compatibility. Defaults to 1.
+        verbose (bool, optional): print processing information. Defaults to False.
+        dtype (type, optional): dtype of the distance matrix, np.float64 or np.float32. Defaults to np.float64.
+        chunk_size (int, optional): number of origin zones per block of computation. Defaults to 0, auto.
+        return_dict (bool, optional): return the legacy dict
+            {(o_zone_name, d_zone_name): {o_zone_id, o_zone_name, d_zone_id, d_zone_name, dist_km, volume, geometry}}
+            instead of an ODMatrix. Defaults to False.
+        sparse (bool, optional): return a SparseODMatrix of OD pairs, without the dense matrix. Defaults to False.
+        max_dist_km (float, optional): keep only OD pairs within this distance (km) in the sparse matrix,
+            implies sparse. Defaults to None, all pairs.
 
     Returns:
-        dict: the zone-to-zone distance matrix
+        ODMatrix | SparseODMatrix: the zone-to-zone distance matrix, zones in the order of zone_dict
     """
 
-    # convert zone_dict to dataframe
-    df_zone = pd.DataFrame(zone_dict.values())
-
-    # convert centroid from str to shapely.geometry.Point
-    if isinstance(df_zone.loc[0, 'centroid'], str):
-        df_zone['centroid'] = df_zone["centroid"].apply(shapely.from_wkt)
-
-    len_df_zone = len(df_zone)
-
-    # Prepare arguments for the pool
     if verbose:
-        print(f"  : Parallel calculating zone-to-zone distance matrix using Pool with {cpu_cores} CPUs. Please wait...")
-    args_list = [(i, j, df_zone) for i, j in itertools.product(range(len_df_zone), range(len_df_zone))]
-
-    with Pool(processes=cpu_cores) as pool:
-        # Distribute work to the pool
-        results = list(tqdm(pool.imap(_distance_calculation, args_list), total=len(args_list)))
-        pool.close()
-        pool.join()
-
-    # Gather results
-    dist_dict = dict(results)
+        print("  : Calculating zone-to-zone distance matrix. Please wait...")
+
+    zone_names = list(zone_dict)
+    x_coord = np.array([zone_dict[zone_name].x_coord for zone_name in zone_names], dtype=np.float64)
+    y_coord = np.array([zone_dict[zone_name].y_coord for zone_name in zone_names], dtype=np.float64)
+    zone_info = {"zone_id": np.array([zone_dict[zone_name].id for zone_name in zone_names]),
+                 "zone_name": np.array([zone_dict[zone_name].name for zone_name in zone_names], dtype=object),
+                 "x_coord": x_coord,
+                 "y_coord": y_coord}
+
+    if sparse or max_dist_km is not None:
+        o_idx, d_idx, dist_km = calc_haversine_pairs(x_coord, y_coord, x_coord, y_coord, max_dist_km, chunk_size)
+        od_matrix = SparseODMatrix(**zone_info, o_idx=o_idx, d_idx=d_idx, dist_km=dist_km.astype(dtype))
+        if verbose:
+            print(f"  : Successfully calculated {od_matrix.nnz} zone-to-zone distances")
+    else:
+        od_matrix = ODMatrix(**zone_info,
+                             dist_km=calc_haversine_matrix(x_coord, y_coord, x_coord, y_coord, dtype, chunk_size))
+        if verbose:
+            print("  : Successfully calculated zone-to-zone distance matrix")
 
-    if verbose:
-        print("  : Successfully calculated zone-to-zone distance matrix")
-    return dist_dict
+    return od_matrix.to_dict() if return_dict else od_matrix
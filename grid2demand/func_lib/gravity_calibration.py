@@ -0,0 +1,256 @@
+# -*- coding:utf-8 -*-
+##############################################################
+# Created Date: Saturday, October 17th 2026
+# Contact Info: luoxiangyong01@gmail.com
+# Author/Copyright: Mr. Xiangyong Luo
+##############################################################
+
+import numpy as np
+import pandas as pd
+
+from grid2demand.func_lib.gravity_model import prepare_gravity_pairs
+from grid2demand.utils_lib.net_utils import ODMatrix, SparseODMatrix
+from grid2demand.utils_lib.pkg_settings import pkg_settings
+
+
+def calc_trip_length_distribution(zone_od_matrix: ODMatrix | SparseODMatrix, dist_bins: list) -> pd.DataFrame:
+    """Trip length frequency distribution (TLFD) of the OD volumes
+
+    Args:
+        zone_od_matrix (ODMatrix | SparseODMatrix): od matrix with dist_km and volume, e.g. from run_gravity_model
+        dist_bins (list): edges of distance bins in km, e.g. [0, 1, 2, 5, 10, 20, 50]
+
+    Returns:
+        pd.DataFrame: [from_dist_km, to_dist_km, trips, share], share of trips within the bins
+    """
+    dist_bins = np.asarray(dist_bins, dtype=np.float64)
+    dist_km = np.asarray(zone_od_matrix.dist_km, dtype=np.float64).ravel()
+    volume = np.asarray(zone_od_matrix.volume, dtype=np.float64).ravel()
+
+    is_valid = np.isfinite(dist_km) & np.isfinite(volume)
+    trips = np.histogram(dist_km[is_valid], bins=dist_bins, weights=volume[is_valid])[0]
+    return pd.DataFrame({"from_dist_km": dist_bins[:-1],
+                         "to_dist_km": dist_bins[1:],
+                         "trips": trips,
+                         "share": trips / trips.sum() if trips.sum() > 0 else np.zeros(len(trips))})
+
+
+def _calc_volume_and_jacobian(pairs: dict, beta: float, gamma: float) -> tuple[np.ndarray, np.ndarray]:
+    """Production-constrained OD volumes of pairs and their derivatives with respect to (beta, gamma)
+
+    With friction exp(beta * ln(d) + gamma * d), volume[ij] = P[i] * w[ij], w[ij] = A[j] f[ij] / sum_k A[k] f[ik].
+    dvolume[ij] / dbeta = volume[ij] * (ln(d[ij]) - sum_k w[ik] ln(d[ik])), same for gamma with d.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: volume of pairs, and its jacobian of shape (pairs, 2)
+    """
+    log_dist, dist_km = pairs["log_dist"], pairs["dist_km"]
+    row_start, row_count = pairs["row_start"], pairs["row_count"]
+
+    weight = np.exp(beta * log_dist + gamma * dist_km)
+    weight *= pairs["attraction"][pairs["d_idx"]]
+    row_sum = np.add.reduceat(weight, row_start) if len(row_start) else np.zeros(0)
+    weight *= np.repeat(np.divide(1, row_sum, out=np.zeros_like(row_sum), where=row_sum > 0), row_count)
+
+    volume = weight * np.repeat(pairs["production"][pairs["row_zone"]], row_count)
+    jacobian = np.empty((len(volume), 2))
+    for k, feature in enumerate([log_dist, dist_km]):
+        row_mean = np.add.reduceat(weight * feature, row_start) if len(row_start) else np.zeros(0)
+        jacobian[:, k] = volume * (feature - np.repeat(row_mean, row_count))
+    return volume, jacobian
+
+
+def _calc_tlfd_residual(pairs: dict, beta: float, gamma: float) -> tuple[np.ndarray, np.ndarray]:
+    """Residuals of modeled minus target TLFD shares, and their jacobian of shape (bins, 2)"""
+    volume, jacobian = _calc_volume_and_jacobian(pairs, beta, gamma)
+    pair_bin, num_bin = pairs["pair_bin"], len(pairs["target"])
+
+    trips = np.bincount(pair_bin, weights=volume, minlength=num_bin + 1)[:num_bin]
+    trips_jacobian = np.stack([np.bincount(pair_bin, weights=jacobian[:, k], minlength=num_bin + 1)[:num_bin]
+                               for k in range(2)], axis=1)
+    total = trips.sum()
+    if total <= 0:
+        return np.full(num_bin, np.nan), np.zeros((num_bin, 2))
+
+    # share = trips / total, d share = (d trips - share * d total) / total
+    share = trips / total
+    share_jacobian = (trips_jacobian - share[:, None] * trips_jacobian.sum(axis=0)[None, :]) / total
+    return share - pairs["target"], share_jacobian
+
+
+def _calc_od_count_residual(pairs: dict, beta: float, gamma: float) -> tuple[np.ndarray, np.ndarray]:
+    """Residuals of modeled minus observed volumes of counted OD pairs, and their jacobian"""
+    volume, jacobian = _calc_volume_and_jacobian(pairs, beta, gamma)
+    count_pos = pairs["count_pos"]
+
+    # counted pairs without positive distance have no modeled volume
+    is_modeled = count_pos >= 0
+    residual = -pairs["target"].copy()
+    residual[is_modeled] += volume[count_pos[is_modeled]]
+    residual_jacobian = np.zeros((len(count_pos), 2))
+    residual_jacobian[is_modeled] = jacobian[count_pos[is_modeled]]
+    return residual, residual_jacobian
+
+
+def _minimize_bounded_least_squares(calc_residual, x0: np.ndarray, bounds: np.ndarray,
+                                    tol: float = 1e-10, max_iter: int = 100) -> dict:
+    """Minimize 0.5 * sum(residual ** 2) within bounds by Levenberg-Marquardt with projected steps
+
+    Args:
+        calc_residual (Callable): x -> (residual, jacobian)
+        x0 (np.ndarray): initial parameters
+        bounds (np.ndarray): shape (len(x0), 2), lower and upper bounds
+        tol (float, optional): stop when the relative decrease of the objective or the projected gradient
+            is below tol. Defaults to 1e-10.
+        max_iter (int, optional): max number of accepted or rejected steps. Defaults to 100.
+
+    Returns:
+        dict: {"x", "objective", "iterations", "converged"}
+    """
+    x = np.clip(np.asarray(x0, dtype=np.float64), bounds[:, 0], bounds[:, 1])
+    residual, jacobian = calc_residual(x)
+    objective = 0.5 * float(residual @ residual)
+    damping, converged, iteration = 1e-3, False, 0
+
+    for iteration in range(1, max_iter + 1):
+        gradient = jacobian.T @ residual
+
+        # gradient projected on the bounds: components pushing out of an active bound are zero
+        projected = np.where(((x <= bounds[:, 0]) & (gradient > 0)) | ((x >= bounds[:, 1]) & (gradient < 0)),
+                             0, gradient)
+        if np.abs(projected).max(initial=0) <= tol * max(objective, 1e-300) ** 0.5:
+            converged = True
+            break
+
+        hessian = jacobian.T @ jacobian
+        step = np.linalg.solve(hessian + damping * np.diag(np.maximum(np.diag(hessian), 1e-12)), -gradient)
+        x_new = np.clip(x + step, bounds[:, 0], bounds[:, 1])
+        residual_new, jacobian_new = calc_residual(x_new)
+        objective_new = 0.5 * float(residual_new @ residual_new)
+
+        if np.isfinite(objective_new) and objective_new <= objective:
+            decrease = objective - objective_new
+            x, residual, jacobian, objective = x_new, residual_new, jacobian_new, objective_new
+            damping = max(damping / 10, 1e-12)
+            if decrease <= tol * max(objective, 1e-300):
+                converged = True
+                break
+        else:
+            damping *= 10
+            if damping > 1e12:
+                converged = True
+                break
+
+    return {"x": x, "objective": objective, "iterations": iteration, "converged": converged}
+
+
+def calibrate_gravity_model(zone_dict: dict,
+                            zone_od_dist_matrix: ODMatrix | SparseODMatrix,
+                            *,
+                            target_tlfd: pd.DataFrame = None,
+                            od_counts: pd.DataFrame = None,
+                            trip_purpose: int = 1,
+                            beta_bounds: tuple = (-3.0, 0.0),
+                            gamma_bounds: tuple = (-1.0, 0.0),
+                            init_params: tuple = None,
+                            tol: float = 1e-10,
+                            max_iter: int = 100,
+                            update_settings: bool = True,
+                            verbose: bool = False) -> dict:
+    """Fit beta and gamma of the production-constrained gravity model to a target TLFD or to OD counts
+
+    Friction is alpha * d^beta * exp(gamma * d). The objective is the sum of squared differences between
+    modeled and target trip length shares (target_tlfd) or between modeled and observed OD volumes
+    (od_counts), evaluated in vectorized form over all OD pairs with distance > 0. It is minimized within
+    the bounds by Levenberg-Marquardt with the analytic jacobian of the gravity model. alpha cancels out
+    in the production-constrained model and is not fitted.
+
+    Args:
+        zone_dict (dict): dictionary of zone objects, with production and attraction
+        zone_od_dist_matrix (ODMatrix | SparseODMatrix): zone od distance matrix from calc_zone_od_matrix
+        target_tlfd (pd.DataFrame, optional): [from_dist_km, to_dist_km, trips] (or share) of distance bins,
+            e.g. from a household survey. Defaults to None.
+        od_counts (pd.DataFrame, optional): observed [o_zone_name, d_zone_name, volume] (or o_zone_id,
+            d_zone_id), same columns as demand.csv. Defaults to None.
+        trip_purpose (int, optional): trip purpose in pkg_settings["trip_purpose_dict"], its beta and gamma
+            are the initial values and are updated if update_settings. Defaults to 1.
+        beta_bounds (tuple, optional): bounds of beta. Defaults to (-3.0, 0.0).
+        gamma_bounds (tuple, optional): bounds of gamma, 1/km. Defaults to (-1.0, 0.0).
+        init_params (tuple, optional): initial (beta, gamma). Defaults to None, from trip_purpose_dict.
+        tol (float, optional): convergence tolerance. Defaults to 1e-10.
+        max_iter (int, optional): max iterations. Defaults to 100.
+        update_settings (bool, optional): write the fitted beta and gamma into
+            pkg_settings["trip_purpose_dict"][trip_purpose]. Defaults to True.
+        verbose (bool, optional): print processing information. Defaults to False.
+
+    Raises:
+        ValueError: none or both of target_tlfd and od_counts, or counted zones not in the matrix
+
+    Returns:
+        dict: {"alpha", "beta", "gamma", "objective", "iterations", "converged",
+            "tlfd": pd.DataFrame [from_dist_km, to_dist_km, target_share, model_share] (target_tlfd only)}
+    """
+    if (target_tlfd is None) == (od_counts is None):
+        raise ValueError("Error: specify one of target_tlfd and od_counts for calibration.")
+
+    trip_purpose_dict = pkg_settings["trip_purpose_dict"]
+    default_params = trip_purpose_dict.get(trip_purpose, {"alpha": 28507, "beta": -0.02, "gamma": -0.123})
+    if init_params is None:
+        init_params = (default_params["beta"], default_params["gamma"])
+
+    pairs = prepare_gravity_pairs(zone_dict, zone_od_dist_matrix)
+    if target_tlfd is not None:
+        dist_bins = np.append(target_tlfd["from_dist_km"].to_numpy(dtype=np.float64),
+                              target_tlfd["to_dist_km"].to_numpy(dtype=np.float64)[-1])
+        target = target_tlfd["trips" if "trips" in target_tlfd.columns else "share"].to_numpy(dtype=np.float64)
+
+        # pairs outside the bins go to an extra bin which is not fitted
+        pair_bin = np.searchsorted(dist_bins, pairs["dist_km"], side="right") - 1
+        pair_bin[(pair_bin < 0) | (pair_bin >= len(target))] = len(target)
+        pairs.update({"pair_bin": pair_bin, "target": target / target.sum()})
+        calc_residual = _calc_tlfd_residual
+    else:
+        zone_index = {name: i for i, name in enumerate(zone_od_dist_matrix.zone_name)}
+        if {"o_zone_name", "d_zone_name"}.issubset(od_counts.columns):
+            o_names, d_names = od_counts["o_zone_name"], od_counts["d_zone_name"]
+        else:
+            name_by_id = {zone_dict[name].id: name for name in zone_od_dist_matrix.zone_name}
+            o_names, d_names = od_counts["o_zone_id"].map(name_by_id), od_counts["d_zone_id"].map(name_by_id)
+        o_pos, d_pos = o_names.map(zone_index), d_names.map(zone_index)
+        if o_pos.isna().any() or d_pos.isna().any():
+            raise ValueError("Error: zones of od_counts are not in the zone od distance matrix.")
+
+        # position of each counted pair among the pairs with distance > 0, -1 if not modeled
+        num_zone = len(zone_index)
+        pair_index = pd.Series(np.arange(len(pairs["o_idx"])), index=pairs["o_idx"] * num_zone + pairs["d_idx"])
+        count_pos = pair_index.reindex(o_pos.to_numpy(dtype=np.int64) * num_zone + d_pos.to_numpy(dtype=np.int64))
+        pairs.update({"count_pos": count_pos.fillna(-1).to_numpy(dtype=np.int64),
+                      "target": od_counts["volume"].to_numpy(dtype=np.float64)})
+        calc_residual = _calc_od_count_residual
+
+    if verbose:
+        print(f"  : Calibrating gravity model of trip purpose {trip_purpose} on {len(pairs['o_idx'])} OD pairs...")
+
+    result = _minimize_bounded_least_squares(lambda x: calc_residual(pairs, x[0], x[1]),
+                                             np.array(init_params, dtype=np.float64),
+                                             np.array([beta_bounds, gamma_bounds], dtype=np.float64),
+                                             tol=tol, max_iter=max_iter)
+    beta, gamma = (float(val) for val in result["x"])
+
+    calibration = {"alpha": default_params["alpha"], "beta": beta, "gamma": gamma,
+                   "objective": result["objective"], "iterations": result["iterations"],
+                   "converged": result["converged"]}
+    if target_tlfd is not None:
+        residual, _ = _calc_tlfd_residual(pairs, beta, gamma)
+        calibration["tlfd"] = pd.DataFrame({"from_dist_km": dist_bins[:-1],
+                                            "to_dist_km": dist_bins[1:],
+                                            "target_share": pairs["target"],
+                                            "model_share": pairs["target"] + residual})
+
+    if update_settings:
+        trip_purpose_dict.setdefault(trip_purpose, dict(default_params)).update({"beta": beta, "gamma": gamma})
+
+    if verbose:
+        print(f"  : Calibrated trip purpose {trip_purpose}: beta = {beta:.6g}, gamma = {gamma:.6g}, "
+              f"objective = {result['objective']:.3g}, {result['iterations']} iterations.")
+    return calibration
@@ -5,9 +5,20 @@
 # Author/Copyright: Mr. Xiangyong Luo
 ##############################################################
 
+import itertools
+
 import numpy as np
+import pandas as pd
+from grid2demand.func_lib.trip_rate_production_attraction import (calc_node_prod_attr_array,
+                                                                  calc_poi_prod_attr,
+                                                                  gen_trip_rate_lookup)
+from grid2demand.utils_lib.net_utils import ODMatrix, SparseODMatrix
+from grid2demand.utils_lib.parallel import parallel_map
 from grid2demand.utils_lib.pkg_settings import pkg_settings
 
+# max number of cached d^beta and exp(gamma * d) values per process in run_gravity_sweep
+SWEEP_CACHE_ELEMENTS = 2 ** 24
+
 
 def calc_zone_production_attraction(node_dict: dict, poi_dict: dict, zone_dict: dict, verbose: bool = False) -> dict:
     """Calculate zone production and attraction based on node and poi production and attraction
@@ -59,6 +70,246 @@ def calc_zone_production_attraction(node_dict: dict, poi_dict: dict, zone_dict:
     return zone_dict
 
 
+def calc_zone_production_attraction_matrix(node_dict: dict, poi_dict: dict, zone_dict: dict,
+                                           trip_rate_file: str = "",
+                                           trip_purposes: list = (1, 2, 3),
+                                           verbose: bool = False) -> dict:
+    """Calculate zone production and attraction of several trip purposes in one pass
+
+    Trip rates of all POIs and purposes are joined at once (see gen_trip_rate_lookup), node production and
+    attraction are set by masks over node columns (see calc_node_prod_attr_array), and zone totals are summed
+    over the node_id_list and poi_id_list of zones, same as calc_zone_production_attraction for each purpose.
+    node_dict, poi_dict and zone_dict are not changed.
+
+    Args:
+        node_dict (dict): dictionary of node objects
+        poi_dict (dict): dictionary of poi objects
+        zone_dict (dict): dictionary of zone objects, with node_id_list and poi_id_list
+        trip_rate_file (str, optional): poi trip rate file path. Defaults to "", use the default trip rate.
+        trip_purposes (list, optional): trip purposes. Defaults to (1, 2, 3).
+        verbose (bool): whether to print out processing message. Defaults to False.
+
+    Returns:
+        dict: {"zone_name": np.ndarray, "trip_purposes": list, "production": np.ndarray, "attraction": np.ndarray},
+            production and attraction of shape (zones, trip purposes), zones in the order of zone_dict
+    """
+    trip_purposes = list(trip_purposes)
+    poi_prod_attr = calc_poi_prod_attr(poi_dict, gen_trip_rate_lookup(trip_rate_file, trip_purposes))
+    node_prod_attr = calc_node_prod_attr_array(node_dict, poi_prod_attr)
+
+    zone_names = list(zone_dict)
+    zone_prod_attr = {"zone_name": np.array(zone_names, dtype=object), "trip_purposes": trip_purposes}
+    for value in ["production", "attraction"]:
+        zone_prod_attr[value] = np.zeros((len(zone_names), len(trip_purposes)))
+
+    # members of zones as (zone position, record position), ids not found are skipped
+    for prod_attr, id_key, id_list in [(node_prod_attr, "node_id", "node_id_list"),
+                                       (poi_prod_attr, "poi_id", "poi_id_list")]:
+        member_lists = [getattr(zone_dict[zone_name], id_list) or [] for zone_name in zone_names]
+        member_id = list(itertools.chain.from_iterable(member_lists))
+        zone_pos = np.repeat(np.arange(len(zone_names)), [len(members) for members in member_lists])
+        record_pos = pd.Index(prod_attr[id_key]).get_indexer(member_id)
+        zone_pos, record_pos = zone_pos[record_pos >= 0], record_pos[record_pos >= 0]
+
+        for value in ["production", "attraction"]:
+            for k in range(len(trip_purposes)):
+                zone_prod_attr[value][:, k] += np.bincount(zone_pos, weights=prod_attr[value][record_pos, k],
+                                                           minlength=len(zone_names))
+
+    if verbose:
+        print(f"  : Successfully calculated zone production and attraction of trip purposes {trip_purposes}.")
+
+    return zone_prod_attr
+
+
+def calc_friction_matrix(dist_km: np.ndarray,
+                         alpha: float = 28507,
+                         beta: float = -0.02,
+                         gamma: float = -0.123) -> np.ndarray:
+    """Calculate the friction factor alpha * d^beta * exp(gamma * d) for each OD pair
+
+    OD pairs with zero distance (e.g. the diagonal of intra-zone pairs) are masked and get zero friction.
+
+    Args:
+        dist_km (np.ndarray): zone-to-zone distance matrix, unit is km
+        alpha (float): parameter for gravity model. Defaults to 28507.
+        beta (float): parameter for gravity model. Defaults to -0.02.
+        gamma (float): parameter for gravity model. Defaults to -0.123.
+
+    Returns:
+        np.ndarray: friction matrix, same shape as dist_km
+    """
+    dist_km = np.asarray(dist_km, dtype=np.float64)
+    is_valid = dist_km > 0
+
+    friction = np.zeros(dist_km.shape)
+    np.power(dist_km, beta, out=friction, where=is_valid)
+    friction *= alpha
+    friction *= np.exp(np.where(is_valid, dist_km, 0) * gamma)
+    friction[~is_valid] = 0
+    return friction
+
+
+def calc_gravity_volume(production: np.ndarray,
+                        attraction: np.ndarray,
+                        dist_km: np.ndarray,
+                        alpha: float = 28507,
+                        beta: float = -0.02,
+                        gamma: float = -0.123) -> np.ndarray:
+    """Calculate the OD volume matrix of the production-constrained gravity model
+
+    volume[i, j] = production[i] * attraction[j] * friction[i, j] / sum_k(friction[i, k] * attraction[k])
+
+    Args:
+        production (np.ndarray): production of origin zones, length N
+        attraction (np.ndarray): attraction of destination zones, length N
+        dist_km (np.ndarray): zone-to-zone distance matrix, shape (N, N), unit is km
+        alpha (float): parameter for gravity model. Defaults to 28507.
+        beta (float): parameter for gravity model. Defaults to -0.02.
+        gamma (float): parameter for gravity model. Defaults to -0.123.
+
+    Returns:
+        np.ndarray: volume matrix, shape (N, N). Rows without reachable attraction are zero.
+    """
+    production = np.asarray(production, dtype=np.float64)
+    attraction = np.asarray(attraction, dtype=np.float64)
+
+    friction_attraction = calc_friction_matrix(dist_km, alpha, beta, gamma)
+    friction_attraction *= attraction[None, :]
+
+    # normalize by row sums, rows with zero sum have no volume
+    row_sum = friction_attraction.sum(axis=1)
+    scale = np.divide(production, row_sum, out=np.zeros_like(production), where=row_sum != 0)
+    friction_attraction *= scale[:, None]
+    return friction_attraction
+
+
+def calc_gravity_volume_sparse(production: np.ndarray,
+                               attraction: np.ndarray,
+                               o_idx: np.ndarray,
+                               d_idx: np.ndarray,
+                               dist_km: np.ndarray,
+                               alpha: float = 28507,
+                               beta: float = -0.02,
+                               gamma: float = -0.123) -> np.ndarray:
+    """Calculate the OD volumes of the production-constrained gravity model on OD pairs in COO format
+
+    Same as calc_gravity_volume, with the sums over destinations taken over the given OD pairs only.
+
+    Args:
+        production (np.ndarray): production of zones, length N
+        attraction (np.ndarray): attraction of zones, length N
+        o_idx (np.ndarray): origin zone index of OD pairs
+        d_idx (np.ndarray): destination zone index of OD pairs
+        dist_km (np.ndarray): distance of OD pairs, unit is km
+        alpha (float): parameter for gravity model. Defaults to 28507.
+        beta (float): parameter for gravity model. Defaults to -0.02.
+        gamma (float): parameter for gravity model. Defaults to -0.123.
+
+    Returns:
+        np.ndarray: volume of OD pairs. Origins without reachable attraction have no volume.
+    """
+    production = np.asarray(production, dtype=np.float64)
+    attraction = np.asarray(attraction, dtype=np.float64)
+
+    friction_attraction = calc_friction_matrix(dist_km, alpha, beta, gamma)
+    friction_attraction *= attraction[d_idx]
+
+    # normalize by origin sums, origins with zero sum have no volume
+    row_sum = np.bincount(o_idx, weights=friction_attraction, minlength=len(production))
+    scale = np.divide(production, row_sum, out=np.zeros_like(production), where=row_sum != 0)
+    friction_attraction *= scale[o_idx]
+    return friction_attraction
+
+
+def balance_furness(seed: np.ndarray,
+                    production: np.ndarray,
+                    attraction: np.ndarray,
+                    tol: float = 1e-6,
+                    max_iter: int = 100,
+                    o_idx: np.ndarray = None,
+                    d_idx: np.ndarray = None) -> tuple[np.ndarray, dict]:
+    """Balance a seed OD matrix to row (production) and column (attraction) totals by Furness / IPF
+
+    The balanced matrix is kept as row and column factors, volume[i, j] = r[i] * seed[i, j] * c[j],
+    so each iteration costs two matrix-vector products. Attractions are scaled to the production total.
+    Zones with production (attraction) but no reachable destination (origin) in seed can not be balanced
+    and are left out of the totals.
+
+    Args:
+        seed (np.ndarray): seed matrix, e.g. the friction matrix, shape (N, N),
+            or the seed values of OD pairs in COO format if o_idx and d_idx are given
+        production (np.ndarray): row totals, length N
+        attraction (np.ndarray): column totals, length N
+        tol (float, optional): stop when sum(|row sum - production|) / sum(production) < tol. Defaults to 1e-6.
+        max_iter (int, optional): max number of iterations. Defaults to 100.
+        o_idx (np.ndarray, optional): origin zone index of OD pairs for a COO seed. Defaults to None.
+        d_idx (np.ndarray, optional): destination zone index of OD pairs for a COO seed. Defaults to None.
+
+    Returns:
+        tuple[np.ndarray, dict]: balanced volume matrix (volume of OD pairs for a COO seed) and telemetry
+            {"converged": bool, "iterations": int, "error": float, "error_history": list,
+             "unbalanced_origins": int, "unbalanced_destinations": int}
+    """
+    seed = np.asarray(seed, dtype=np.float64)
+    production = np.asarray(production, dtype=np.float64)
+    attraction = np.asarray(attraction, dtype=np.float64)
+
+    # products of the seed matrix with column (row) vectors, for a dense or a COO seed
+    if o_idx is None:
+        def seed_dot(col: np.ndarray) -> np.ndarray:
+            return seed @ col
+
+        def dot_seed(row: np.ndarray) -> np.ndarray:
+            return row @ seed
+    else:
+        def seed_dot(col: np.ndarray) -> np.ndarray:
+            return np.bincount(o_idx, weights=seed * col[d_idx], minlength=len(production))
+
+        def dot_seed(row: np.ndarray) -> np.ndarray:
+            return np.bincount(d_idx, weights=row[o_idx] * seed, minlength=len(attraction))
+
+    # origins / destinations which can be balanced
+    is_destination = (attraction > 0) & (dot_seed(np.ones_like(production)) > 0)
+    is_origin = (production > 0) & (seed_dot(is_destination.astype(np.float64)) > 0)
+    is_destination &= dot_seed(is_origin.astype(np.float64)) > 0
+    num_unbalanced_origin = int(((production > 0) & ~is_origin).sum())
+    num_unbalanced_destination = int(((attraction > 0) & ~is_destination).sum())
+    production = np.where(is_origin, production, 0)
+    attraction = np.where(is_destination, attraction, 0)
+
+    total = production.sum()
+    if attraction.sum() > 0:
+        attraction = attraction * (total / attraction.sum())
+
+    row_factor = np.zeros_like(production)
+    col_factor = is_destination.astype(np.float64)
+    error_history = []
+
+    row_sum = seed_dot(col_factor)
+    for _ in range(max_iter):
+        row_factor = np.divide(production, row_sum, out=np.zeros_like(production), where=row_sum > 0)
+
+        col_sum = dot_seed(row_factor)
+        col_factor = np.divide(attraction, col_sum, out=np.zeros_like(attraction), where=col_sum > 0)
+
+        # columns match after the column update, measure the remaining row error
+        row_sum = seed_dot(col_factor)
+        error_history.append(float(np.abs(row_factor * row_sum - production).sum() / total) if total > 0 else 0.0)
+        if error_history[-1] < tol:
+            break
+
+    telemetry = {"converged": bool(error_history) and error_history[-1] < tol,
+                 "iterations": len(error_history),
+                 "error": error_history[-1] if error_history else 0.0,
+                 "error_history": error_history,
+                 "unbalanced_origins": num_unbalanced_origin,
+                 "unbalanced_destinations": num_unbalanced_destination}
+    if o_idx is None:
+        return row_factor[:, None] * seed * col_factor[None, :], telemetry
+    return row_factor[o_idx] * seed * col_factor[d_idx], telemetry
+
+
 def calc_zone_od_friction_attraction(zone_od_friction_matrix_dict: dict,
                                      zone_dict: dict,
                                      verbose: bool = False) -> dict:
@@ -86,26 +337,66 @@ def calc_zone_od_friction_attraction(zone_od_friction_matrix_dict: dict,
     return zone_od_friction_attraction_dict
 
 
+def _calc_od_volume(production: np.ndarray, attraction: np.ndarray, dist_km: np.ndarray,
+                    alpha: float, beta: float, gamma: float, od_idx_sparse: dict,
+                    doubly_constrained: bool, tol: float, max_iter: int, verbose: bool) -> tuple[np.ndarray, dict]:
+    """OD volumes of the gravity model on a dense distance matrix, or on the pairs of od_idx_sparse
+    ({"o_idx", "d_idx"}, empty for dense), and the telemetry of doubly-constrained balancing (None otherwise)"""
+    if doubly_constrained:
+        volume, telemetry = balance_furness(calc_friction_matrix(dist_km, alpha, beta, gamma),
+                                            production, attraction, tol, max_iter, **od_idx_sparse)
+        if verbose or not telemetry["converged"]:
+            print(f"  : Furness balancing {'converged' if telemetry['converged'] else 'did not converge'} "
+                  f"in {telemetry['iterations']} iterations, error: {telemetry['error']:.3g}")
+        return volume, telemetry
+
+    if od_idx_sparse:
+        return calc_gravity_volume_sparse(production, attraction, od_idx_sparse["o_idx"], od_idx_sparse["d_idx"],
+                                          dist_km, alpha, beta, gamma), None
+    return calc_gravity_volume(production, attraction, dist_km, alpha, beta, gamma), None
+
+
 def run_gravity_model(zone_dict: dict,
-                      zone_od_dist_matrix: dict,
+                      zone_od_dist_matrix: ODMatrix | SparseODMatrix | dict,
                       trip_purpose: int = 1,
                       alpha: float = 28507,
                       beta: float = -0.02,
                       gamma: float = -0.123,
-                      verbose: bool = False) -> dict:
+                      verbose: bool = False,
+                      *,
+                      doubly_constrained: bool = False,
+                      tol: float = 1e-6,
+                      max_iter: int = 100,
+                      volume_threshold: float = None,
+                      return_telemetry: bool = False) -> ODMatrix | SparseODMatrix | dict:
     """Run gravity model to generate demand.csv
 
+    By default the model is production-constrained: row totals match zone production.
+    If doubly_constrained, the friction matrix is balanced by Furness / IPF so that row totals match
+    zone production and column totals match zone attraction (scaled to the production total).
+
     Args:
         zone_dict (dict): dictionary of zone objects
-        zone_od_dist_matrix (dict): dictionary of zone od distance matrix
+        zone_od_dist_matrix (ODMatrix | SparseODMatrix | dict): zone od distance matrix from calc_zone_od_matrix,
+            or the dict {(o_zone_name, d_zone_name): {..., "dist_km": ...}}.
+            For a SparseODMatrix, only the stored OD pairs get volume.
         trip_purpose (int): specify trip purpose. Defaults to 1.
         alpha (float): parameter for gravity model. Defaults to 28507.
         beta (float): parameter for gravity model. Defaults to -0.02.
         gamma (float): parameter for gravity model. Defaults to -0.123.
         verbose (bool): whether to print out processing message. Defaults to False.
+        doubly_constrained (bool): balance both productions and attractions. Defaults to False.
+        tol (float): convergence tolerance of the doubly-constrained balancing. Defaults to 1e-6.
+        max_iter (int): max iterations of the doubly-constrained balancing. Defaults to 100.
+        volume_threshold (float): drop OD pairs with volume below this value from a SparseODMatrix.
+            Defaults to None, pkg_settings["od_volume_threshold"].
+        return_telemetry (bool): also return the convergence telemetry of balancing
+            (None if not doubly_constrained). Defaults to False.
 
     Returns:
-        dict: dictionary of zone od distance matrix with updated volume
+        ODMatrix | SparseODMatrix | dict: zone od distance matrix with updated volume, same type as
+            zone_od_dist_matrix. A SparseODMatrix is returned as a new object without the dropped OD pairs.
+            if return_telemetry, (zone od distance matrix, telemetry dict)
     """
 
     # if trip purpose is specified in trip_purpose_dict, use the default value
@@ -117,34 +408,280 @@ def run_gravity_model(zone_dict: dict,
         beta = trip_purpose_dict[trip_purpose]["beta"]
         gamma = trip_purpose_dict[trip_purpose]["gamma"]
 
-    # update zone attraction and production
-    # zone_dict = calc_zone_production_attraction(node_dict, zone_dict)
+    is_sparse = isinstance(zone_od_dist_matrix, SparseODMatrix)
+    if isinstance(zone_od_dist_matrix, (ODMatrix, SparseODMatrix)):
+        zone_names = zone_od_dist_matrix.zone_name
+        dist_km = zone_od_dist_matrix.dist_km
+    else:
+        # collect zone names and distances from the dict of od pairs
+        zone_names = list(dict.fromkeys(zone_name for od_pair in zone_od_dist_matrix for zone_name in od_pair))
+        zone_index = {zone_name: i for i, zone_name in enumerate(zone_names)}
+        od_idx = np.array([(zone_index[o_name], zone_index[d_name]) for o_name, d_name in zone_od_dist_matrix],
+                          dtype=np.int64).reshape(-1, 2)
+        dist_km = np.zeros((len(zone_names), len(zone_names)))
+        dist_km[od_idx[:, 0], od_idx[:, 1]] = [od["dist_km"] for od in zone_od_dist_matrix.values()]
 
-    # perform zone od friction matrix
-    zone_od_friction_matrix_dict = {
-        zone_name_pair: alpha * (od_dist["dist_km"] ** beta) * (
-            np.exp(od_dist["dist_km"] * gamma)) if od_dist["dist_km"] != 0 else 0
-        for zone_name_pair, od_dist in zone_od_dist_matrix.items()
-    }
-
-    # perform attraction calculation
-    zone_od_friction_attraction_dict = calc_zone_od_friction_attraction(zone_od_friction_matrix_dict,
-                                                                        zone_dict,
-                                                                        verbose=verbose)
+    production = np.array([zone_dict[zone_name].production for zone_name in zone_names], dtype=np.float64)
+    attraction = np.array([zone_dict[zone_name].attraction for zone_name in zone_names], dtype=np.float64)
 
     # perform od trip flow (volume) calculation
-    for zone_name_pair in zone_od_friction_matrix_dict:
-        try:
-            zone_od_dist_matrix[zone_name_pair]["volume"] = float(zone_dict[zone_name_pair[0]].production *
-                                                                  zone_dict[zone_name_pair[1]].attraction *
-                                                                  zone_od_friction_matrix_dict[zone_name_pair] /
-                                                                  zone_od_friction_attraction_dict[zone_name_pair[0]])
-        except Exception:
-            zone_od_dist_matrix[zone_name_pair]["volume"] = 0
+    od_idx_sparse = {"o_idx": zone_od_dist_matrix.o_idx, "d_idx": zone_od_dist_matrix.d_idx} if is_sparse else {}
+    volume, telemetry = _calc_od_volume(production, attraction, dist_km, alpha, beta, gamma, od_idx_sparse,
+                                        doubly_constrained, tol, max_iter, verbose)
+
+    if is_sparse:
+        if volume_threshold is None:
+            volume_threshold = pkg_settings["od_volume_threshold"]
+        zone_od_dist_matrix.volume = volume
+        zone_od_dist_matrix = zone_od_dist_matrix.select((volume > 0) & (volume >= volume_threshold))
+        if verbose:
+            print(f"  : Kept {zone_od_dist_matrix.nnz} OD pairs with volume >= {volume_threshold}.")
+    elif isinstance(zone_od_dist_matrix, ODMatrix):
+        zone_od_dist_matrix.volume = volume
+    else:
+        for (i, j), od in zip(od_idx, zone_od_dist_matrix.values()):
+            od["volume"] = float(volume[i, j])
 
     # Generate demand.csv
     if verbose:
         print("  : Successfully run gravity model to generate demand.csv.")
 
-    # return pd.DataFrame(list(zone_od_matrix_dict.values()))
+    if return_telemetry:
+        return zone_od_dist_matrix, telemetry
     return zone_od_dist_matrix
+
+
+def prepare_gravity_pairs(zone_dict: dict, zone_od_dist_matrix: ODMatrix | SparseODMatrix) -> dict:
+    """Arrays of the gravity model on the OD pairs with distance > 0, grouped by origin zone
+
+    OD pairs with zero (intra-zone) or missing (NaN) distance have zero friction for any parameters.
+
+    Args:
+        zone_dict (dict): dictionary of zone objects, with production and attraction
+        zone_od_dist_matrix (ODMatrix | SparseODMatrix): zone od distance matrix from calc_zone_od_matrix
+
+    Returns:
+        dict: {"production", "attraction": zone vectors in the zone order of the matrix,
+            "o_idx", "d_idx", "dist_km", "log_dist": OD pairs,
+            "row_zone", "row_start", "row_count": origin zone and pair range of each origin,
+            "pair_pos": position of OD pairs in dist_km.ravel() (ODMatrix) or in the pairs (SparseODMatrix)}
+    """
+    zone_names = zone_od_dist_matrix.zone_name
+    production = np.array([zone_dict[zone_name].production for zone_name in zone_names], dtype=np.float64)
+    attraction = np.array([zone_dict[zone_name].attraction for zone_name in zone_names], dtype=np.float64)
+
+    if isinstance(zone_od_dist_matrix, SparseODMatrix):
+        o_idx, d_idx = zone_od_dist_matrix.o_idx, zone_od_dist_matrix.d_idx
+        dist_km = np.asarray(zone_od_dist_matrix.dist_km, dtype=np.float64)
+    else:
+        dist_km = np.asarray(zone_od_dist_matrix.dist_km, dtype=np.float64)
+        o_idx, d_idx = np.indices(dist_km.shape).reshape(2, -1)
+        dist_km = dist_km.ravel()
+
+    pair_pos = np.flatnonzero(dist_km > 0)
+    pair_pos = pair_pos[np.argsort(np.asarray(o_idx)[pair_pos], kind="stable")]
+    o_idx, d_idx = np.asarray(o_idx, dtype=np.int64)[pair_pos], np.asarray(d_idx, dtype=np.int64)[pair_pos]
+    dist_km = dist_km[pair_pos]
+    row_zone, row_start, row_count = np.unique(o_idx, return_index=True, return_counts=True)
+
+    return {"production": production, "attraction": attraction,
+            "o_idx": o_idx, "d_idx": d_idx, "dist_km": dist_km, "log_dist": np.log(dist_km),
+            "row_zone": row_zone, "row_start": row_start, "row_count": row_count, "pair_pos": pair_pos}
+
+
+def _get_sweep_factor(cache: dict, key: tuple, calc_factor, max_size: int) -> np.ndarray:
+    """Return a cached friction factor of run_gravity_sweep, dropping the oldest when the cache is full"""
+    if key not in cache:
+        if len(cache) >= max_size:
+            cache.pop(next(iter(cache)))
+        cache[key] = calc_factor()
+    return cache[key]
+
+
+def _calc_gravity_sweep_chunk(shared: dict, start: int, end: int) -> np.ndarray:
+    """Task of parallel_map: OD volumes of scenarios start:end on the OD pairs with distance > 0
+
+    friction = alpha * d^beta * exp(gamma * d), d^beta and exp(gamma * d) are computed once per distinct
+    beta and gamma, so a grid of B betas and G gammas takes B + G exponentials instead of B * G.
+
+    Returns:
+        np.ndarray: [total_volume, mean_dist_km, converged, iterations] of each scenario, shape (end - start, 4).
+            If shared["out"] is given, volumes are written to out[start:end] at shared["pair_pos"].
+    """
+    production, attraction = shared["production"], shared["attraction"]
+    o_idx, d_idx, dist_km, log_dist = shared["o_idx"], shared["d_idx"], shared["dist_km"], shared["log_dist"]
+    row_zone, row_start, row_count = shared["row_zone"], shared["row_start"], shared["row_count"]
+    attraction_pair = attraction[d_idx]
+    row_production = production[row_zone]
+
+    cache, max_size = {}, max(2, SWEEP_CACHE_ELEMENTS // max(len(dist_km), 1))
+    summary = np.zeros((end - start, 4))
+    for k, (alpha, beta, gamma) in enumerate(shared["params"][start:end]):
+        friction = _get_sweep_factor(cache, ("beta", beta), lambda: np.exp(beta * log_dist), max_size) * \
+            _get_sweep_factor(cache, ("gamma", gamma), lambda: np.exp(gamma * dist_km), max_size)
+        friction *= alpha
+
+        if shared["doubly_constrained"]:
+            volume, telemetry = balance_furness(friction, production, attraction, shared["tol"], shared["max_iter"],
+                                                o_idx=o_idx, d_idx=d_idx)
+            summary[k, 2:] = telemetry["converged"], telemetry["iterations"]
+        else:
+            # production-constrained, pairs are grouped by origin so row sums are contiguous reductions
+            volume = friction
+            volume *= attraction_pair
+            row_sum = np.add.reduceat(volume, row_start) if len(row_start) else np.zeros(0)
+            volume *= np.repeat(np.divide(row_production, row_sum, out=np.zeros_like(row_sum),
+                                          where=row_sum != 0), row_count)
+            summary[k, 2:] = True, 0
+
+        summary[k, 0] = volume.sum()
+        summary[k, 1] = volume @ dist_km / summary[k, 0] if summary[k, 0] > 0 else np.nan
+
+        if "out" in shared:
+            shared["out"].reshape(shared["out"].shape[0], -1)[start + k, shared["pair_pos"]] = volume
+    return summary
+
+
+def run_gravity_sweep(zone_dict: dict,
+                      zone_od_dist_matrix: ODMatrix | SparseODMatrix,
+                      params: list,
+                      *,
+                      doubly_constrained: bool = False,
+                      tol: float = 1e-6,
+                      max_iter: int = 100,
+                      return_volume: bool = False,
+                      cpu_cores: int = 1,
+                      chunk_size: int = 0,
+                      verbose: bool = False) -> pd.DataFrame | tuple[pd.DataFrame, np.ndarray]:
+    """Evaluate the gravity model for a grid of (alpha, beta, gamma) scenarios on one distance matrix
+
+    Distances, their logs, OD pairs grouped by origin and zone production / attraction are prepared once.
+    The distance terms d^beta and exp(gamma * d) are shared by all scenarios with the same beta or gamma,
+    and ranges of scenarios run in a process pool if cpu_cores > 1. The volumes of each scenario are the
+    same as run_gravity_model with its parameters, and zone_od_dist_matrix is not modified. alpha cancels
+    out in both the production-constrained and the doubly-constrained model, it is kept for the parameter
+    tuples of trip_purpose_dict.
+
+    Args:
+        zone_dict (dict): dictionary of zone objects, with production and attraction
+        zone_od_dist_matrix (ODMatrix | SparseODMatrix): zone od distance matrix from calc_zone_od_matrix
+        params (list): [(alpha, beta, gamma), ...] or an array of shape (S, 3)
+        doubly_constrained (bool): balance both productions and attractions. Defaults to False.
+        tol (float): convergence tolerance of the doubly-constrained balancing. Defaults to 1e-6.
+        max_iter (int): max iterations of the doubly-constrained balancing. Defaults to 100.
+        return_volume (bool): also return the volumes of all scenarios, shape (S, N, N) for an ODMatrix
+            or (S, nnz) in the pair order of a SparseODMatrix. Defaults to False.
+        cpu_cores (int): number of processes. Defaults to 1.
+        chunk_size (int): number of scenarios per task, 0 for one range of consecutive scenarios per process.
+            Defaults to 0.
+        verbose (bool): whether to print out processing message. Defaults to False.
+
+    Returns:
+        pd.DataFrame | tuple[pd.DataFrame, np.ndarray]: one row per scenario,
+            [scenario, alpha, beta, gamma, total_volume, mean_dist_km, converged, iterations];
+            converged and iterations are from balancing (True and 0 if not doubly_constrained).
+            if return_volume, (summary, volume)
+    """
+    params = np.asarray(params, dtype=np.float64).reshape(-1, 3)
+    shared = prepare_gravity_pairs(zone_dict, zone_od_dist_matrix)
+    shared.update({"params": params, "doubly_constrained": doubly_constrained, "tol": tol, "max_iter": max_iter})
+    pair_pos = shared["pair_pos"]
+
+    num_zone = len(zone_od_dist_matrix.zone_name)
+    volume_shape = (len(params), zone_od_dist_matrix.nnz) if isinstance(zone_od_dist_matrix, SparseODMatrix) \
+        else (len(params), num_zone, num_zone)
+    volume = np.zeros(volume_shape) if return_volume else None
+
+    if verbose:
+        print(f"  : Running gravity model for {len(params)} scenarios on {len(pair_pos)} OD pairs...")
+
+    summary = parallel_map(_calc_gravity_sweep_chunk, shared, len(params),
+                           cpu_cores=cpu_cores, chunk_size=chunk_size or len(params), out=volume)
+    summary = np.concatenate(summary) if summary else np.zeros((0, 4))
+
+    df_summary = pd.DataFrame({"scenario": np.arange(len(params)),
+                               "alpha": params[:, 0],
+                               "beta": params[:, 1],
+                               "gamma": params[:, 2],
+                               "total_volume": summary[:, 0],
+                               "mean_dist_km": summary[:, 1],
+                               "converged": summary[:, 2].astype(bool),
+                               "iterations": summary[:, 3].astype(np.int64)})
+
+    if verbose:
+        print(f"  : Successfully evaluated {len(params)} gravity model scenarios.")
+
+    if return_volume:
+        return df_summary, volume
+    return df_summary
+
+
+def run_gravity_model_multi_purpose(zone_prod_attr: dict,
+                                    zone_od_dist_matrix: ODMatrix | SparseODMatrix,
+                                    verbose: bool = False,
+                                    *,
+                                    doubly_constrained: bool = False,
+                                    tol: float = 1e-6,
+                                    max_iter: int = 100,
+                                    volume_threshold: float = None,
+                                    return_telemetry: bool = False) -> pd.DataFrame | tuple[pd.DataFrame, dict]:
+    """Run gravity model for several trip purposes over the same zone-to-zone distance matrix
+
+    Each purpose uses its alpha, beta and gamma of pkg_settings["trip_purpose_dict"] and its column of zone
+    production and attraction; the OD pairs are read from zone_od_dist_matrix once for all purposes.
+
+    Args:
+        zone_prod_attr (dict): zone production and attraction of trip purposes
+            from calc_zone_production_attraction_matrix
+        zone_od_dist_matrix (ODMatrix | SparseODMatrix): zone od distance matrix from calc_zone_od_matrix
+        verbose (bool): whether to print out processing message. Defaults to False.
+        doubly_constrained (bool): balance both productions and attractions. Defaults to False.
+        tol (float): convergence tolerance of the doubly-constrained balancing. Defaults to 1e-6.
+        max_iter (int): max iterations of the doubly-constrained balancing. Defaults to 100.
+        volume_threshold (float): drop OD pairs with volume below this value from a SparseODMatrix.
+            Defaults to None, pkg_settings["od_volume_threshold"].
+        return_telemetry (bool): also return {trip_purpose: telemetry of balancing}. Defaults to False.
+
+    Raises:
+        ValueError: a trip purpose is not in pkg_settings["trip_purpose_dict"]
+
+    Returns:
+        pd.DataFrame: demand of all purposes, columns of ODMatrix.to_dataframe and trip_purpose, one block of
+            OD pairs per purpose. if return_telemetry, (demand, {trip_purpose: telemetry})
+    """
+    trip_purpose_dict = pkg_settings.get("trip_purpose_dict")
+    trip_purposes = zone_prod_attr["trip_purposes"]
+    if missing_purposes := [trip_purpose for trip_purpose in trip_purposes if trip_purpose not in trip_purpose_dict]:
+        raise ValueError(f"Error: trip purposes {missing_purposes} not found in pkg_settings['trip_purpose_dict'].")
+
+    # zone production and attraction in the zone order of the matrix
+    zone_pos = pd.Index(zone_prod_attr["zone_name"]).get_indexer(zone_od_dist_matrix.zone_name)
+    production = np.where(zone_pos[:, None] >= 0, zone_prod_attr["production"][zone_pos], 0)
+    attraction = np.where(zone_pos[:, None] >= 0, zone_prod_attr["attraction"][zone_pos], 0)
+
+    is_sparse = isinstance(zone_od_dist_matrix, SparseODMatrix)
+    od_idx_sparse = {"o_idx": zone_od_dist_matrix.o_idx, "d_idx": zone_od_dist_matrix.d_idx} if is_sparse else {}
+    if is_sparse and volume_threshold is None:
+        volume_threshold = pkg_settings["od_volume_threshold"]
+
+    df_od = zone_od_dist_matrix.to_dataframe().drop(columns="volume")
+    demand_list, telemetry = [], {}
+    for k, trip_purpose in enumerate(trip_purposes):
+        params = trip_purpose_dict[trip_purpose]
+        volume, telemetry[trip_purpose] = _calc_od_volume(production[:, k], attraction[:, k],
+                                                          zone_od_dist_matrix.dist_km,
+                                                          params["alpha"], params["beta"], params["gamma"],
+                                                          od_idx_sparse, doubly_constrained, tol, max_iter, verbose)
+
+        df_purpose = df_od.assign(volume=volume.ravel(), trip_purpose=trip_purpose)
+        if is_sparse:
+            df_purpose = df_purpose[(volume > 0) & (volume >= volume_threshold)]
+        demand_list.append(df_purpose)
+
+    df_demand = pd.concat(demand_list, ignore_index=True)
+    if verbose:
+        print(f"  : Successfully run gravity model for trip purposes {trip_purposes}, {len(df_demand)} OD pairs.")
+
+    if return_telemetry:
+        return df_demand, telemetry
+    return df_demand
@@ -0,0 +1,186 @@
+# -*- coding:utf-8 -*-
+##############################################################
+# Created Date: Saturday, October 17th 2026
+# Contact Info: luoxiangyong01@gmail.com
+# Author/Copyright: Mr. Xiangyong Luo
+##############################################################
+
+import heapq
+import numpy as np
+import pandas as pd
+
+from grid2demand.func_lib.gen_agent_demand import build_zone_node_csr
+from grid2demand.func_lib.gen_zone import calc_haversine_distance
+from grid2demand.utils_lib.net_utils import ODMatrix, SparseODMatrix
+from grid2demand.utils_lib.parallel import parallel_map
+from grid2demand.utils_lib.pkg_settings import pkg_settings
+
+NETWORK_IMPEDANCE = ["network_distance", "network_time"]
+
+
+def calc_link_impedance(df_link: pd.DataFrame, impedance: str = "network_distance") -> np.ndarray:
+    """Impedance of links: length in km for network_distance, free-flow travel time in minutes for network_time"""
+    if impedance not in NETWORK_IMPEDANCE:
+        raise ValueError(f"Unsupported network impedance: {impedance}, choose from {NETWORK_IMPEDANCE}")
+
+    length_km = df_link["length"].to_numpy(dtype=np.float64) / 1000
+    if impedance == "network_distance":
+        return length_km
+    return length_km / df_link["free_speed"].to_numpy(dtype=np.float64) * 60
+
+
+def build_link_csr(from_idx: np.ndarray, to_idx: np.ndarray, weight: np.ndarray, num_node: int) -> dict:
+    """Build the adjacency of directed links in CSR format
+
+    Links leaving node i are indices[indptr[i]:indptr[i + 1]], with weights in the same positions.
+
+    Args:
+        from_idx (np.ndarray): from node index of links
+        to_idx (np.ndarray): to node index of links
+        weight (np.ndarray): impedance of links
+        num_node (int): number of nodes
+
+    Returns:
+        dict: {"indptr": np.ndarray, "indices": np.ndarray, "weight": np.ndarray}
+    """
+    order = np.argsort(from_idx, kind="stable")
+    return {"indptr": np.concatenate([[0], np.cumsum(np.bincount(from_idx, minlength=num_node))]),
+            "indices": np.asarray(to_idx)[order],
+            "weight": np.asarray(weight, dtype=np.float64)[order]}
+
+
+def dijkstra_multi_source(indptr: list, indices: list, weight: list,
+                          source_idx: np.ndarray, source_cost: np.ndarray) -> np.ndarray:
+    """Shortest path cost from a set of sources to all nodes, by Dijkstra with a binary heap
+
+    Args:
+        indptr (list): CSR index pointer of links, see build_link_csr
+        indices (list): CSR to node index of links
+        weight (list): CSR impedance of links, must be >= 0
+        source_idx (np.ndarray): source nodes
+        source_cost (np.ndarray): initial cost of each source node, e.g. the zone connector cost
+
+    Returns:
+        np.ndarray: cost of all nodes, inf for nodes not reachable
+    """
+    cost = [np.inf] * (len(indptr) - 1)
+    heap = []
+    for node, node_cost in zip(np.asarray(source_idx).tolist(), np.asarray(source_cost, dtype=np.float64).tolist()):
+        if node_cost < cost[node]:
+            cost[node] = node_cost
+            heap.append((node_cost, node))
+    heapq.heapify(heap)
+
+    while heap:
+        node_cost, node = heapq.heappop(heap)
+        if node_cost > cost[node]:
+            continue
+        for k in range(indptr[node], indptr[node + 1]):
+            next_cost = node_cost + weight[k]
+            next_node = indices[k]
+            if next_cost < cost[next_node]:
+                cost[next_node] = next_cost
+                heapq.heappush(heap, (next_cost, next_node))
+
+    return np.array(cost)
+
+
+def _calc_network_impedance_rows(shared: dict, start: int, end: int) -> None:
+    """Task of parallel_map: zone-to-zone impedance from origin zones start:end to all zones, one Dijkstra
+    per origin zone, written to rows start:end of shared["out"] (NaN filled)"""
+    graph, zone_node, impedance = shared["graph"], shared["zone_node"], shared["out"]
+    indptr, indices, weight = graph["indptr"].tolist(), graph["indices"].tolist(), graph["weight"].tolist()
+    offsets, node_idx, connector_cost = zone_node["offsets"], zone_node["node_idx"], zone_node["connector_cost"]
+
+    # zones with nodes, the impedance to a zone is the min over its nodes of path cost + connector cost
+    has_node = np.diff(offsets) > 0
+
+    for zone_pos in range(start, end):
+        node_start, node_end = offsets[zone_pos], offsets[zone_pos + 1]
+        if node_start == node_end:
+            continue
+        node_cost = dijkstra_multi_source(indptr, indices, weight, node_idx[node_start:node_end],
+                                          connector_cost[node_start:node_end])
+        zone_cost = np.minimum.reduceat(node_cost[node_idx] + connector_cost, offsets[:-1][has_node])
+        impedance[zone_pos, has_node] = np.where(np.isinf(zone_cost), np.nan, zone_cost)
+
+
+def calc_zone_od_network_matrix(zone_dict: dict, node_dict: dict, df_link: pd.DataFrame,
+                                impedance: str = "network_distance",
+                                cpu_cores: int = 1,
+                                verbose: bool = False,
+                                sparse: bool = False,
+                                max_dist_km: float = None) -> ODMatrix | SparseODMatrix:
+    """Calculate the zone-to-zone shortest path impedance matrix on the link network
+
+    Each zone is connected to its member nodes (node_id_list) by connectors with the great-circle length from
+    the zone centroid to the node (at pkg_settings["default_free_speed"] for network_time). The impedance from
+    an origin zone to all zones is found by one multi-source Dijkstra from the connectors of the origin zone,
+    ranges of origin zones are processed in parallel. Intra-zone pairs have zero impedance, same as the
+    great-circle matrix, and pairs without a path have NaN, so the gravity model gives them no volume.
+
+    Args:
+        zone_dict (dict): dictionary of zone objects, with node_id_list
+        node_dict (dict): dictionary of node objects
+        df_link (pd.DataFrame): directed links from read_link, [from_node_id, to_node_id, length, free_speed]
+        impedance (str, optional): "network_distance" (km) or "network_time" (minutes).
+            Defaults to "network_distance".
+        cpu_cores (int, optional): number of processes. Defaults to 1.
+        verbose (bool, optional): print processing information. Defaults to False.
+        sparse (bool, optional): return a SparseODMatrix of pairs with a path. Defaults to False.
+        max_dist_km (float, optional): keep only pairs with impedance within this value in the sparse matrix,
+            implies sparse. Defaults to None.
+
+    Returns:
+        ODMatrix | SparseODMatrix: the zone-to-zone matrix with the network impedance in dist_km,
+            zones in the order of zone_dict
+    """
+    if verbose:
+        print(f"  : Calculating zone-to-zone {impedance} matrix on {len(df_link)} links. Please wait...")
+
+    zone_names = list(zone_dict)
+    x_coord = np.array([zone_dict[zone_name].x_coord for zone_name in zone_names], dtype=np.float64)
+    y_coord = np.array([zone_dict[zone_name].y_coord for zone_name in zone_names], dtype=np.float64)
+
+    # node index of the graph: nodes of links and zone member nodes
+    zone_node = build_zone_node_csr(zone_dict, node_dict)
+    from_node_id, to_node_id = df_link["from_node_id"].to_numpy(), df_link["to_node_id"].to_numpy()
+    node_index = pd.Index(np.unique(np.concatenate([from_node_id, to_node_id, zone_node["node_id"]])))
+
+    graph = build_link_csr(node_index.get_indexer(from_node_id), node_index.get_indexer(to_node_id),
+                           calc_link_impedance(df_link, impedance), len(node_index))
+
+    # zone connectors: centroid to member nodes
+    zone_pos = np.repeat(np.arange(len(zone_names)), np.diff(zone_node["offsets"]))
+    connector_km = calc_haversine_distance(x_coord[zone_pos], y_coord[zone_pos],
+                                           zone_node["x_coord"], zone_node["y_coord"])
+    connector_cost = connector_km if impedance == "network_distance" else \
+        connector_km / pkg_settings["default_free_speed"] * 60
+    zone_connector = {"offsets": zone_node["offsets"],
+                      "node_idx": node_index.get_indexer(zone_node["node_id"]),
+                      "connector_cost": connector_cost}
+
+    # the graph and connectors are attached by each process from shared memory, tasks are ranges of origin
+    # zones and write their rows of dist_km in place
+    dist_km = np.full((len(zone_names), len(zone_names)), np.nan)
+    parallel_map(_calc_network_impedance_rows, {"graph": graph, "zone_node": zone_connector},
+                 len(zone_names), cpu_cores=cpu_cores, out=dist_km)
+    np.fill_diagonal(dist_km, 0)
+
+    zone_info = {"zone_id": np.array([zone_dict[zone_name].id for zone_name in zone_names]),
+                 "zone_name": np.array([zone_dict[zone_name].name for zone_name in zone_names], dtype=object),
+                 "x_coord": x_coord,
+                 "y_coord": y_coord}
+
+    if sparse or max_dist_km is not None:
+        is_kept = ~np.isnan(dist_km) & (dist_km <= max_dist_km if max_dist_km is not None else True)
+        o_idx, d_idx = np.nonzero(is_kept)
+        od_matrix = SparseODMatrix(**zone_info, o_idx=o_idx.astype(np.int64), d_idx=d_idx.astype(np.int64),
+                                   dist_km=dist_km[o_idx, d_idx])
+    else:
+        od_matrix = ODMatrix(**zone_info, dist_km=dist_km)
+
+    if verbose:
+        print(f"  : Successfully calculated zone-to-zone {impedance} matrix, "
+              f"{int(np.isnan(dist_km).sum())} OD pairs without path.")
+    return od_matrix
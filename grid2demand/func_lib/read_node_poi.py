@@ -8,21 +8,23 @@
 from __future__ import absolute_import
 
 import os
-from multiprocessing import Pool
+import functools
 from dataclasses import make_dataclass, fields, asdict
 from typing import Any
 
+import numpy as np
 import pandas as pd
 import shapely
 from pyproj import Transformer
 from tqdm.contrib.concurrent import process_map
-from tqdm import tqdm
 
-from grid2demand.utils_lib.net_utils import Node, POI, Zone
+from grid2demand.utils_lib.net_utils import Node, POI, Zone, NodeTable
 from grid2demand.utils_lib.pkg_settings import pkg_settings
 from grid2demand.utils_lib.utils import (check_required_files_exist,
                                          extend_dataclass,
                                          create_dataclass_from_dict)
+from grid2demand.utils_lib.data_cache import load_cached_table
+from grid2demand.utils_lib.parallel import parallel_map
 from pyufunc import (func_running_time, path2linux,
                      get_filenames_by_ext,)
 
@@ -108,6 +110,115 @@ def _create_node_from_dataframe(df_node: pd.DataFrame) -> dict[int, Node]:
     return node_dict
 
 
+def _create_node_table_from_dataframe(df_node: pd.DataFrame) -> NodeTable:
+    """Create a column-backed NodeTable from df_node in one vectorized pass.
+
+    Args:
+        df_node (pd.DataFrame): the dataframe of node from node.csv
+
+    Returns:
+        NodeTable: {node_id: lazy Node view}, columns follow the Node fields plus extra columns from node.csv
+    """
+    df_node = df_node.reset_index(drop=True)
+    x_coord = df_node["x_coord"].to_numpy(dtype=np.float64)
+    y_coord = df_node["y_coord"].to_numpy(dtype=np.float64)
+
+    # zone_id field in node.csv: empty or 0 values are assigned -1 in _zone_id
+    if "zone_id" in df_node.columns:
+        zone_id = pd.to_numeric(df_node["zone_id"], errors="coerce").to_numpy(dtype=np.float64)
+        _zone_id = np.where(np.isnan(zone_id) | (zone_id == 0), -1, np.nan_to_num(zone_id)).astype(np.int64)
+    else:
+        zone_id = np.full(len(df_node), None, dtype=object)
+        _zone_id = np.full(len(df_node), -1, dtype=np.int64)
+
+    node_columns = {
+        "id": df_node["node_id"].to_numpy(dtype=np.int64),
+        "x_coord": x_coord,
+        "y_coord": y_coord,
+        "production": np.zeros(len(df_node), dtype=np.float64),
+        "attraction": np.zeros(len(df_node), dtype=np.float64),
+        "zone_id": zone_id,
+        "geometry": shapely.points(x_coord, y_coord),
+        "_zone_id": _zone_id,
+    }
+
+    # extra columns from node.csv, e.g. activity_type
+    for col in df_node.columns:
+        if col not in node_columns and col != "node_id":
+            node_columns[col] = df_node[col].to_numpy()
+
+    return NodeTable(node_columns)
+
+
+def _from_wkt(wkt_arr: np.ndarray) -> np.ndarray:
+    """Parse an array of WKT strings, missing or invalid values become None"""
+    wkt_arr = np.asarray(wkt_arr, dtype=object)
+    return shapely.from_wkt(np.where(pd.isna(wkt_arr), None, wkt_arr), on_invalid="ignore")
+
+
+@functools.lru_cache(maxsize=None)
+def _get_utm_transformer(utm_epsg: int) -> Transformer:
+    """Get the (cached) transformer from WGS 84 to the UTM zone utm_epsg"""
+    return Transformer.from_crs("EPSG:4326", f"EPSG:{utm_epsg}", always_xy=True)
+
+
+def _get_utm_epsg(lng: float, lat: float) -> int:
+    """Get the EPSG code of the UTM zone containing (lng, lat), e.g. 32618 for UTM zone 18N"""
+    utm_zone = int((lng + 180) // 6) % 60 + 1
+    return (32600 if lat >= 0 else 32700) + utm_zone
+
+
+def _calc_poi_area(df_poi: pd.DataFrame) -> tuple[np.ndarray, np.ndarray]:
+    """Calculate the area of all POIs in one batch.
+
+    POIs with an empty area get the area of their projected polygon (square meters),
+    POIs with an area larger than 90000 get 0, the others keep their area.
+    All polygons are parsed at once, projected with one transformer call over all vertices
+    to the UTM zone of the dataset centroid, and measured with shapely.area.
+
+    Args:
+        df_poi (pd.DataFrame): the dataframe of poi from poi.csv, requires columns area and geometry
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: poi area and a mask of the POIs whose area was calculated
+    """
+    area = pd.to_numeric(df_poi["area"], errors="coerce").to_numpy(dtype=np.float64)
+    is_calculated = np.isnan(area) | (area == 0)
+    area = np.where(area > 90000, 0, area)
+
+    if not is_calculated.any():
+        return area, is_calculated
+
+    geometry = _from_wkt(df_poi["geometry"].to_numpy()[is_calculated])
+
+    # pick the UTM zone from the centroid of the dataset
+    centroid = shapely.centroid(geometry)
+    if shapely.is_missing(centroid).all():
+        area[is_calculated] = 0
+        return area, is_calculated
+    utm_epsg = _get_utm_epsg(np.nanmean(shapely.get_x(centroid)), np.nanmean(shapely.get_y(centroid)))
+    transformer = _get_utm_transformer(utm_epsg)
+
+    def _project(coords: np.ndarray) -> np.ndarray:
+        return np.column_stack(transformer.transform(coords[:, 0], coords[:, 1]))
+
+    # unparsable geometries have no area
+    area[is_calculated] = np.nan_to_num(shapely.area(shapely.transform(geometry, _project)))
+    return area, is_calculated
+
+
+def _save_poi_area(poi_file: str, area: np.ndarray, is_calculated: np.ndarray, encoding: str) -> None:
+    """Write calculated POI areas back to poi.csv, so the next run skips the projection"""
+
+    # areas above 90000 are treated as invalid when read from poi.csv, keep them to be recalculated
+    is_saved = is_calculated & (area <= 90000)
+
+    df_poi = pd.read_csv(poi_file, encoding=encoding)
+    df_poi["area"] = pd.to_numeric(df_poi["area"], errors="coerce")
+    df_poi.loc[is_saved, "area"] = area[is_saved]
+    df_poi.to_csv(poi_file, index=False, encoding=encoding)
+
+
 def _create_poi_from_dataframe(df_poi: pd.DataFrame) -> dict[int, POI]:
     """Create POI from df_poi.
 
@@ -142,46 +253,19 @@ def _create_poi_from_dataframe(df_poi: pd.DataFrame) -> dict[int, POI]:
 
     for i in range(len(df_poi)):
         try:
-            centroid = shapely.from_wkt(df_poi.loc[i, 'centroid'])
-
-            # check if area is empty or not
-            area = df_poi.loc[i, 'area']
-            if pd.isna(area) or not area:
-                geometry_shapely = shapely.from_wkt(df_poi.loc[i, 'geometry'])
-
-                # Set up a Transformer to convert from WGS 84 to UTM zone 18N (EPSG:32618)
-                transformer = Transformer.from_crs(
-                    "EPSG:4326", "EPSG:32618", always_xy=True)
-
-                # Transform the polygon's coordinates to UTM
-                transformed_coords = [transformer.transform(x, y) for x, y in geometry_shapely.exterior.coords]
-                transformed_polygon = shapely.Polygon(transformed_coords)
-
-                # square meters
-                area_sqm = transformed_polygon.area
-
-                # square feet
-                # area = area_sqm * 10.7639104
-
-                area = area_sqm
-
-            elif area > 90000:
-                area = 0
-            else:
-                pass
-
             # get poi id
             poi_id = int(df_poi.loc[i, 'poi_id'])
 
+            # x_coord, y_coord and area are parsed in one batch by _parse_poi_file
+            if pd.isna(df_poi.loc[i, 'x_coord']):
+                raise ValueError(f"invalid centroid {df_poi.loc[i, 'centroid']}")
+
             poi = POI_ext()
 
             for col in col_names:
                 setattr(poi, col, df_poi.loc[i, col])
 
             poi.id = poi_id
-            poi.x_coord = centroid.x
-            poi.y_coord = centroid.y
-            poi.area = area
 
             # poi = POI(
             #     id=df_poi.loc[i, 'poi_id'],
@@ -236,12 +320,10 @@ def _create_zone_from_dataframe_by_geometry(df_zone: pd.DataFrame) -> dict[int,
     for i in range(len(df_zone)):
         try:
             zone_id = df_zone.loc[i, 'zone_id']
-            zone_geometry = df_zone.loc[i, 'geometry']
 
-            zone_geometry_shapely = shapely.from_wkt(zone_geometry)
-            centroid_wkt = zone_geometry_shapely.centroid.wkt
-            x_coord = zone_geometry_shapely.centroid.x
-            y_coord = zone_geometry_shapely.centroid.y
+            # geometry, centroid and bounds are parsed in one batch by _parse_zone_file_by_geometry
+            if df_zone.loc[i, 'geometry'] is None:
+                raise ValueError("invalid geometry")
 
             zone = Zone_ext()
 
@@ -250,13 +332,6 @@ def _create_zone_from_dataframe_by_geometry(df_zone: pd.DataFrame) -> dict[int,
 
             zone.id = zone_id
             zone.name = zone_id
-            zone.x_coord = x_coord
-            zone.y_coord = y_coord
-            zone.centroid = centroid_wkt
-            zone.x_min = zone_geometry_shapely.bounds[0]
-            zone.y_min = zone_geometry_shapely.bounds[1]
-            zone.x_max = zone_geometry_shapely.bounds[2]
-            zone.y_max = zone_geometry_shapely.bounds[3]
 
             # zone = Zone(
             #     id=zone_id,
@@ -317,18 +392,8 @@ def _create_zone_from_dataframe_by_centroid(df_zone: pd.DataFrame) -> dict[int,
     for i in range(len(df_zone)):
         try:
             zone_id = df_zone.loc[i, 'zone_id']
-            x_coord = df_zone.loc[i, 'x_coord']
-            y_coord = df_zone.loc[i, 'y_coord']
-
-            # load zone geometry
-            try:
-                zone_geometry = df_zone.loc[i, 'geometry']
-            except Exception:
-                zone_geometry = ""
-
-            zone_centroid_shapely = shapely.Point(x_coord, y_coord)
-            centroid_wkt = zone_centroid_shapely.wkt
 
+            # centroid is parsed in one batch by _parse_zone_file_by_centroid
             zone = Zone_ext()
 
             for col in col_names:
@@ -336,8 +401,6 @@ def _create_zone_from_dataframe_by_centroid(df_zone: pd.DataFrame) -> dict[int,
 
             zone.id = zone_id
             zone.name = zone_id
-            zone.centroid = centroid_wkt
-            zone.geometry = zone_geometry
 
             # zone = Zone(
             #     id=zone_id,
@@ -360,17 +423,111 @@ def _create_zone_from_dataframe_by_centroid(df_zone: pd.DataFrame) -> dict[int,
     return zone_dict
 
 
+def _create_node_chunk(shared: dict, start: int, end: int) -> dict[int, Node]:
+    """Task of parallel_map: create Nodes from rows start:end of the shared df_node"""
+    return _create_node_from_dataframe(shared["df_node"].iloc[start:end])
+
+
+def _create_poi_chunk(shared: dict, start: int, end: int) -> dict[int, POI]:
+    """Task of parallel_map: create POIs from rows start:end of the shared df_poi"""
+    return _create_poi_from_dataframe(shared["df_poi"].iloc[start:end])
+
+
+def _create_zone_chunk_by_geometry(shared: dict, start: int, end: int) -> dict[int, Zone]:
+    """Task of parallel_map: create Zones from rows start:end of the shared df_zone with geometry"""
+    return _create_zone_from_dataframe_by_geometry(shared["df_zone"].iloc[start:end])
+
+
+def _create_zone_chunk_by_centroid(shared: dict, start: int, end: int) -> dict[int, Zone]:
+    """Task of parallel_map: create Zones from rows start:end of the shared df_zone with centroids"""
+    return _create_zone_from_dataframe_by_centroid(shared["df_zone"].iloc[start:end])
+
+
+def _parse_node_file(node_file: str, node_required_cols: list) -> pd.DataFrame:
+    """Parse node.csv with explicit dtypes in one pass"""
+    node_dtypes = {"node_id": np.int64, "x_coord": np.float64, "y_coord": np.float64, "activity_type": object}
+    try:
+        return pd.read_csv(node_file, usecols=node_required_cols,
+                           dtype={k: v for k, v in node_dtypes.items() if k in node_required_cols})
+    except Exception as e:
+        raise Exception(f"Error: Unable to read node.csv file for: {e}") from e
+
+
+def _parse_poi_file(poi_file: str, poi_required_cols: list, save_area: bool = False,
+                    verbose: bool = False) -> pd.DataFrame:
+    """Parse poi.csv: geometry, centroid coordinates and area are calculated in one batch"""
+    try:
+        encoding = 'utf-8'
+        df_poi = pd.read_csv(poi_file, usecols=poi_required_cols, encoding=encoding)
+    except Exception:
+        encoding = 'latin-1'
+        df_poi = pd.read_csv(poi_file, usecols=poi_required_cols, encoding=encoding)
+
+    # calculate area for all POIs in one batch
+    poi_area, is_calculated = _calc_poi_area(df_poi)
+    df_poi["area"] = poi_area
+
+    if verbose:
+        print(f"  : Calculated area for {is_calculated.sum()} POIs without area.")
+
+    if save_area and is_calculated.any():
+        _save_poi_area(poi_file, poi_area, is_calculated, encoding)
+        if verbose:
+            print(f"  : Saved calculated POI area to {poi_file}.")
+
+    centroid = _from_wkt(df_poi["centroid"].to_numpy())
+    df_poi["x_coord"] = shapely.get_x(centroid)
+    df_poi["y_coord"] = shapely.get_y(centroid)
+    df_poi["geometry"] = _from_wkt(df_poi["geometry"].to_numpy())
+    return df_poi
+
+
+def _parse_zone_file_by_geometry(zone_file: str, zone_required_cols: list) -> pd.DataFrame:
+    """Parse zone.csv with polygon geometry: centroid and bounds are calculated in one batch"""
+    df_zone = pd.read_csv(zone_file, usecols=zone_required_cols)
+
+    geometry = _from_wkt(df_zone["geometry"].to_numpy())
+    centroid = shapely.centroid(geometry)
+    bounds = shapely.bounds(geometry)
+
+    df_zone["geometry"] = geometry
+    df_zone["x_coord"] = shapely.get_x(centroid)
+    df_zone["y_coord"] = shapely.get_y(centroid)
+    df_zone["centroid"] = shapely.to_wkt(centroid, rounding_precision=-1)
+    df_zone["x_min"] = bounds[:, 0]
+    df_zone["y_min"] = bounds[:, 1]
+    df_zone["x_max"] = bounds[:, 2]
+    df_zone["y_max"] = bounds[:, 3]
+    return df_zone
+
+
+def _parse_zone_file_by_centroid(zone_file: str, zone_required_cols: list) -> pd.DataFrame:
+    """Parse zone.csv with centroid coordinates"""
+    df_zone = pd.read_csv(zone_file, usecols=zone_required_cols)
+    df_zone["centroid"] = shapely.to_wkt(shapely.points(df_zone["x_coord"].to_numpy(dtype=np.float64),
+                                                        df_zone["y_coord"].to_numpy(dtype=np.float64)),
+                                         rounding_precision=-1)
+    if "geometry" not in df_zone.columns:
+        df_zone["geometry"] = ""
+    return df_zone
+
+
 # main functions for reading node, poi, zone files and network
 
 
 @func_running_time
-def read_node(node_file: str = "", cpu_cores: int = 1, verbose: bool = False) -> dict[int: Node]:
+def read_node(node_file: str = "", cpu_cores: int = 1, verbose: bool = False,
+              columnar: bool = False, use_cache: bool = True) -> dict[int: Node]:
     """Read node.csv file and return a dict of nodes.
 
     Args:
         node_file (str, optional): node file path. Defaults to "".
         cpu_cores (int, optional): number of cpu cores for parallel processing. Defaults to 1.
         verbose (bool, optional): print processing information. Defaults to False.
+        columnar (bool, optional): parse node.csv in one vectorized pass and return a column-backed
+            NodeTable instead of per-node records. Defaults to False.
+        use_cache (bool, optional): load the parsed node table from the on-disk cache
+            if node.csv is unchanged (requires pyarrow). Defaults to True.
 
     Raises:
         FileNotFoundError: File: {node_file} does not exist.
@@ -386,6 +543,13 @@ def read_node(node_file: str = "", cpu_cores: int = 1, verbose: bool = False) ->
         # if node_file does not exist, raise error
         >>> node_dict = read_node(node_file = r"../dataset/ASU/node.csv")
         FileNotFoundError: File: ../dataset/ASU/node.csv does not exist.
+
+        # load nodes into a column-backed NodeTable
+        >>> node_table = read_node(node_file = r"../dataset/ASU/node.csv", columnar=True)
+        >>> node_table[1]["x_coord"]
+        0.0
+        >>> node_table.column("x_coord")
+        array([0.0, ...])
     """
 
     # convert path to linux path
@@ -396,7 +560,7 @@ def read_node(node_file: str = "", cpu_cores: int = 1, verbose: bool = False) ->
         raise FileNotFoundError(f"File: {node_file} does not exist.")
 
     # read node.csv with specified columns and chunksize for iterations
-    node_required_cols = pkg_settings["node_fields"]
+    node_required_cols = list(pkg_settings["node_fields"])
     chunk_size = pkg_settings["data_chunk_size"]
 
     # read first two rows to check whether required fields are in node.csv
@@ -407,30 +571,29 @@ def read_node(node_file: str = "", cpu_cores: int = 1, verbose: bool = False) ->
         node_required_cols.append("zone_id")
 
     if verbose:
-        print(f"  : Reading node.csv with specified columns: {node_required_cols} \
-                    \n    and chunksize {chunk_size} for iterations...")
+        print(f"  : Reading node.csv with specified columns: {node_required_cols}...")
 
-    try:
-        # Get total rows in poi.csv and calculate total chunks
-        total_rows = sum(1 for _ in open(node_file)) - 1  # Exclude header row
-        total_chunks = total_rows // chunk_size + 1
-        df_node_chunk = pd.read_csv(node_file, usecols=node_required_cols, chunksize=chunk_size)
-    except Exception as e:
-        raise Exception(f"Error: Unable to read node.csv file for: {e}")
+    df_node = load_cached_table(node_file, "node",
+                                lambda: _parse_node_file(node_file, node_required_cols),
+                                params={"usecols": node_required_cols},
+                                use_cache=use_cache,
+                                verbose=verbose)
+
+    if columnar:
+        node_table = _create_node_table_from_dataframe(df_node)
+
+        if verbose:
+            print(f"  : Successfully loaded node.csv: {len(node_table)} Nodes loaded.")
+        return node_table
 
     if verbose:
         print(f"  : Parallel creating Nodes using Pool with {cpu_cores} CPUs. Please wait...")
 
     node_dict_final = {}
 
-    # Parallel processing using Pool
-    with Pool(cpu_cores) as pool:
-        # results = pool.map(_create_node_from_dataframe, df_node_chunk)
-        results = list(tqdm(pool.imap(_create_node_from_dataframe, df_node_chunk), total=total_chunks))
-        pool.close()
-        pool.join()
-
-    # results = process_map(_create_node_from_dataframe, df_node_chunk, max_workers=cpu_cores)
+    # Parallel processing using Pool, df_node is shared once per worker and tasks are row ranges
+    results = parallel_map(_create_node_chunk, {"df_node": df_node}, len(df_node),
+                           cpu_cores=cpu_cores, chunk_size=chunk_size, progress=True)
 
     for node_dict in results:
         node_dict_final.update(node_dict)
@@ -444,13 +607,18 @@ def read_node(node_file: str = "", cpu_cores: int = 1, verbose: bool = False) ->
 
 
 @func_running_time
-def read_poi(poi_file: str = "", cpu_cores: int = 1, verbose: bool = False) -> dict[int: POI]:
+def read_poi(poi_file: str = "", cpu_cores: int = 1, verbose: bool = False,
+             save_area: bool = False, use_cache: bool = True) -> dict[int: POI]:
     """Read poi.csv file and return a dict of POIs.
 
     Args:
         poi_file (str): The poi.csv file path. default is "".
         cpu_cores (int, optional): number of cpu cores for parallel processing. Defaults to 1.
         verbose (bool, optional): print processing information. Defaults to False.
+        save_area (bool, optional): write calculated areas back to the area column of poi.csv,
+            so later runs skip the projection. Defaults to False.
+        use_cache (bool, optional): load the parsed poi table from the on-disk cache
+            if poi.csv is unchanged (requires pyarrow). Defaults to True.
 
     Raises:
         FileNotFoundError: if poi_file does not exist.
@@ -483,35 +651,22 @@ def read_poi(poi_file: str = "", cpu_cores: int = 1, verbose: bool = False) -> d
     if verbose:
         print(f"  : Reading poi.csv with specified columns: {poi_required_cols} \
                     \n    and chunksize {chunk_size} for iterations...")
-    try:
-        # Get total rows in poi.csv and calculate total chunks
-        total_rows = sum(1 for _ in open(poi_file)) - 1  # Exclude header row
-        total_chunks = total_rows // chunk_size + 1
 
-        df_poi_chunk = pd.read_csv(poi_file, usecols=poi_required_cols, chunksize=chunk_size, encoding='utf-8')
+    df_poi = load_cached_table(poi_file, "poi",
+                               lambda: _parse_poi_file(poi_file, poi_required_cols, save_area, verbose),
+                               params={"usecols": poi_required_cols},
+                               geometry_cols=("geometry",),
+                               use_cache=use_cache,
+                               verbose=verbose)
 
-    except Exception:
-        df_poi_chunk = pd.read_csv(poi_file, usecols=poi_required_cols, chunksize=chunk_size, encoding='latin-1')
-
-    # Parallel processing using Pool
+    # Parallel processing using Pool, df_poi is shared once per worker and tasks are row ranges
     if verbose:
         print(f"  : Parallel creating POIs using Pool with {cpu_cores} CPUs. Please wait...")
 
     poi_dict_final = {}
 
-    with Pool(cpu_cores) as pool:
-        # results = pool.map(_create_poi_from_dataframe, df_poi_chunk)
-        try:
-            results = list(tqdm(pool.imap(_create_poi_from_dataframe, df_poi_chunk), total=total_chunks))
-        except Exception:
-            try:
-                results = pool.map(_create_poi_from_dataframe, df_poi_chunk)
-            except Exception as e:
-                raise Exception(f"Error: {e}")
-        pool.close()
-        pool.join()
-
-    # results = process_map(_create_poi_from_dataframe, df_poi_chunk, max_workers=cpu_cores)
+    results = parallel_map(_create_poi_chunk, {"df_poi": df_poi}, len(df_poi),
+                           cpu_cores=cpu_cores, chunk_size=chunk_size, progress=True)
 
     for poi_dict in results:
         poi_dict_final.update(poi_dict)
@@ -526,7 +681,8 @@ def read_poi(poi_file: str = "", cpu_cores: int = 1, verbose: bool = False) -> d
 
 
 @func_running_time
-def read_zone_by_geometry(zone_file: str = "", cpu_cores: int = 1, verbose: bool = False) -> dict[int: Zone]:
+def read_zone_by_geometry(zone_file: str = "", cpu_cores: int = 1, verbose: bool = False,
+                          use_cache: bool = True) -> dict[int: Zone]:
     """Read zone.csv file and return a dict of Zones.
 
     Raises:
@@ -537,6 +693,8 @@ def read_zone_by_geometry(zone_file: str = "", cpu_cores: int = 1, verbose: bool
         zone_file (str, optional): the input zone file path. Defaults to "".
         cpu_cores (int, optional): number of cpu cores for parallel processing. Defaults to 1.
         verbose (bool, optional): print processing information. Defaults to False.
+        use_cache (bool, optional): load the parsed zone table from the on-disk cache
+            if zone.csv is unchanged (requires pyarrow). Defaults to True.
 
     Returns:
         _type_: _description_
@@ -565,8 +723,13 @@ def read_zone_by_geometry(zone_file: str = "", cpu_cores: int = 1, verbose: bool
             raise FileNotFoundError(f"Required column: {col} is not in zone.csv. \
                 Please make sure you have {zone_required_cols} in zone.csv.")
 
-    # load zone.csv with specified columns and chunksize for iterations
-    df_zone_chunk = pd.read_csv(zone_file, usecols=zone_required_cols, chunksize=chunk_size)
+    # load zone.csv with specified columns
+    df_zone = load_cached_table(zone_file, "zone_geometry",
+                                lambda: _parse_zone_file_by_geometry(zone_file, zone_required_cols),
+                                params={"usecols": zone_required_cols},
+                                geometry_cols=("geometry",),
+                                use_cache=use_cache,
+                                verbose=verbose)
 
     # Parallel processing using Pool
     if verbose:
@@ -574,10 +737,8 @@ def read_zone_by_geometry(zone_file: str = "", cpu_cores: int = 1, verbose: bool
 
     zone_dict_final = {}
 
-    with Pool(cpu_cores) as pool:
-        results = pool.map(_create_zone_from_dataframe_by_geometry, df_zone_chunk)
-        pool.close()
-        pool.join()
+    results = parallel_map(_create_zone_chunk_by_geometry, {"df_zone": df_zone}, len(df_zone),
+                           cpu_cores=cpu_cores, chunk_size=chunk_size)
 
     for zone_dict in results:
         zone_dict_final.update(zone_dict)
@@ -586,19 +747,22 @@ def read_zone_by_geometry(zone_file: str = "", cpu_cores: int = 1, verbose: bool
         print(f"  : Successfully loaded zone.csv: {len(zone_dict_final)} Zones loaded.")
 
     zone_dict_final = {k: create_dataclass_from_dict(
-        "POI", v) for k, v in zone_dict_final.items()}
+        "Zone", v) for k, v in zone_dict_final.items()}
 
     return zone_dict_final
 
 
 @func_running_time
-def read_zone_by_centroid(zone_file: str = "", cpu_cores: int = 1, verbose: bool = False) -> dict[int: Zone]:
+def read_zone_by_centroid(zone_file: str = "", cpu_cores: int = 1, verbose: bool = False,
+                          use_cache: bool = True) -> dict[int: Zone]:
     """Read zone.csv file and return a dict of Zones.
 
     Args:
         zone_file (str, optional): the input zone file path. Defaults to "".
         cpu_cores (int, optional): number of cpu cores for parallel processing. Defaults to 1.
         verbose (bool, optional): print processing information. Defaults to False.
+        use_cache (bool, optional): load the parsed zone table from the on-disk cache
+            if zone.csv is unchanged (requires pyarrow). Defaults to True.
 
     Raises:
         FileNotFoundError: File: {zone_file} does not exist.
@@ -631,8 +795,12 @@ def read_zone_by_centroid(zone_file: str = "", cpu_cores: int = 1, verbose: bool
             raise FileNotFoundError(f"Required column: {col} is not in zone.csv. \
                 Please make sure you have {zone_required_cols} in zone.csv.")
 
-    # load zone.csv with specified columns and chunksize for iterations
-    df_zone_chunk = pd.read_csv(zone_file, usecols=zone_required_cols, chunksize=chunk_size)
+    # load zone.csv with specified columns
+    df_zone = load_cached_table(zone_file, "zone_centroid",
+                                lambda: _parse_zone_file_by_centroid(zone_file, zone_required_cols),
+                                params={"usecols": zone_required_cols},
+                                use_cache=use_cache,
+                                verbose=verbose)
 
     # Parallel processing using Pool
     if verbose:
@@ -640,10 +808,8 @@ def read_zone_by_centroid(zone_file: str = "", cpu_cores: int = 1, verbose: bool
 
     zone_dict_final = {}
 
-    with Pool(cpu_cores) as pool:
-        results = pool.map(_create_zone_from_dataframe_by_centroid, df_zone_chunk)
-        pool.close()
-        pool.join()
+    results = parallel_map(_create_zone_chunk_by_centroid, {"df_zone": df_zone}, len(df_zone),
+                           cpu_cores=cpu_cores, chunk_size=chunk_size)
 
     for zone_dict in results:
         zone_dict_final.update(zone_dict)
@@ -652,11 +818,65 @@ def read_zone_by_centroid(zone_file: str = "", cpu_cores: int = 1, verbose: bool
         print(f"  : Successfully loaded zone.csv: {len(zone_dict_final)} Zones loaded.")
 
     zone_dict_final = {k: create_dataclass_from_dict(
-        "POI", v) for k, v in zone_dict_final.items()}
+        "Zone", v) for k, v in zone_dict_final.items()}
 
     return zone_dict_final
 
 
+@func_running_time
+def read_link(link_file: str = "", verbose: bool = False) -> pd.DataFrame:
+    """Read GMNS link.csv file and return a table of directed links.
+
+    Links with directed == 0 (if the column exists) are two-way and also added in the reverse direction.
+    Missing free_speed is filled by pkg_settings["default_free_speed"].
+
+    Args:
+        link_file (str, optional): the input link file path. Defaults to "".
+        verbose (bool, optional): print processing information. Defaults to False.
+
+    Raises:
+        FileNotFoundError: File: {link_file} does not exist.
+        FileNotFoundError: Required column: {col} is not in link.csv.
+
+    Returns:
+        pd.DataFrame: columns [from_node_id, to_node_id, length, free_speed], length in meters, free_speed in km/h
+    """
+
+    # convert path to linux path
+    link_file = path2linux(link_file)
+
+    # check if link_file exists
+    if not os.path.exists(link_file):
+        raise FileNotFoundError(f"File: {link_file} does not exist.")
+
+    link_required_cols = pkg_settings["link_fields"]
+    col_names = pd.read_csv(link_file, nrows=0).columns.tolist()
+    for col in link_required_cols:
+        if col not in col_names:
+            raise FileNotFoundError(f"Required column: {col} is not in link.csv. \
+                Please make sure you have {link_required_cols} in link.csv.")
+
+    df_link = pd.read_csv(link_file,
+                          usecols=[col for col in link_required_cols + ["free_speed", "directed"] if col in col_names])
+    if "free_speed" not in df_link.columns:
+        df_link["free_speed"] = np.nan
+    df_link["free_speed"] = pd.to_numeric(df_link["free_speed"], errors="coerce").fillna(
+        pkg_settings["default_free_speed"])
+
+    # add reverse direction of two-way links
+    if "directed" in df_link.columns:
+        df_reverse = df_link[df_link["directed"] == 0].rename(columns={"from_node_id": "to_node_id",
+                                                                       "to_node_id": "from_node_id"})
+        df_link = pd.concat([df_link, df_reverse], ignore_index=True)
+
+    df_link = df_link[["from_node_id", "to_node_id", "length", "free_speed"]]
+
+    if verbose:
+        print(f"  : Successfully loaded link.csv: {len(df_link)} directed links loaded.")
+
+    return df_link
+
+
 def read_network(input_folder: str = "", cpu_cores: int = 1, verbose: bool = False) -> dict[str: dict]:
     """Read node.csv and poi.csv files and return a dict of nodes and a dict of POIs.
 
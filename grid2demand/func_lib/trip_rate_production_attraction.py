@@ -5,26 +5,42 @@
 # Author/Copyright: Mr. Xiangyong Luo
 ##############################################################
 
+import numpy as np
 import pandas as pd
 import os
 
+from grid2demand.utils_lib.net_utils import ColumnTable
 from grid2demand.utils_lib.pkg_settings import pkg_settings
 from pyufunc import path2linux
 
+# activity types of nodes with their own production and attraction, in the order of the categorical codes
+NODE_ACTIVITY_TYPES = ["residential", "boundary", "poi"]
+
+# node columns used for node production and attraction, with the value of nodes without them
+NODE_PROD_ATTR_COLUMNS = {"activity_type": "", "_zone_id": -1, "poi_id": np.nan}
+
 
 def gen_poi_trip_rate(poi_dict: dict,
                       trip_rate_file: str = "",
                       trip_purpose: int = 1,
-                      verbose: bool = False) -> dict:
+                      verbose: bool = False,
+                      columnar: bool = False) -> dict:
     """Generate trip rate for each poi.
 
+    POI buildings are factorized into categorical codes and the distinct buildings are joined against the
+    trip rate table at once; each POI then gets a copy of the trip rate dict of its building. With columnar,
+    the rates are returned as float arrays instead, see calc_poi_trip_rate.
+
     Args:
         poi_dict (dict): the dictionary of poi
         trip_rate_file (str, optional): poi trip rate file path. Defaults to "".
         trip_purpose (int, optional): the trip purpose. Defaults to 1. 1: HBW, 2: HBO, 3: NHB.
+        verbose (bool, optional): print processing information. Defaults to False.
+        columnar (bool, optional): return the trip rates as arrays aligned to the POIs, see calc_poi_trip_rate,
+            instead of a trip rate dict per POI. poi_dict is not changed. Defaults to False.
 
     Returns:
-        dict: the dictionary of poi with trip rate
+        dict: the dictionary of poi with trip rate, or the trip rate arrays if columnar
 
     Examples:
         >>> poi_dict = gd.read_poi("./dataset/ASU/poi.csv")
@@ -34,9 +50,6 @@ def gen_poi_trip_rate(poi_dict: dict,
         'unit_of_measure': '1,000 Sq. Ft. GFA', 'trip_purpose': 1, 'production_rate1': 10.0,
         'attraction_rate1': 10.0, 'production_notes': 1, 'attraction_notes': 1})
     """
-    poi_purpose_prod_dict = pkg_settings.get("poi_purpose_prod_dict")
-    poi_purpose_attr_dict = pkg_settings.get("poi_purpose_attr_dict")
-
     default_flag = False
 
     # if no poi trip rate file provided, use default trip rate
@@ -48,49 +61,48 @@ def gen_poi_trip_rate(poi_dict: dict,
         print(f"  : {trip_rate_file} does not exist, use default trip rate.")
         default_flag = True
 
+    if columnar:
+        poi_trip_rate = calc_poi_trip_rate(poi_dict, "" if default_flag else trip_rate_file, trip_purpose)
+        if verbose:
+            print(f"  : Successfully generated trip rate arrays of {len(poi_dict)} POIs.")
+        return poi_trip_rate
+
+    pois = list(poi_dict.values())
+
     if default_flag:
-        for poi_id in poi_dict:
-            building = poi_dict[poi_id]["building"]
-
-            # if poi_type in default setting, use the default trip rate
-            # else use 0.1 as the trip rate for production
-            if building in poi_purpose_prod_dict:
-                production_rate = poi_purpose_prod_dict[building][trip_purpose]
-                production_notes = 1
-            else:
-                production_rate = 0.1
-                production_notes = 0
-
-            # if poi_type in default setting, use the default trip rate
-            # else use 0.1 as the trip rate for attraction
-            if building in poi_purpose_attr_dict:
-                attraction_rate = poi_purpose_attr_dict[building][trip_purpose]
-                attraction_notes = 1
-            else:
-                attraction_rate = 0.1
-                attraction_notes = 0
-
-            # update poi_trip_rate in the poi_dict
-            poi_dict[poi_id]["trip_rate"] = {"building": building, "unit_of_measure": '1,000 Sq. Ft. GFA',
-                                          "trip_purpose": trip_purpose,
-                                          f"production_rate{trip_purpose}": production_rate,
-                                          f"attraction_rate{trip_purpose}": attraction_rate,
-                                          "production_notes": production_notes,
-                                          "attraction_notes": attraction_notes}
+        # trip rate dict of each distinct building, joined against the default setting at once
+        building_codes, building = pd.factorize(_get_poi_building(pois), use_na_sentinel=False)
+        production_rate, attraction_rate = join_trip_rate(building, gen_trip_rate_lookup("", [trip_purpose]))
+
+        # notes: 1 if the building has a rate of trip_purpose in the default setting, 0 if it takes the rate 0.1
+        production_notes, attraction_notes = [
+            index_category(building, pd.Index([name for name, rates in pkg_settings.get(key).items()
+                                               if trip_purpose in rates])) >= 0
+            for key in ["poi_purpose_prod_dict", "poi_purpose_attr_dict"]]
+
+        building_trip_rate = [{"building": building_name, "unit_of_measure": '1,000 Sq. Ft. GFA',
+                               "trip_purpose": trip_purpose,
+                               f"production_rate{trip_purpose}": production_rate[k, 0].item(),
+                               f"attraction_rate{trip_purpose}": attraction_rate[k, 0].item(),
+                               "production_notes": int(production_notes[k]),
+                               "attraction_notes": int(attraction_notes[k])}
+                              for k, building_name in enumerate(building)]
+
+        # update poi_trip_rate in the poi_dict
+        for poi, code in zip(pois, building_codes.tolist()):
+            poi["trip_rate"] = building_trip_rate[code].copy()
         print("  : Successfully generated poi trip rate with default setting.")
         return poi_dict
 
-    # if valid input file is provided, use the trip rate in the file
-    df_trip_rate = pd.read_csv(trip_rate_file)
-    df_trip_rate_dict = {
-        df_trip_rate.loc[i, 'building']: df_trip_rate.loc[i, :]
-        for i in range(len(df_trip_rate))
-    }
+    # if valid input file is provided, use the trip rate in the file: each POI gets the row of its building,
+    # later rows of the same building overwrite earlier ones
+    df_trip_rate = pd.read_csv(trip_rate_file).drop_duplicates("building", keep="last")
+    building_rows = df_trip_rate.to_dict("records")
+    building_codes = index_category(_get_poi_building(pois), pd.Index(df_trip_rate["building"]))
 
-    for poi_id in poi_dict:
-        building = poi_dict[poi_id]["building"]
-        if building in df_trip_rate_dict:
-            poi_dict[poi_id].trip_rate = df_trip_rate_dict[building].to_dict()
+    for poi, code in zip(pois, building_codes.tolist()):
+        if code >= 0:
+            poi["trip_rate"] = dict(building_rows[code])
 
     if verbose:
         print(f"  : Successfully generated poi trip rate from {trip_rate_file}.")
@@ -98,23 +110,75 @@ def gen_poi_trip_rate(poi_dict: dict,
     return poi_dict
 
 
+def _get_poi_building(pois: list) -> np.ndarray:
+    """Building type of POIs as an object array"""
+    return np.array([poi["building"] for poi in pois], dtype=object)
+
+
+def _get_poi_area(pois: list) -> np.ndarray:
+    """Area of POIs as a float array, 0 if missing"""
+    area = pd.to_numeric(pd.Series([poi["area"] for poi in pois], dtype=object), errors="coerce")
+    return area.fillna(0).to_numpy(dtype=np.float64)
+
+
+def calc_poi_trip_rate(poi_dict: dict, trip_rate_file: str = "", trip_purpose: int = 1) -> dict:
+    """Production and attraction rates of POIs for a trip purpose, as float arrays aligned to the POIs
+
+    The building of each POI is joined against the trip rate table (categorical codes + lookup arrays,
+    see gen_trip_rate_lookup) in one vectorized operation.
+
+    Args:
+        poi_dict (dict): the dictionary of poi
+        trip_rate_file (str, optional): poi trip rate file path. Defaults to "", use the default trip rate.
+        trip_purpose (int, optional): the trip purpose. Defaults to 1.
+
+    Returns:
+        dict: {"poi_id", "building", "area", "production_rate", "attraction_rate": arrays in the iteration order
+            of poi_dict, "trip_purpose": trip_purpose}
+    """
+    pois = list(poi_dict.values())
+    building = _get_poi_building(pois)
+    production_rate, attraction_rate = join_trip_rate(building, gen_trip_rate_lookup(trip_rate_file, [trip_purpose]))
+    return {"poi_id": np.array(list(poi_dict)),
+            "building": building,
+            "area": _get_poi_area(pois),
+            "production_rate": production_rate[:, 0],
+            "attraction_rate": attraction_rate[:, 0],
+            "trip_purpose": trip_purpose}
+
+
 def gen_node_prod_attr(node_dict: dict,
                        poi_dict: dict,
                        residential_production: float = 10.0,
                        residential_attraction: float = 10.0,
                        boundary_production: float = 1000.0,
                        boundary_attraction: float = 1000.0,
-                       verbose: bool = False) -> dict:
-    # sourcery skip: merge-duplicate-blocks, remove-redundant-if
+                       verbose: bool = False,
+                       *,
+                       default_production: float = 50.0,
+                       default_attraction: float = 50.0,
+                       poi_trip_rate: dict = None) -> dict:
     """Generate production and attraction for each node.
 
+    Values are set by masks over the node columns, see calc_node_prod_attr_array: categorical codes of
+    activity_type, the _zone_id mask and a gather of POI values by poi_id. A NodeTable is updated in one step
+    per column, per-node records are updated one by one.
+
+    The value of a poi node is trip rate * area / 1000 of its POI, from the trip rate dict of the POI or from
+    poi_trip_rate. A poi node whose POI is not found or has no trip rate keeps its production and attraction.
+
     Args:
-        node_dict (dict): Node dictionary
+        node_dict (dict): Node dictionary or NodeTable
         poi_dict (dict): POI dictionary
         residential_production (float, optional): the production of residential area. Defaults to 10.0.
         residential_attraction (float, optional): the attraction of residential area. Defaults to 10.0.
         boundary_production (float, optional): boundary production, also outside production. Defaults to 1000.0.
         boundary_attraction (float, optional): boundary attraction, also the outside attraction. Defaults to 1000.0.
+        verbose (bool, optional): print processing information. Defaults to False.
+        default_production (float, optional): production of other nodes. Defaults to 50.0.
+        default_attraction (float, optional): attraction of other nodes. Defaults to 50.0.
+        poi_trip_rate (dict, optional): trip rate arrays from gen_poi_trip_rate(columnar=True), used instead of
+            the trip rate dicts in poi_dict. Defaults to None.
 
     Returns:
         dict: Node dictionary with generated production and attraction
@@ -127,31 +191,236 @@ def gen_node_prod_attr(node_dict: dict,
         >>> node_prod_attr[1]
         Node(node_id=1, poi_id=0, x=0.0, y=0.0, activity_type='residential', production=10.0, attraction=10.0)
     """
+    node_columns = _get_node_columns(node_dict, NODE_PROD_ATTR_COLUMNS)
+
+    if poi_trip_rate is not None:
+        area = poi_trip_rate["area"] / 1000
+        poi_prod_attr = {"poi_id": poi_trip_rate["poi_id"],
+                         "production": (poi_trip_rate["production_rate"] * area)[:, None],
+                         "attraction": (poi_trip_rate["attraction_rate"] * area)[:, None]}
+    else:
+        is_poi = node_columns["activity_type"] == "poi"
+        poi_prod_attr = _get_poi_prod_attr_from_trip_rate(poi_dict, pd.unique(node_columns["poi_id"][is_poi]))
+
+    # poi nodes without POI value are left NaN and keep their production and attraction
+    prod_attr = calc_node_prod_attr_array(node_dict, poi_prod_attr,
+                                          residential_production, residential_attraction,
+                                          boundary_production, boundary_attraction,
+                                          default_production, default_attraction,
+                                          poi_fallback={"production": np.nan, "attraction": np.nan},
+                                          node_columns=node_columns)
+    production, attraction = prod_attr["production"][:, 0], prod_attr["attraction"][:, 0]
+    is_set = ~np.isnan(production)
+
+    if isinstance(node_dict, ColumnTable):
+        rows = node_dict.rows[is_set]
+        node_dict.set_column("production", production[is_set], rows=rows)
+        node_dict.set_column("attraction", attraction[is_set], rows=rows)
+    else:
+        nodes = list(node_dict.values())
+        set_value = dict.__setitem__ if nodes and isinstance(nodes[0], dict) else setattr
+        for i, node_production, node_attraction in zip(np.flatnonzero(is_set).tolist(), production[is_set].tolist(),
+                                                        attraction[is_set].tolist()):
+            set_value(nodes[i], "production", node_production)
+            set_value(nodes[i], "attraction", node_attraction)
 
-    for node in node_dict.values():
-        if node["activity_type"] == "residential":
-            node["production"] = residential_production
-            node["attraction"] = residential_attraction
-        elif node["activity_type"] == "boundary":
-            node["production"] = boundary_production
-            node["attraction"] = boundary_attraction
-        elif node["activity_type"] == "poi":
-            if node["poi_id"] in poi_dict:
-                poi_trip_rate = poi_dict[node["poi_id"]]["trip_rate"]
-                for key in poi_trip_rate:
-                    if "production_rate" in key:
-                        node["production"] = poi_trip_rate[key] * \
-                            poi_dict[node["poi_id"]].area / 1000
-                    if "attraction_rate" in key:
-                        node["attraction"] = poi_trip_rate[key] * \
-                            poi_dict[node["poi_id"]].area / 1000
-        elif node["_zone_id"] != -1:
-            node["production"] = boundary_production
-            node["attraction"] = boundary_attraction
-        else:
-            node["production"] = 50
-            node["attraction"] = 50
     if verbose:
         print("  : Successfully generated production and attraction for each node based on poi trip rate.")
 
     return node_dict
+
+
+def _get_poi_prod_attr_from_trip_rate(poi_dict: dict, poi_ids: np.ndarray) -> dict:
+    """Production and attraction of the POIs in poi_ids from their trip rate dicts, NaN if no trip rate
+
+    The last production_rate / attraction_rate key of a trip rate dict is used, POIs not in poi_dict are skipped.
+    """
+    poi_ids = [poi_id for poi_id in poi_ids.tolist() if poi_id in poi_dict]
+    production, attraction = np.full((len(poi_ids), 1), np.nan), np.full((len(poi_ids), 1), np.nan)
+    for k, poi_id in enumerate(poi_ids):
+        poi = poi_dict[poi_id]
+        for key, rate in poi["trip_rate"].items():
+            if "production_rate" in key:
+                production[k] = rate * poi["area"] / 1000
+            if "attraction_rate" in key:
+                attraction[k] = rate * poi["area"] / 1000
+    return {"poi_id": np.array(poi_ids), "production": production, "attraction": attraction}
+
+
+def gen_trip_rate_lookup(trip_rate_file: str = "", trip_purposes: list = (1,)) -> dict:
+    """Trip rate lookup arrays of buildings for trip purposes, from trip_rate_file or the default setting
+
+    Row k of production_rate / attraction_rate holds the rates of building[k] for trip_purposes, the last row
+    holds the rates of buildings not listed: 0.1 with the default setting, no trips (0) with a trip rate file,
+    same as gen_poi_trip_rate. With the default setting, a listed building without a rate for a trip purpose
+    also gets 0.1.
+
+    Args:
+        trip_rate_file (str, optional): trip rate csv file with columns building, production_rate{trip_purpose}
+            and attraction_rate{trip_purpose}. Defaults to "", use poi_purpose_prod_dict and poi_purpose_attr_dict
+            in pkg_settings.
+        trip_purposes (list, optional): trip purposes, one column per purpose. Defaults to (1,).
+
+    Raises:
+        ValueError: trip_rate_file has no rate column of a trip purpose
+
+    Returns:
+        dict: {"building": pd.Index, "trip_purposes": list, "production_rate": np.ndarray,
+            "attraction_rate": np.ndarray}, rates of shape (len(building) + 1, len(trip_purposes))
+    """
+    trip_purposes = list(trip_purposes)
+
+    if trip_rate_file and os.path.isfile(path2linux(trip_rate_file)):
+        # later rows of the same building overwrite earlier ones, empty rates count as no trips
+        df_trip_rate = pd.read_csv(trip_rate_file).drop_duplicates("building", keep="last")
+        rate_cols = [f"{rate}_rate{trip_purpose}" for rate in ["production", "attraction"]
+                     for trip_purpose in trip_purposes]
+        if missing_cols := [col for col in rate_cols if col not in df_trip_rate.columns]:
+            raise ValueError(f"Error: columns {missing_cols} not found in trip rate file {trip_rate_file}.")
+
+        rates = df_trip_rate[rate_cols].apply(pd.to_numeric, errors="coerce").fillna(0).to_numpy(np.float64)
+        rates = np.vstack([rates, np.zeros(len(rate_cols))])
+        return {"building": pd.Index(df_trip_rate["building"]),
+                "trip_purposes": trip_purposes,
+                "production_rate": rates[:, :len(trip_purposes)],
+                "attraction_rate": rates[:, len(trip_purposes):]}
+
+    poi_purpose_prod_dict = pkg_settings.get("poi_purpose_prod_dict")
+    poi_purpose_attr_dict = pkg_settings.get("poi_purpose_attr_dict")
+    building = pd.Index(list(dict.fromkeys([*poi_purpose_prod_dict, *poi_purpose_attr_dict])))
+    return {"building": building,
+            "trip_purposes": trip_purposes,
+            "production_rate": np.array([[poi_purpose_prod_dict.get(name, {}).get(trip_purpose, 0.1)
+                                          for trip_purpose in trip_purposes] for name in [*building, None]],
+                                        dtype=np.float64),
+            "attraction_rate": np.array([[poi_purpose_attr_dict.get(name, {}).get(trip_purpose, 0.1)
+                                          for trip_purpose in trip_purposes] for name in [*building, None]],
+                                        dtype=np.float64)}
+
+
+def index_category(values: np.ndarray, categories: pd.Index) -> np.ndarray:
+    """Position of each value in categories, -1 if not found, e.g. building types or node activity types
+
+    Values are factorized into categorical codes first, so only the distinct values are matched against
+    categories, and the codes are mapped to positions by one gather.
+    """
+    codes, uniques = pd.factorize(np.asarray(values, dtype=object))
+    return np.append(categories.get_indexer(uniques), -1)[codes]
+
+
+def join_trip_rate(building: np.ndarray, trip_rate_lookup: dict) -> tuple[np.ndarray, np.ndarray]:
+    """Production and attraction rates of buildings, by one categorical join against the trip rate lookup
+
+    Args:
+        building (np.ndarray): building type of each POI
+        trip_rate_lookup (dict): trip rate lookup arrays from gen_trip_rate_lookup
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: production and attraction rates, shape (len(building), len(trip_purposes))
+    """
+    # buildings not in the lookup are at -1, the last row of the lookup arrays
+    lookup_pos = index_category(building, trip_rate_lookup["building"])
+    return trip_rate_lookup["production_rate"][lookup_pos], trip_rate_lookup["attraction_rate"][lookup_pos]
+
+
+def calc_poi_prod_attr(poi_dict: dict, trip_rate_lookup: dict) -> dict:
+    """Production and attraction of POIs for the trip purposes of the lookup: trip rate * area / 1000
+
+    Args:
+        poi_dict (dict): the dictionary of poi
+        trip_rate_lookup (dict): trip rate lookup arrays from gen_trip_rate_lookup
+
+    Returns:
+        dict: {"poi_id": np.ndarray, "production": np.ndarray, "attraction": np.ndarray}, in the iteration order
+            of poi_dict, production and attraction of shape (len(poi_dict), len(trip_purposes))
+    """
+    pois = list(poi_dict.values())
+    building = _get_poi_building(pois)
+    area = _get_poi_area(pois)[:, None] / 1000
+
+    production_rate, attraction_rate = join_trip_rate(building, trip_rate_lookup)
+    return {"poi_id": np.array(list(poi_dict)), "production": production_rate * area,
+            "attraction": attraction_rate * area}
+
+
+def _get_node_columns(node_dict: dict, defaults: dict) -> dict:
+    """Columns of node attributes in the iteration order of node_dict, {key: default} for nodes without them"""
+    if isinstance(node_dict, ColumnTable):
+        rows = node_dict.rows
+        return {key: node_dict.column(key)[rows] if key in node_dict.columns else np.full(len(rows), default)
+                for key, default in defaults.items()}
+
+    nodes = list(node_dict.values())
+    get_value = dict.get if nodes and isinstance(nodes[0], dict) else getattr
+    return {key: np.array([get_value(node, key, default) for node in nodes], dtype=object)
+            for key, default in defaults.items()}
+
+
+def calc_node_prod_attr_array(node_dict: dict, poi_prod_attr: dict,
+                              residential_production: float = 10.0,
+                              residential_attraction: float = 10.0,
+                              boundary_production: float = 1000.0,
+                              boundary_attraction: float = 1000.0,
+                              default_production: float = 50.0,
+                              default_attraction: float = 50.0,
+                              poi_fallback: dict = None,
+                              node_columns: dict = None) -> dict:
+    """Production and attraction of nodes for the trip purposes of poi_prod_attr, by masks over node columns
+
+    Same rules as gen_node_prod_attr: residential and boundary nodes get their fixed values, poi nodes get the
+    production and attraction of their POI, other nodes in a zone of node.csv (_zone_id != -1) get the boundary
+    values and the rest get the default values. Activity types are matched as categorical codes, and POI values
+    are gathered by poi_id.
+
+    Args:
+        node_dict (dict): Node dictionary or NodeTable
+        poi_prod_attr (dict): production and attraction of POIs from calc_poi_prod_attr, NaN for no value
+        residential_production (float, optional): the production of residential area. Defaults to 10.0.
+        residential_attraction (float, optional): the attraction of residential area. Defaults to 10.0.
+        boundary_production (float, optional): boundary production, also outside production. Defaults to 1000.0.
+        boundary_attraction (float, optional): boundary attraction, also the outside attraction. Defaults to 1000.0.
+        default_production (float, optional): production of other nodes. Defaults to 50.0.
+        default_attraction (float, optional): attraction of other nodes. Defaults to 50.0.
+        poi_fallback (dict, optional): {"production", "attraction"} of poi nodes whose POI is not found or has
+            no value, scalars or arrays aligned to the nodes. Defaults to None, 0.
+        node_columns (dict, optional): activity_type, _zone_id and poi_id columns of the nodes if already read,
+            see _get_node_columns. Defaults to None.
+
+    Returns:
+        dict: {"node_id": np.ndarray, "production": np.ndarray, "attraction": np.ndarray}, in the iteration order
+            of node_dict, production and attraction of shape (len(node_dict), number of trip purposes)
+    """
+    if node_columns is None:
+        node_columns = _get_node_columns(node_dict, NODE_PROD_ATTR_COLUMNS)
+    activity_code = index_category(node_columns["activity_type"], pd.Index(NODE_ACTIVITY_TYPES))
+    is_zone = node_columns["_zone_id"] != -1
+
+    # POI position of poi nodes, -1 for other nodes and for POIs not found
+    is_poi = activity_code == NODE_ACTIVITY_TYPES.index("poi")
+    poi_pos = np.full(len(activity_code), -1, dtype=np.int64)
+    poi_id = pd.to_numeric(pd.Series(node_columns["poi_id"][is_poi]), errors="coerce").to_numpy()
+    poi_pos[is_poi] = pd.Index(poi_prod_attr["poi_id"]).get_indexer(poi_id)
+
+    if isinstance(node_dict, ColumnTable):
+        node_id = node_dict.column(node_dict.id_col)[node_dict.rows]
+    else:
+        node_id = np.array(list(node_dict))
+
+    prod_attr = {"node_id": node_id}
+    for value, residential, boundary, default in [
+            ("production", residential_production, boundary_production, default_production),
+            ("attraction", residential_attraction, boundary_attraction, default_attraction)]:
+        num_purpose = poi_prod_attr[value].shape[1]
+
+        # the extra last row of POI values is for poi nodes without POI
+        poi_value = np.vstack([poi_prod_attr[value], np.full((1, num_purpose), np.nan)])[poi_pos]
+        fallback = 0.0 if poi_fallback is None else np.asarray(poi_fallback[value], dtype=np.float64)
+        fallback = fallback.reshape(len(poi_pos), -1) if np.ndim(fallback) else fallback
+        poi_value = np.where(np.isnan(poi_value), fallback, poi_value)
+
+        # values of residential and boundary nodes by activity code, poi nodes are set below
+        value_by_code = np.array([residential, boundary, np.nan], dtype=np.float64)
+        node_value = np.where(is_zone, boundary, default).astype(np.float64)
+        node_value = np.where(activity_code >= 0, value_by_code[activity_code], node_value)
+        prod_attr[value] = np.where(is_poi[:, None], poi_value, node_value[:, None])
+    return prod_attr
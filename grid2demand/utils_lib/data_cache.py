@@ -0,0 +1,130 @@
+# -*- coding:utf-8 -*-
+##############################################################
+# Created Date: Saturday, October 17th 2026
+# Contact Info: luoxiangyong01@gmail.com
+# Author/Copyright: Mr. Xiangyong Luo
+##############################################################
+
+"""On-disk cache of parsed input tables (node, poi, zone).
+
+Parsed tables are stored as uncompressed Feather (Arrow IPC) files, so they can be
+memory-mapped on load, with geometry columns stored as WKB. The cache file name carries
+a hash of the source csv content and of the read parameters, so a changed csv or
+different read settings never hit a stale table.
+
+The cache requires pyarrow. If pyarrow is not installed, tables are parsed from csv every time.
+"""
+
+import glob
+import hashlib
+import json
+import os
+from typing import Callable
+
+import pandas as pd
+import shapely
+from pyufunc import path2linux
+
+# bump when the layout of parsed tables changes, invalidates all existing cache files
+CACHE_VERSION = 1
+CACHE_DIR_NAME = ".grid2demand_cache"
+
+
+def is_cache_available() -> bool:
+    """Check whether pyarrow is installed for reading and writing Feather files"""
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def calc_file_hash(file_path: str, block_size: int = 1 << 20) -> str:
+    """Calculate the sha1 hash of the file content"""
+    sha1 = hashlib.sha1()
+    with open(file_path, "rb") as f:
+        while block := f.read(block_size):
+            sha1.update(block)
+    return sha1.hexdigest()
+
+
+def get_cache_path(src_file: str, kind: str, params: dict) -> str:
+    """Get the cache file path of a parsed table, next to the source file.
+
+    Args:
+        src_file (str): the source csv file
+        kind (str): the table kind, e.g. "node", "poi", "zone_geometry"
+        params (dict): read parameters that change the parsed table, e.g. the columns to read
+
+    Returns:
+        str: <folder of src_file>/.grid2demand_cache/<file name>_<kind>_<key>.feather
+    """
+    key = hashlib.sha1(json.dumps({"version": CACHE_VERSION,
+                                   "content": calc_file_hash(src_file),
+                                   "params": params}, sort_keys=True, default=str).encode()).hexdigest()[:16]
+    folder, filename = os.path.split(os.path.abspath(src_file))
+    return path2linux(os.path.join(folder, CACHE_DIR_NAME, f"{os.path.splitext(filename)[0]}_{kind}_{key}.feather"))
+
+
+def load_cached_table(src_file: str,
+                      kind: str,
+                      parse_func: Callable[[], pd.DataFrame],
+                      *,
+                      params: dict = None,
+                      geometry_cols: tuple = (),
+                      use_cache: bool = True,
+                      verbose: bool = False) -> pd.DataFrame:
+    """Load a parsed table from cache if the source file is unchanged, otherwise parse and cache it.
+
+    Args:
+        src_file (str): the source csv file
+        kind (str): the table kind, e.g. "node", "poi", "zone_geometry"
+        parse_func (Callable[[], pd.DataFrame]): parse the source file into a table (cache miss)
+        params (dict, optional): read parameters that change the parsed table. Defaults to None.
+        geometry_cols (tuple, optional): columns with shapely geometries, stored as WKB. Defaults to ().
+        use_cache (bool, optional): whether to use the cache. Defaults to True.
+        verbose (bool, optional): print processing information. Defaults to False.
+
+    Returns:
+        pd.DataFrame: the parsed table, geometry columns hold shapely geometries
+    """
+    if not use_cache or not is_cache_available():
+        return parse_func()
+
+    params = params or {}
+    cache_path = get_cache_path(src_file, kind, params)
+
+    if os.path.exists(cache_path):
+        try:
+            from pyarrow import feather
+            df = feather.read_table(cache_path, memory_map=True).to_pandas()
+            for col in geometry_cols:
+                df[col] = shapely.from_wkb(df[col].to_numpy())
+            if verbose:
+                print(f"  : Loaded parsed {kind} table from cache {cache_path}")
+            return df
+        except Exception as e:
+            print(f"  : Unable to load cache {cache_path}, parse {src_file} instead. error: {e}")
+
+    df = parse_func()
+
+    # the parse function may write back to the source file (e.g. poi area), key on the current content
+    cache_path = get_cache_path(src_file, kind, params)
+    try:
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+
+        # remove outdated cache files of the same source file and kind
+        prefix = cache_path.rsplit("_", 1)[0]
+        for outdated_path in glob.glob(f"{glob.escape(prefix)}_*.feather"):
+            os.remove(outdated_path)
+
+        df_cache = df.copy()
+        for col in geometry_cols:
+            df_cache[col] = shapely.to_wkb(df_cache[col].to_numpy())
+        df_cache.reset_index(drop=True).to_feather(cache_path, compression="uncompressed")
+        if verbose:
+            print(f"  : Saved parsed {kind} table to cache {cache_path}")
+    except Exception as e:
+        print(f"  : Unable to cache parsed {kind} table of {src_file}, error: {e}")
+
+    return df
@@ -6,8 +6,13 @@
 ##############################################################
 
 
+from collections.abc import Mapping, MutableMapping
 from dataclasses import dataclass, field, asdict, fields
 
+import numpy as np
+import pandas as pd
+import shapely
+
 
 @dataclass
 class Node:
@@ -169,6 +174,72 @@ class Zone:
     #     return asdict(self)
 
 
+@dataclass
+class ZoneLattice:
+    """The regular lattice of grid zones generated by net2zone.
+
+    Zone cells are ordered row by row from north to south, and from west to east inside each row,
+    the same order as zone ids generated by net2zone (A0, A1, ..., B0, B1, ...).
+
+    Attributes:
+        x_min           : The min x coordinate of the lattice.
+        y_min           : The min y coordinate of the lattice.
+        x_block_width   : The width of each zone cell.
+        y_block_height  : The height of each zone cell.
+        num_x_blocks    : The number of zone cells from west to east.
+        num_y_blocks    : The number of zone cells from south to north.
+        x_edges         : The x coordinates of cell edges from west to east, length num_x_blocks + 1.
+        y_edges         : The y coordinates of cell edges from south to north, length num_y_blocks + 1.
+        zone_names      : The zone names of cells in lattice order.
+    """
+
+    x_min: float = 0
+    y_min: float = 0
+    x_block_width: float = 0
+    y_block_height: float = 0
+    num_x_blocks: int = 0
+    num_y_blocks: int = 0
+    x_edges: np.ndarray = field(default_factory=lambda: np.zeros(0))
+    y_edges: np.ndarray = field(default_factory=lambda: np.zeros(0))
+    zone_names: list = field(default_factory=list)
+
+    def locate(self, x_coord: np.ndarray, y_coord: np.ndarray) -> np.ndarray:
+        """Locate the zone cell of points by floor division on coordinates.
+
+        A point belongs to the cell with x_min <= x < x_max and y_min <= y < y_max,
+        the east and north edges of the lattice are included in the last cells.
+
+        Args:
+            x_coord (np.ndarray): x coordinates of points
+            y_coord (np.ndarray): y coordinates of points
+
+        Returns:
+            np.ndarray: the position of the cell in zone_names for each point, -1 if outside of the lattice
+        """
+        x_coord = np.asarray(x_coord, dtype=np.float64)
+        y_coord = np.asarray(y_coord, dtype=np.float64)
+
+        col = self._locate_axis(x_coord, self.x_edges, self.x_min, self.x_block_width, self.num_x_blocks)
+        row = self._locate_axis(y_coord, self.y_edges, self.y_min, self.y_block_height, self.num_y_blocks)
+
+        # rows are numbered from north to south
+        return np.where((col >= 0) & (row >= 0), (self.num_y_blocks - 1 - row) * self.num_x_blocks + col, -1)
+
+    @staticmethod
+    def _locate_axis(coord: np.ndarray, edges: np.ndarray, coord_min: float, block_size: float,
+                     num_blocks: int) -> np.ndarray:
+        with np.errstate(invalid="ignore"):
+            idx = np.floor((coord - coord_min) / block_size)
+        idx = np.clip(np.nan_to_num(idx, nan=0), 0, num_blocks - 1).astype(np.int64)
+
+        # correct floating point rounding near cell edges against the exact edge coordinates
+        idx -= (coord < edges[idx]) & (idx > 0)
+        idx += (coord >= edges[idx + 1]) & (idx < num_blocks - 1)
+
+        is_outside = ~((coord >= edges[0]) & (coord <= edges[-1]))
+        return np.where(is_outside, -1, idx)
+
+
 @dataclass
 class Agent:
     """An agent in the network.
@@ -227,3 +298,391 @@ class Agent:
 
     def as_dict(self):
         return asdict(self)
+
+
+def gen_od_linestrings(x_coord: np.ndarray, y_coord: np.ndarray, o_idx: np.ndarray, d_idx: np.ndarray,
+                       wkt: bool = False) -> np.ndarray:
+    """Build the straight o-d lines of OD pairs in one vectorized call
+
+    Args:
+        x_coord (np.ndarray): x coordinates of zones
+        y_coord (np.ndarray): y coordinates of zones
+        o_idx (np.ndarray): origin zone index of OD pairs
+        d_idx (np.ndarray): destination zone index of OD pairs
+        wkt (bool, optional): return WKT strings instead of LineString objects. Defaults to False.
+
+    Returns:
+        np.ndarray: LineString objects (or WKT strings) of OD pairs, None for pairs with index -1
+    """
+    o_idx, d_idx = np.asarray(o_idx), np.asarray(d_idx)
+    is_valid = (o_idx >= 0) & (d_idx >= 0)
+
+    coords = np.empty((int(is_valid.sum()), 2, 2))
+    coords[:, 0, 0], coords[:, 0, 1] = x_coord[o_idx[is_valid]], y_coord[o_idx[is_valid]]
+    coords[:, 1, 0], coords[:, 1, 1] = x_coord[d_idx[is_valid]], y_coord[d_idx[is_valid]]
+
+    lines = np.full(len(o_idx), None, dtype=object)
+    if len(coords):
+        lines[is_valid] = shapely.linestrings(coords)
+        if wkt:
+            lines[is_valid] = shapely.to_wkt(lines[is_valid], rounding_precision=-1)
+    return lines
+
+
+def gen_od_geometry(od_matrix: "ODMatrix | SparseODMatrix", o_zone_name: np.ndarray, d_zone_name: np.ndarray,
+                    wkt: bool = False) -> np.ndarray:
+    """Build the o-d centroid lines of OD pairs given by zone names, e.g. rows of df_demand at export
+
+    Args:
+        od_matrix (ODMatrix | SparseODMatrix): the OD matrix with zone coordinates
+        o_zone_name (np.ndarray): origin zone names
+        d_zone_name (np.ndarray): destination zone names
+        wkt (bool, optional): return WKT strings instead of LineString objects. Defaults to False.
+
+    Returns:
+        np.ndarray: LineString objects (or WKT strings), None for zone names not in od_matrix
+    """
+    zone_index = pd.Index(od_matrix.zone_name)
+    return gen_od_linestrings(od_matrix.x_coord, od_matrix.y_coord,
+                              zone_index.get_indexer(o_zone_name), zone_index.get_indexer(d_zone_name), wkt)
+
+
+@dataclass
+class ODMatrix:
+    """A dense zone-to-zone OD matrix.
+
+    Row i / column j of each matrix refer to the i-th / j-th zone in zone_name.
+
+    Attributes:
+        zone_id     : The zone IDs, in matrix order.
+        zone_name   : The zone names, in matrix order.
+        x_coord     : The centroid x coordinates of zones.
+        y_coord     : The centroid y coordinates of zones.
+        dist_km     : The zone-to-zone distance matrix, unit is km.
+        volume      : The zone-to-zone demand volume matrix. default = zeros
+    """
+
+    zone_id: np.ndarray = field(default_factory=lambda: np.zeros(0, dtype=np.int64))
+    zone_name: np.ndarray = field(default_factory=lambda: np.zeros(0, dtype=object))
+    x_coord: np.ndarray = field(default_factory=lambda: np.zeros(0))
+    y_coord: np.ndarray = field(default_factory=lambda: np.zeros(0))
+    dist_km: np.ndarray = field(default_factory=lambda: np.zeros((0, 0)))
+    volume: np.ndarray = None
+
+    def __post_init__(self):
+        if self.volume is None:
+            self.volume = np.zeros(self.dist_km.shape)
+
+    def __len__(self):
+        return len(self.zone_name)
+
+    @property
+    def zone_index(self) -> dict:
+        """Zone name to matrix index"""
+        return {zone_name: i for i, zone_name in enumerate(self.zone_name)}
+
+    def to_dataframe(self, include_geometry: bool = False) -> pd.DataFrame:
+        """Convert to a long table with one row per OD pair, in row-major order.
+
+        Args:
+            include_geometry (bool, optional): add the o-d centroid LineString of each pair. Defaults to False.
+
+        Returns:
+            pd.DataFrame: columns [o_zone_id, o_zone_name, d_zone_id, d_zone_name, dist_km, volume, (geometry)]
+        """
+        num_zone = len(self)
+        o_idx = np.repeat(np.arange(num_zone), num_zone)
+        d_idx = np.tile(np.arange(num_zone), num_zone)
+
+        df = pd.DataFrame({"o_zone_id": self.zone_id[o_idx],
+                           "o_zone_name": self.zone_name[o_idx],
+                           "d_zone_id": self.zone_id[d_idx],
+                           "d_zone_name": self.zone_name[d_idx],
+                           "dist_km": self.dist_km.ravel(),
+                           "volume": self.volume.ravel()})
+
+        if include_geometry:
+            df["geometry"] = gen_od_linestrings(self.x_coord, self.y_coord, o_idx, d_idx)
+        return df
+
+    def to_dict(self) -> dict[tuple[str, str], dict]:
+        """Convert to the dict format {(o_zone_name, d_zone_name): {o_zone_id, ..., geometry}}"""
+        df = self.to_dataframe(include_geometry=True)
+        return dict(zip(zip(df["o_zone_name"], df["d_zone_name"]), df.to_dict("records")))
+
+
+@dataclass
+class SparseODMatrix:
+    """A sparse zone-to-zone OD matrix in COO format.
+
+    Only the stored OD pairs (o_idx[k], d_idx[k]) have a distance and a volume, pairs are in row-major order.
+    o_idx / d_idx refer to the zones in zone_name.
+
+    Attributes:
+        zone_id     : The zone IDs.
+        zone_name   : The zone names.
+        x_coord     : The centroid x coordinates of zones.
+        y_coord     : The centroid y coordinates of zones.
+        o_idx       : The origin zone index of each stored OD pair.
+        d_idx       : The destination zone index of each stored OD pair.
+        dist_km     : The distance of each stored OD pair, unit is km.
+        volume      : The demand volume of each stored OD pair. default = zeros
+    """
+
+    zone_id: np.ndarray = field(default_factory=lambda: np.zeros(0, dtype=np.int64))
+    zone_name: np.ndarray = field(default_factory=lambda: np.zeros(0, dtype=object))
+    x_coord: np.ndarray = field(default_factory=lambda: np.zeros(0))
+    y_coord: np.ndarray = field(default_factory=lambda: np.zeros(0))
+    o_idx: np.ndarray = field(default_factory=lambda: np.zeros(0, dtype=np.int64))
+    d_idx: np.ndarray = field(default_factory=lambda: np.zeros(0, dtype=np.int64))
+    dist_km: np.ndarray = field(default_factory=lambda: np.zeros(0))
+    volume: np.ndarray = None
+
+    def __post_init__(self):
+        if self.volume is None:
+            self.volume = np.zeros(self.dist_km.shape)
+
+    def __len__(self):
+        return len(self.zone_name)
+
+    @property
+    def nnz(self) -> int:
+        """Number of stored OD pairs"""
+        return len(self.o_idx)
+
+    @property
+    def zone_index(self) -> dict:
+        """Zone name to zone index"""
+        return {zone_name: i for i, zone_name in enumerate(self.zone_name)}
+
+    def select(self, mask: np.ndarray) -> "SparseODMatrix":
+        """A new SparseODMatrix with the OD pairs where mask is True, zones are kept"""
+        return SparseODMatrix(zone_id=self.zone_id, zone_name=self.zone_name,
+                              x_coord=self.x_coord, y_coord=self.y_coord,
+                              o_idx=self.o_idx[mask], d_idx=self.d_idx[mask],
+                              dist_km=self.dist_km[mask], volume=self.volume[mask])
+
+    def to_dense(self, fill_value: float = np.nan) -> ODMatrix:
+        """Convert to a dense ODMatrix, distances of pairs not stored are fill_value, volumes are 0"""
+        dist_km = np.full((len(self), len(self)), fill_value, dtype=np.float64)
+        volume = np.zeros((len(self), len(self)))
+        dist_km[self.o_idx, self.d_idx] = self.dist_km
+        volume[self.o_idx, self.d_idx] = self.volume
+        return ODMatrix(zone_id=self.zone_id, zone_name=self.zone_name, x_coord=self.x_coord, y_coord=self.y_coord,
+                        dist_km=dist_km, volume=volume)
+
+    def to_dataframe(self, include_geometry: bool = False) -> pd.DataFrame:
+        """Convert to a long table with one row per stored OD pair, same columns as ODMatrix.to_dataframe"""
+        o_idx, d_idx = self.o_idx, self.d_idx
+
+        df = pd.DataFrame({"o_zone_id": self.zone_id[o_idx],
+                           "o_zone_name": self.zone_name[o_idx],
+                           "d_zone_id": self.zone_id[d_idx],
+                           "d_zone_name": self.zone_name[d_idx],
+                           "dist_km": self.dist_km,
+                           "volume": self.volume})
+
+        if include_geometry:
+            df["geometry"] = gen_od_linestrings(self.x_coord, self.y_coord, o_idx, d_idx)
+        return df
+
+    def to_dict(self) -> dict[tuple[str, str], dict]:
+        """Convert to the dict format {(o_zone_name, d_zone_name): {o_zone_id, ..., geometry}} of stored pairs"""
+        df = self.to_dataframe(include_geometry=True)
+        return dict(zip(zip(df["o_zone_name"], df["d_zone_name"]), df.to_dict("records")))
+
+
+class RecordView(Mapping):
+    """A lazy, dict-like view of one row in a column-backed table.
+
+    The view holds no data itself: every read and write goes straight to the
+    column arrays of its table, so ``node_dict[node_id]["x_coord"]``,
+    ``node_dict[node_id].x_coord`` and ``node_dict[node_id]["production"] = 10``
+    behave the same as they do for per-node records.
+    """
+
+    __slots__ = ("_table", "_row")
+
+    def __init__(self, table: "ColumnTable", row: int):
+        object.__setattr__(self, "_table", table)
+        object.__setattr__(self, "_row", row)
+
+    def __getitem__(self, key):
+        return self._table.get_value(self._row, key)
+
+    def __setitem__(self, key, value):
+        self._table.set_value(self._row, key, value)
+
+    def __getattr__(self, key):
+        try:
+            return self._table.get_value(self._row, key)
+        except KeyError as e:
+            raise AttributeError(key) from e
+
+    def __setattr__(self, key, value):
+        self._table.set_value(self._row, key, value)
+
+    def __iter__(self):
+        return iter(self._table.columns)
+
+    def __len__(self):
+        return len(self._table.columns)
+
+    def __repr__(self):
+        attrs = ", ".join(f"{key}={self[key]!r}" for key in self._table.columns)
+        return f"{self._table.name}({attrs})"
+
+    def as_dict(self):
+        return {key: self[key] for key in self._table.columns}
+
+
+class ColumnTable(MutableMapping):
+    """A column-backed table of records keyed by record id.
+
+    Records are stored as one NumPy array per attribute instead of one object per record.
+    Indexing the table by id returns a lazy RecordView, so code written against
+    ``{id: record}`` dicts keeps working while vectorized code can use the columns directly.
+
+    Attributes:
+        name: The record name, used in the repr of the record views. e.g. "Node"
+        id_col: The column holding the record ids. default = "id"
+        columns: The column names in output order.
+    """
+
+    def __init__(self, data: pd.DataFrame | dict, id_col: str = "id", name: str = "Record"):
+        if isinstance(data, pd.DataFrame):
+            data = {col: data[col].to_numpy() for col in data.columns}
+
+        if id_col not in data:
+            raise KeyError(f"Key {id_col} not found in columns of {name} table")
+
+        self.name = name
+        self.id_col = id_col
+        self._columns = {col: np.asarray(val) for col, val in data.items()}
+        self._row_of = dict(zip(self._columns[id_col].tolist(), range(len(self._columns[id_col]))))
+
+    @property
+    def columns(self) -> list:
+        return list(self._columns)
+
+    def column(self, key: str) -> np.ndarray:
+        """Return the full column array (aligned with the internal row order, including deleted rows)."""
+        return self._columns[key]
+
+    @property
+    def rows(self) -> np.ndarray:
+        """Row positions of the live records, in iteration order."""
+        # rows are appended in insertion order and never reused, so without deleted rows they are 0..n-1
+        if len(self._row_of) == len(self._columns[self.id_col]):
+            return np.arange(len(self._row_of))
+        return np.fromiter(self._row_of.values(), dtype=np.int64, count=len(self._row_of))
+
+    def get_value(self, row: int, key: str):
+        try:
+            return self._columns[key][row]
+        except KeyError as e:
+            raise KeyError(f"Key {key} not found in {self.name}") from e
+
+    def set_value(self, row: int, key: str, value) -> None:
+        if key not in self._columns:
+            # new attribute: add an empty column, same as extending the record class
+            self._columns[key] = np.full(len(self._columns[self.id_col]), None, dtype=object)
+
+        col = self._writable_column(key)
+        if col.dtype != object:
+            try:
+                new_dtype = np.result_type(col, np.asarray(value))
+            except TypeError:
+                new_dtype = np.dtype(object)
+            if new_dtype.kind in "USV":
+                new_dtype = np.dtype(object)
+            if new_dtype != col.dtype:
+                col = col.astype(new_dtype)
+                self._columns[key] = col
+        col[row] = value
+
+    def set_column(self, key: str, values, rows: np.ndarray = None) -> None:
+        """Assign values to a column in one step, for all live records or for the given row positions."""
+        rows = self.rows if rows is None else np.asarray(rows, dtype=np.int64)
+        values = np.asarray(values)
+        if key not in self._columns:
+            self._columns[key] = np.full(len(self._columns[self.id_col]), None, dtype=object)
+
+        col = self._writable_column(key)
+        if col.dtype != object:
+            new_dtype = np.result_type(col, values) if values.dtype.kind not in "USVO" else np.dtype(object)
+            if new_dtype != col.dtype:
+                col = col.astype(new_dtype)
+                self._columns[key] = col
+        col[rows] = values
+
+    def _writable_column(self, key: str) -> np.ndarray:
+        """Return column key for writing, a read-only column (e.g. a view of a DataFrame column) is copied first"""
+        col = self._columns[key]
+        if not col.flags.writeable:
+            col = col.copy()
+            self._columns[key] = col
+        return col
+
+    def __getitem__(self, record_id):
+        try:
+            return RecordView(self, self._row_of[record_id])
+        except KeyError as e:
+            raise KeyError(f"{self.name} {record_id} not found") from e
+
+    def __setitem__(self, record_id, record) -> None:
+        if isinstance(record, RecordView) and record._table is self and self._row_of.get(record_id) == record._row:
+            return
+
+        if hasattr(record, "as_dict"):
+            record = record.as_dict()
+
+        if record_id not in self._row_of:
+            row = len(self._columns[self.id_col])
+            for key, col in self._columns.items():
+                fill = np.full(1, None, dtype=object) if col.dtype == object else np.zeros(1, dtype=col.dtype)
+                self._columns[key] = np.concatenate([col, fill])
+            self._row_of[record_id] = row
+            self.set_value(row, self.id_col, record_id)
+        row = self._row_of[record_id]
+        for key, value in record.items():
+            self.set_value(row, key, value)
+
+    def __delitem__(self, record_id) -> None:
+        # rows are only unlinked from the id map, columns keep their positions
+        del self._row_of[record_id]
+
+    def __iter__(self):
+        return iter(self._row_of)
+
+    def __len__(self):
+        return len(self._row_of)
+
+    def __contains__(self, record_id):
+        return record_id in self._row_of
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}({len(self)} records, columns={self.columns})"
+
+    def copy(self, copy_columns: list = ()) -> "ColumnTable":
+        """Return a table of the same records sharing the column arrays, except copy_columns which are copied.
+
+        Updates of copy_columns and new columns in the returned table do not change this table.
+        """
+        table = object.__new__(self.__class__)
+        table.__dict__.update(self.__dict__)
+        table._columns = {key: col.copy() if key in copy_columns else col for key, col in self._columns.items()}
+        table._row_of = dict(self._row_of)
+        return table
+
+    def to_dataframe(self) -> pd.DataFrame:
+        """Convert the live records to a DataFrame, one column per attribute."""
+        rows = self.rows
+        return pd.DataFrame({key: col[rows] for key, col in self._columns.items()})
+
+
+class NodeTable(ColumnTable):
+    """A column-backed node table: {node_id: lazy Node view}. See ColumnTable."""
+
+    def __init__(self, data: pd.DataFrame | dict, id_col: str = "id", name: str = "Node"):
+        super().__init__(data, id_col=id_col, name=name)
@@ -0,0 +1,162 @@
+# -*- coding:utf-8 -*-
+##############################################################
+# Created Date: Saturday, October 17th 2026
+# Contact Info: luoxiangyong01@gmail.com
+# Author/Copyright: Mr. Xiangyong Luo
+##############################################################
+
+from multiprocessing import Pool
+from multiprocessing.shared_memory import SharedMemory
+from typing import Callable, NamedTuple
+
+import numpy as np
+from tqdm import tqdm
+
+from grid2demand.utils_lib.pkg_settings import pkg_settings
+
+# read-only state of the current worker process, set once by the Pool initializer
+_WORKER_SHARED = {}
+
+# shared memory blocks attached by the current worker, kept open while its arrays are in use
+_WORKER_SHM = []
+
+
+class SharedArrayRef(NamedTuple):
+    """Name, shape and dtype of a NumPy array published in shared memory"""
+    name: str
+    shape: tuple
+    dtype: str
+
+
+def publish_shared_arrays(shared: dict, shm_list: list) -> dict:
+    """Copy numeric NumPy arrays of shared (and of its nested dicts) into shared memory
+
+    Args:
+        shared (dict): state of parallel tasks
+        shm_list (list): the created SharedMemory blocks are appended, to be closed and unlinked by the caller
+
+    Returns:
+        dict: shared with numeric arrays replaced by SharedArrayRef, other values unchanged
+    """
+    published = {}
+    for key, value in shared.items():
+        if isinstance(value, dict):
+            published[key] = publish_shared_arrays(value, shm_list)
+        elif isinstance(value, np.ndarray) and value.dtype != object and value.nbytes > 0:
+            shm = SharedMemory(create=True, size=value.nbytes)
+            shm_list.append(shm)
+            np.ndarray(value.shape, dtype=value.dtype, buffer=shm.buf)[...] = value
+            published[key] = SharedArrayRef(shm.name, value.shape, value.dtype.str)
+        else:
+            published[key] = value
+    return published
+
+
+def attach_shared_arrays(shared: dict, shm_list: list) -> dict:
+    """Replace SharedArrayRef in shared by zero-copy NumPy views of the shared memory blocks
+
+    Args:
+        shared (dict): state from publish_shared_arrays
+        shm_list (list): the attached SharedMemory blocks are appended, they must stay open while
+            the arrays are in use
+
+    Returns:
+        dict: shared with NumPy arrays backed by shared memory
+    """
+    attached = {}
+    for key, value in shared.items():
+        if isinstance(value, dict):
+            attached[key] = attach_shared_arrays(value, shm_list)
+        elif isinstance(value, SharedArrayRef):
+            shm = SharedMemory(name=value.name)
+            shm_list.append(shm)
+            attached[key] = np.ndarray(value.shape, dtype=np.dtype(value.dtype), buffer=shm.buf)
+        else:
+            attached[key] = value
+    return attached
+
+
+def _init_worker(shared: dict) -> None:
+    """Pool initializer: attach the shared state in the worker for all its tasks"""
+    _WORKER_SHARED.clear()
+    _WORKER_SHARED.update(attach_shared_arrays(shared, _WORKER_SHM))
+
+
+def _run_index_range(task: tuple):
+    """Pool task: run func on the shared state of the worker and one index range, task is (func, start, end)"""
+    func, start, end = task
+    return func(_WORKER_SHARED, start, end)
+
+
+def gen_index_chunks(total: int, chunk_size: int = 0, cpu_cores: int = 1) -> list:
+    """Split range(total) into consecutive (start, end) index ranges
+
+    Args:
+        total (int): number of items
+        chunk_size (int, optional): maximum items per range, 0 for pkg_settings["data_chunk_size"].
+            Capped so that every process gets at least one range. Defaults to 0.
+        cpu_cores (int, optional): number of processes. Defaults to 1.
+
+    Returns:
+        list: [(start, end), ...] covering range(total) in order
+    """
+    chunk_size = chunk_size or pkg_settings["data_chunk_size"]
+    chunk_size = max(min(chunk_size, -(-total // max(cpu_cores, 1))), 1)
+    return [(start, min(start + chunk_size, total)) for start in range(0, total, chunk_size)]
+
+
+def parallel_map(func: Callable, shared: dict, total: int,
+                 cpu_cores: int = 1,
+                 chunk_size: int = 0,
+                 progress: bool = False,
+                 out: np.ndarray = None) -> list:
+    """Run func over index ranges of range(total), in a process pool if cpu_cores > 1
+
+    The shared state is sent to each worker once by the Pool initializer, and tasks carry only (start, end)
+    index ranges. Numeric NumPy arrays in shared (and its nested dicts) are published once in shared memory
+    and attached by workers without copies; other values are sent by the initializer. func must be a
+    module-level function func(shared, start, end) so it can be pickled. With one process or one range, func
+    runs in the current process on shared as is, without starting a pool.
+
+    Results can be written to out instead of returned: out is shared["out"] in func, each task writes its
+    own part, e.g. shared["out"][start:end], and the parts are copied back into out when all tasks finish.
+
+    Args:
+        func (Callable): func(shared: dict, start: int, end: int) -> result of the index range
+        shared (dict): read-only state used by all tasks, e.g. {"df_node": df_node}
+        total (int): number of items to process
+        cpu_cores (int, optional): number of processes. Defaults to 1.
+        chunk_size (int, optional): maximum items per task, 0 for pkg_settings["data_chunk_size"],
+            see gen_index_chunks. Defaults to 0.
+        progress (bool, optional): show a progress bar of finished tasks. Defaults to False.
+        out (np.ndarray, optional): numeric output array written by the tasks. Defaults to None.
+
+    Returns:
+        list: results of func, in the order of index ranges
+    """
+    index_chunks = gen_index_chunks(total, chunk_size, cpu_cores)
+    num_process = max(min(cpu_cores, len(index_chunks)), 1)
+
+    if out is not None:
+        shared = {**shared, "out": out}
+
+    if num_process == 1:
+        results = (func(shared, start, end) for start, end in index_chunks)
+        return list(tqdm(results, total=len(index_chunks)) if progress else results)
+
+    shm_list = []
+    try:
+        published = publish_shared_arrays(shared, shm_list)
+        with Pool(num_process, initializer=_init_worker, initargs=(published,)) as pool:
+            results = pool.imap(_run_index_range, [(func, start, end) for start, end in index_chunks])
+            results = list(tqdm(results, total=len(index_chunks)) if progress else results)
+
+        if isinstance(published.get("out"), SharedArrayRef):
+            out_ref = published["out"]
+            out_shm = next(shm for shm in shm_list if shm.name == out_ref.name)
+            out[...] = np.ndarray(out_ref.shape, dtype=np.dtype(out_ref.dtype), buffer=out_shm.buf)
+        return results
+    finally:
+        for shm in shm_list:
+            shm.close()
+            shm.unlink()
@@ -22,11 +22,48 @@ pkg_settings = {
     "poi_fields": ["poi_id", "building", "amenity", "centroid", "area", "geometry"],
     "zone_geometry_fields": ["zone_id", "geometry"],
     "zone_centroid_fields": ["zone_id", "x_coord", "y_coord"],
+    "link_fields": ["from_node_id", "to_node_id", "length"],
 
     # if input data is too large, you can split the input data into chunks and process them separately
     "data_chunk_size": 1000,
     "node_export_activity": True,  # export zone id with node activity type in residential and boundary nodes
 
+    # write calculated POI areas back to poi.csv, so later runs skip the projection
+    "save_poi_area": False,
+
+    # load node.csv in one vectorized pass into a column-backed NodeTable instead of per-node records
+    "columnar_node": False,
+
+    # cache parsed node, poi and zone tables as Feather files next to the input csv (requires pyarrow)
+    "use_data_cache": True,
+
+    # nodes and POIs farther than this (km) from every zone centroid are not assigned to TAZs given by centroids,
+    # None for no limit
+    "zone_centroid_max_distance_km": None,
+
+    # how zone sync updates zones, nodes and POIs: "copy_on_write" keeps the given dicts unchanged and copies
+    # only updated records, "inplace" updates the given dicts without copies (less memory for large POI sets)
+    "sync_mode": "copy_on_write",
+
+    # impedance of the zone-to-zone OD matrix: "great_circle" distance between zone centroids,
+    # or shortest-path "network_distance" (km) / "network_time" (minutes) on link.csv
+    "od_impedance": "great_circle",
+    # free speed (km/h) of links without free_speed, and speed of zone connectors for network_time
+    "default_free_speed": 30,
+
+    # store the zone-to-zone OD matrix as sparse OD pairs instead of a dense N x N matrix;
+    # od_max_dist_km keeps only OD pairs within the distance (km, implies sparse), None for all pairs;
+    # OD pairs with volume below od_volume_threshold (and all zero-volume pairs) are dropped after the gravity model
+    "sparse_od": False,
+    "od_max_dist_km": None,
+    "od_volume_threshold": 0,
+
+    # number of agents generated and written per batch in save_agent, bounds the peak memory of agent output
+    "agent_batch_size": 100_000,
+
+    # departure period of agents when no departure profile is given, departures are uniform within the period
+    "departure_time_period": ("07:00", "08:00"),
+
     # run the program in parallel mode, if cpu_cores > 1
     "set_cpu_cores": os.cpu_count(),
 
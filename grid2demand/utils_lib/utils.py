@@ -7,6 +7,7 @@
 
 
 import copy
+import functools
 import os
 import datetime
 import itertools
@@ -16,58 +17,77 @@ import shapely
 import numpy as np
 
 
+def _record_getitem(self, key):
+    if hasattr(self, key):
+        return getattr(self, key)
+    raise KeyError(f"Key {key} not found in {self.__class__.__name__}")
+
+
+def _record_setitem(self, key, value):
+    if hasattr(self, key):
+        setattr(self, key, value)
+    else:
+        raise KeyError(f"Key {key} not found in {self.__class__.__name__}")
+
+
+def _record_as_dict(self):
+    return asdict(self)
+
+
+def _record_reduce(self):
+    # pickle as (schema, values) so records of generated classes can be sent to Pool workers
+    field_names = self.__class__.__record_fields__
+    return (_rebuild_record, (self.__class__.__name__, field_names,
+                              tuple(getattr(self, key) for key in field_names)))
+
+
+def _rebuild_record(name: str, field_names: tuple, values: tuple) -> Any:
+    return get_record_class(name, field_names)(*values)
+
+
+@functools.lru_cache(maxsize=None)
+def get_record_class(name: str, field_names: tuple) -> Type:
+    """Return the record class for a (name, field set) schema, creating it on first use.
+
+    The class is a slotted dataclass with dictionary-like access via __getitem__ and __setitem__
+    and an as_dict method, the same API as Node, POI and Zone in net_utils.
+
+    Args:
+        name (str): The name of the record class. e.g. "Node"
+        field_names (tuple): The attribute names of the record, in order.
+
+    Returns:
+        Type: the cached record class
+    """
+    return make_dataclass(
+        cls_name=name,
+        fields=[(key, Any, field(default=None)) for key in field_names],
+        bases=(),
+        namespace={'__getitem__': _record_getitem,
+                   '__setitem__': _record_setitem,
+                   'as_dict': _record_as_dict,
+                   '__reduce__': _record_reduce,
+                   '__record_fields__': field_names},
+        slots=True,
+    )
+
+
 def create_dataclass_from_dict(name: str, data: Dict[str, Any]) -> Type:
     """
-    Creates a dataclass with attributes and values based on the given dictionary.
+    Creates a dataclass instance with attributes and values based on the given dictionary.
     The dataclass will also support dictionary-like access via __getitem__ and __setitem__.
 
+    Records with the same name and the same keys share one generated class (see get_record_class),
+    so loading a network creates a handful of classes instead of one class per node, POI or zone.
+
     Args:
         name (str): The name of the dataclass to create.
         data (Dict[str, Any]): A dictionary where keys are attribute names and values are attribute values.
 
     Returns:
-        Type: A dataclass with fields and values corresponding to the dictionary.
+        Type: A dataclass instance with fields and values corresponding to the dictionary.
     """
-    # Define a method for __getitem__ for dictionary-like access
-
-    def __getitem__(self, key):
-        if hasattr(self, key):
-            return getattr(self, key)
-        else:
-            raise KeyError(f"Key {key} not found in {self.__class__.__name__}")
-
-    # Define a method for __setitem__ for dictionary-like assignment
-    def __setitem__(self, key, value):
-        if hasattr(self, key):
-            setattr(self, key, value)
-        else:
-            raise KeyError(f"Key {key} not found in {self.__class__.__name__}")
-
-    # Define a method to convert the dataclass to a dictionary
-    def as_dict(self):
-        return asdict(self)
-
-    # Extract fields and their types from the dictionary
-    dataclass_fields = []
-    for key, value in data.items():
-        if isinstance(value, (list, dict, set)):  # For mutable types
-            dataclass_fields.append(
-                (key, type(value), field(default_factory=lambda v=value: v)))
-        else:  # For immutable types
-            dataclass_fields.append((key, type(value), field(default=value)))
-
-    # Create the dataclass dynamically
-    DataClass = make_dataclass(
-        cls_name=name,
-        fields=dataclass_fields,
-        bases=(),
-        namespace={'__getitem__': __getitem__,
-                   '__setitem__': __setitem__,
-                   'as_dict': as_dict}
-    )
-
-    # Instantiate the dataclass with the values from the dictionary
-    return DataClass(**data)
+    return get_record_class(name, tuple(data))(**data)
 
 
 def extend_dataclass(
@@ -0,0 +1,46 @@
+# -*- coding:utf-8 -*-
+##############################################################
+# Created Date: Saturday, October 17th 2026
+# Contact Info: luoxiangyong01@gmail.com
+# Author/Copyright: Mr. Xiangyong Luo
+##############################################################
+
+
+import numpy as np
+import pytest
+from grid2demand.func_lib.departure_time import (NUM_DEPARTURE_BINS,
+                                                 calc_departure_profile_cdf,
+                                                 read_departure_profile,
+                                                 sample_departure_time)
+
+
+def test_read_departure_profile(tmp_path):
+    # Test case for reading 15-min bin weights of trip purposes by id and name
+    profile_file = tmp_path / "departure_profile.csv"
+    profile_file.write_text("time_period,1,home-based-other\n07:00,3,0\n07:15,1,0\n17:30,0,2\n")
+
+    departure_profile = read_departure_profile(profile_file)
+
+    assert list(departure_profile) == [1, 2]
+    assert departure_profile[1][28] == 0.75 and departure_profile[1][29] == 0.25
+    assert departure_profile[2][70] == 1 and departure_profile[2].sum() == 1
+
+    profile_file.write_text("time_period,1\n07:10,1\n")
+    with pytest.raises(ValueError):
+        read_departure_profile(profile_file)
+
+
+def test_sample_departure_time():
+    # Test case for sampling integer seconds from the bins of each agent's profile
+    profile = np.zeros((2, NUM_DEPARTURE_BINS))
+    profile[0, 28], profile[0, 29] = 0.75, 0.25  # 07:00 - 07:30
+    profile[1, 95] = 1  # 23:45 - 24:00
+    profile_cdf = calc_departure_profile_cdf({1: profile[0], 2: profile[1]}, [1, 2])
+
+    profile_pos = np.repeat([0, 1], 100_000)
+    departure_time = sample_departure_time(np.random.default_rng(0), profile_cdf, profile_pos)
+
+    assert departure_time.dtype == np.int64
+    assert departure_time[:100_000].min() >= 7 * 3600 and departure_time[:100_000].max() < 7.5 * 3600
+    assert (departure_time[:100_000] < 7.25 * 3600).mean() == pytest.approx(0.75, abs=0.01)
+    assert departure_time[100_000:].min() >= 23.75 * 3600 and departure_time[100_000:].max() < 24 * 3600
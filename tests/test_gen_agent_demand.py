@@ -0,0 +1,83 @@
+# -*- coding:utf-8 -*-
+##############################################################
+# Created Date: Saturday, October 17th 2026
+# Contact Info: luoxiangyong01@gmail.com
+# Author/Copyright: Mr. Xiangyong Luo
+##############################################################
+
+
+import pandas as pd
+from grid2demand.func_lib.gen_agent_demand import (build_zone_node_csr, gen_agent_based_demand,
+                                                   iter_agent_batches, save_agent_batches,
+                                                   save_agent_shards)
+from grid2demand.utils_lib.net_utils import Node, Zone
+
+
+def _gen_network() -> tuple:
+    node_dict = {i: Node(id=i, x_coord=float(i), y_coord=0.0) for i in range(1, 6)}
+    zone_dict = {"Z1": Zone(id=1, name="Z1", node_id_list=[1, 2]),
+                 "Z2": Zone(id=2, name="Z2", node_id_list=[3, 4, 5]),
+                 "Z3": Zone(id=3, name="Z3", node_id_list=[])}
+    return node_dict, zone_dict
+
+
+def test_build_zone_node_csr():
+    # Test case for the CSR zone membership arrays
+    zone_node = build_zone_node_csr(*_gen_network()[::-1])
+
+    assert zone_node["offsets"].tolist() == [0, 2, 5, 5]
+    assert zone_node["node_id"].tolist() == [1, 2, 3, 4, 5]
+    assert zone_node["x_coord"].tolist() == [1.0, 2.0, 3.0, 4.0, 5.0]
+
+
+def test_gen_agent_based_demand():
+    # Test case for expanding OD volumes into agents
+    node_dict, zone_dict = _gen_network()
+    df_demand = pd.DataFrame({"o_zone_id": [1, 2, 1], "d_zone_id": [2, 1, 3],
+                              "o_zone_name": ["Z1", "Z2", "Z1"], "d_zone_name": ["Z2", "Z1", "Z3"],
+                              "volume": [3.4, 1.6, 5.0]})
+
+    df_agent = gen_agent_based_demand(node_dict, zone_dict, df_demand=df_demand, seed=0)
+
+    # round(volume) agents per OD pair, Z3 has no nodes
+    assert df_agent["id"].tolist() == [1, 2, 3, 4, 5]
+    assert df_agent["o_zone_name"].tolist() == ["Z1"] * 3 + ["Z2"] * 2
+    assert df_agent["o_node_id"].isin([1, 2]).sum() == 3 and df_agent["d_node_id"].isin([1, 2]).sum() == 2
+    assert df_agent["departure_time"].between(7 * 3600, 8 * 3600 - 1).all()
+    o_node_id, d_node_id = df_agent.loc[0, ["o_node_id", "d_node_id"]]
+    assert df_agent.loc[0, "geometry"] == f"LINESTRING({o_node_id}.0 0.0, {d_node_id}.0 0.0)"
+
+    # same seed, same agents
+    assert df_agent.equals(gen_agent_based_demand(node_dict, zone_dict, df_demand=df_demand, seed=0))
+
+
+def test_save_agent_batches(tmp_path):
+    # Test case for streaming agent batches to csv, compressed csv and parquet
+    node_dict, zone_dict = _gen_network()
+    df_demand = pd.DataFrame({"o_zone_id": [1, 2], "d_zone_id": [2, 1], "o_zone_name": ["Z1", "Z2"],
+                              "d_zone_name": ["Z2", "Z1"], "volume": [7.0, 4.0]})
+    df_agent = gen_agent_based_demand(node_dict, zone_dict, df_demand=df_demand, seed=0)
+
+    num_agent = save_agent_batches(iter_agent_batches(node_dict, zone_dict, df_demand, batch_size=3, seed=0),
+                                   tmp_path / "agent.csv.gz", compression="gzip")
+    df_saved = pd.read_csv(tmp_path / "agent.csv.gz")
+    assert num_agent == 11 and df_saved["id"].tolist() == list(range(1, 12))
+    assert df_saved.columns.tolist() == df_agent.columns.tolist()
+
+    save_agent_batches([df_agent], tmp_path / "agent.parquet", file_format="parquet")
+    assert pd.read_parquet(tmp_path / "agent.parquet").equals(df_agent)
+
+
+def test_save_agent_shards(tmp_path):
+    # Test case for parallel shards against the single-process agents with the same seed
+    node_dict, zone_dict = _gen_network()
+    df_demand = pd.DataFrame({"o_zone_id": [1, 2], "d_zone_id": [2, 1], "o_zone_name": ["Z1", "Z2"],
+                              "d_zone_name": ["Z2", "Z1"], "volume": [30.0, 25.0]})
+
+    path_shards = save_agent_shards(node_dict, zone_dict, df_demand, tmp_path, batch_size=4, seed=42, cpu_cores=3)
+    df_shards = pd.concat([pd.read_csv(path) for path in path_shards], ignore_index=True)
+
+    save_agent_batches(iter_agent_batches(node_dict, zone_dict, df_demand, batch_size=4, seed=42),
+                       tmp_path / "agent.csv")
+    assert len(path_shards) == 3
+    assert df_shards.equals(pd.read_csv(tmp_path / "agent.csv"))
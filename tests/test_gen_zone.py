@@ -0,0 +1,155 @@
+# -*- coding:utf-8 -*-
+##############################################################
+# Created Date: Saturday, October 17th 2026
+# Contact Info: luoxiangyong01@gmail.com
+# Author/Copyright: Mr. Xiangyong Luo
+##############################################################
+
+
+import numpy as np
+import pandas as pd
+import pytest
+import shapely
+from pyufunc import calc_distance_on_unit_sphere
+from grid2demand.func_lib.gen_zone import (calc_zone_od_matrix,
+                                           net2zone,
+                                           sync_zone_centroid_and_node,
+                                           sync_zone_geometry_and_node,
+                                           sync_zone_lattice_and_node)
+from grid2demand.utils_lib.net_utils import Node, NodeTable, Zone, gen_od_geometry
+
+
+def _gen_zone_dict() -> dict:
+    return {"A0": Zone(id=0, name="A0", geometry=shapely.box(0, 0, 1, 1)),
+            "A1": Zone(id=1, name="A1", geometry=shapely.box(1, 0, 2, 1))}
+
+
+def test_sync_zone_geometry_and_node():
+    # Test case for mapping node records to zone geometries
+    node_dict = {10: Node(id=10, x_coord=1.5, y_coord=0.5),
+                 11: Node(id=11, x_coord=0.5, y_coord=0.5),
+                 12: Node(id=12, x_coord=5, y_coord=5),
+                 13: Node(id=13, x_coord=1.2, y_coord=0.2)}
+    zone_dict = _gen_zone_dict()
+
+    res = sync_zone_geometry_and_node(zone_dict, node_dict)
+
+    assert res["zone_dict"]["A0"].node_id_list == [11]
+    assert res["zone_dict"]["A1"].node_id_list == [10, 13]
+    assert [node.zone_id for node in res["node_dict"].values()] == [1, 0, None, 1]
+
+    # nodes are still records and the input dicts are not modified
+    assert isinstance(res["node_dict"][10], Node)
+    assert zone_dict["A1"].node_id_list == [] and node_dict[10].zone_id is None
+
+
+def test_sync_zone_geometry_and_node_table():
+    # Test case for mapping a column-backed node table to zone geometries
+    node_table = NodeTable(pd.DataFrame({"id": [10, 11, 12], "x_coord": [1.5, 0.5, 5.0],
+                                         "y_coord": [0.5, 0.5, 5.0], "zone_id": [None] * 3}))
+
+    res = sync_zone_geometry_and_node(_gen_zone_dict(), node_table)
+
+    assert res["zone_dict"]["A0"].node_id_list == [11]
+    assert res["zone_dict"]["A1"].node_id_list == [10]
+    assert res["node_dict"][10].zone_id == 1 and res["node_dict"][12].zone_id is None
+
+
+def test_sync_zone_geometry_and_node_modes():
+    # Test case for copy-on-write, in-place and assignment-only sync
+    node_dict = {10: Node(id=10, x_coord=1.5, y_coord=0.5, geometry=shapely.Point(1.5, 0.5)),
+                 12: Node(id=12, x_coord=5, y_coord=5, geometry=shapely.Point(5, 5))}
+    zone_dict = _gen_zone_dict()
+
+    # copy on write: updated records are new objects sharing attribute values, the others are shared
+    res = sync_zone_geometry_and_node(zone_dict, node_dict)
+    assert res["node_dict"][10] is not node_dict[10] and res["node_dict"][10].geometry is node_dict[10].geometry
+    assert res["node_dict"][12] is node_dict[12] and res["zone_dict"]["A0"] is zone_dict["A0"]
+    assert res["zone_assignment"].values.tolist() == [[10, 1, "A1"]]
+    assert node_dict[10].zone_id is None and zone_dict["A1"].node_id_list == []
+
+    res = sync_zone_geometry_and_node(zone_dict, node_dict, mode="assignment")
+    assert list(res) == ["zone_assignment"] and res["zone_assignment"].values.tolist() == [[10, 1, "A1"]]
+    assert node_dict[10].zone_id is None and zone_dict["A1"].node_id_list == []
+
+    res = sync_zone_geometry_and_node(zone_dict, node_dict, mode="inplace")
+    assert res["node_dict"] is node_dict and res["zone_dict"] is zone_dict
+    assert node_dict[10].zone_id == 1 and zone_dict["A1"].node_id_list == [10]
+
+    # a column-backed table is copied only in the zone_id column
+    node_table = NodeTable(pd.DataFrame({"id": [10, 12], "x_coord": [1.5, 5.0], "y_coord": [0.5, 5.0],
+                                         "zone_id": [None] * 2}))
+    res = sync_zone_geometry_and_node(_gen_zone_dict(), node_table)
+    assert res["node_dict"][10].zone_id == 1 and node_table[10].zone_id is None
+    assert res["node_dict"].column("x_coord") is node_table.column("x_coord")
+
+
+def test_sync_zone_lattice_matches_geometry():
+    # Test case for grid-cell assignment by coordinates against point-in-polygon tests
+    rng = np.random.default_rng(0)
+    node_dict = {i: Node(id=i, x_coord=x, y_coord=y)
+                 for i, (x, y) in enumerate(zip(rng.uniform(-112, -111.9, 500), rng.uniform(33.4, 33.5, 500)))}
+
+    res = net2zone(node_dict, num_x_blocks=7, num_y_blocks=5, return_lattice=True)
+    zone_dict = {name: zone for name, zone in res["zone_dict"].items() if "gate" not in name}
+
+    res_lattice = sync_zone_lattice_and_node(zone_dict, node_dict, res["lattice"])
+    res_geometry = sync_zone_geometry_and_node(zone_dict, node_dict)
+
+    for name in zone_dict:
+        assert res_lattice["zone_dict"][name].node_id_list == res_geometry["zone_dict"][name].node_id_list
+    assert sum(len(zone.node_id_list) for zone in res_lattice["zone_dict"].values()) == len(node_dict)
+
+    # points on inner cell edges go to the east / north cell, points outside the lattice to no cell
+    lattice = res["lattice"]
+    zone_pos = lattice.locate([lattice.x_edges[1], lattice.x_edges[0] - 1], [lattice.y_edges[0], lattice.y_edges[0]])
+    zone = zone_dict[lattice.zone_names[zone_pos[0]]]
+    assert zone.x_min == lattice.x_edges[1] and zone.y_min == lattice.y_edges[0]
+    assert zone_pos[1] == -1
+
+
+def test_sync_zone_centroid_and_node():
+    # Test case for nearest-centroid assignment with a distance cutoff and k-nearest output
+    zone_dict = {"Z1": Zone(id=1, name="Z1", x_coord=-112.0, y_coord=33.4),
+                 "Z2": Zone(id=2, name="Z2", x_coord=-111.9, y_coord=33.4)}
+    node_dict = {10: Node(id=10, x_coord=-111.91, y_coord=33.4),
+                 11: Node(id=11, x_coord=-111.99, y_coord=33.41),
+                 12: Node(id=12, x_coord=-111.0, y_coord=33.4)}
+
+    res = sync_zone_centroid_and_node(zone_dict, node_dict)
+    assert res["zone_dict"]["Z1"].node_id_list == [11]
+    assert res["zone_dict"]["Z2"].node_id_list == [10, 12]
+
+    # node 12 is ~84 km away from Z2
+    res = sync_zone_centroid_and_node(zone_dict, node_dict, max_distance_km=50, k_nearest=2)
+    assert res["zone_dict"]["Z2"].node_id_list == [10]
+    assert res["node_dict"][12].zone_id is None
+
+    df_nearest = res["k_nearest_zone"]
+    assert df_nearest["id"].tolist() == [10, 10, 11, 11, 12, 12]
+    assert df_nearest["zone_name"].tolist()[:2] == ["Z2", "Z1"]
+    assert df_nearest.loc[4, "dist_km"] == pytest.approx(83.5, abs=0.5)
+
+
+def test_calc_zone_od_matrix():
+    # Test case for the vectorized zone-to-zone distance matrix and the legacy dict format
+    zone_dict = {"Z1": Zone(id=1, name="Z1", x_coord=-112.0, y_coord=33.4),
+                 "Z2": Zone(id=2, name="Z2", x_coord=-111.9, y_coord=33.5),
+                 "Z3": Zone(id=3, name="Z3", x_coord=-111.5, y_coord=33.0)}
+
+    od_matrix = calc_zone_od_matrix(zone_dict, chunk_size=2)
+    assert od_matrix.dist_km.shape == (3, 3)
+    assert np.allclose(np.diag(od_matrix.dist_km), 0)
+    assert np.allclose(od_matrix.dist_km, od_matrix.dist_km.T)
+    assert od_matrix.dist_km[0, 1] == pytest.approx(
+        calc_distance_on_unit_sphere((-112.0, 33.4), (-111.9, 33.5), unit="km"))
+
+    od_dict = calc_zone_od_matrix(zone_dict, return_dict=True)
+    assert list(od_dict)[:2] == [("Z1", "Z1"), ("Z1", "Z2")]
+    assert od_dict[("Z1", "Z3")]["dist_km"] == pytest.approx(od_matrix.dist_km[0, 2])
+    assert od_dict[("Z1", "Z3")]["geometry"].equals(shapely.LineString([(-112.0, 33.4), (-111.5, 33.0)]))
+
+    # o-d lines are built on request only, for the given pairs
+    assert "geometry" not in od_matrix.to_dataframe().columns
+    lines = gen_od_geometry(od_matrix, ["Z1", "Z2", "Z9"], ["Z3", "Z2", "Z1"], wkt=True)
+    assert lines[0] == "LINESTRING (-112 33.4, -111.5 33)" and lines[2] is None
@@ -0,0 +1,71 @@
+# -*- coding:utf-8 -*-
+##############################################################
+# Created Date: Saturday, October 17th 2026
+# Contact Info: luoxiangyong01@gmail.com
+# Author/Copyright: Mr. Xiangyong Luo
+##############################################################
+
+
+import numpy as np
+import pandas as pd
+import pytest
+from grid2demand.func_lib.gen_zone import calc_zone_od_matrix
+from grid2demand.func_lib.gravity_calibration import calc_trip_length_distribution, calibrate_gravity_model
+from grid2demand.func_lib.gravity_model import run_gravity_model
+from grid2demand.utils_lib.net_utils import Zone
+from grid2demand.utils_lib.pkg_settings import pkg_settings
+
+
+def _gen_zone_dict(num_zone: int = 40) -> dict:
+    rng = np.random.default_rng(0)
+    return {f"Z{i}": Zone(id=i, name=f"Z{i}", x_coord=rng.uniform(-112.2, -111.8), y_coord=rng.uniform(33.2, 33.6),
+                          production=rng.uniform(10, 100), attraction=rng.uniform(10, 100))
+            for i in range(num_zone)}
+
+
+def test_calibrate_gravity_model_tlfd():
+    # Test case for recovering beta and gamma from the trip length distribution of a known gravity model
+    zone_dict = _gen_zone_dict()
+    od_matrix = calc_zone_od_matrix(zone_dict)
+    expected = run_gravity_model(zone_dict, od_matrix, trip_purpose=0, alpha=1, beta=-0.8, gamma=-0.15)
+    target_tlfd = calc_trip_length_distribution(expected, [0, 2, 4, 6, 8, 10, 15, 20, 30, 60])
+
+    # sparse matrix, same pairs
+    for od_dist_matrix in [od_matrix, calc_zone_od_matrix(zone_dict, sparse=True)]:
+        result = calibrate_gravity_model(zone_dict, od_dist_matrix, target_tlfd=target_tlfd, update_settings=False)
+
+        assert result["converged"]
+        assert result["beta"] == pytest.approx(-0.8, abs=1e-5)
+        assert result["gamma"] == pytest.approx(-0.15, abs=1e-5)
+        assert np.allclose(result["tlfd"]["model_share"], target_tlfd["share"], atol=1e-8)
+
+
+def test_calibrate_gravity_model_od_counts():
+    # Test case for fitting observed OD counts within bounds, and writing the parameters into pkg_settings
+    zone_dict = _gen_zone_dict()
+    od_matrix = calc_zone_od_matrix(zone_dict)
+    expected = run_gravity_model(zone_dict, od_matrix, trip_purpose=0, alpha=1, beta=-1.2, gamma=-0.05)
+
+    rng = np.random.default_rng(1)
+    o_idx, d_idx = rng.integers(0, 40, 200), rng.integers(0, 40, 200)
+    od_counts = pd.DataFrame({"o_zone_name": od_matrix.zone_name[o_idx],
+                              "d_zone_name": od_matrix.zone_name[d_idx],
+                              "volume": expected.volume[o_idx, d_idx]})
+
+    params_origin = dict(pkg_settings["trip_purpose_dict"][2])
+    try:
+        result = calibrate_gravity_model(zone_dict, od_matrix, od_counts=od_counts, trip_purpose=2)
+        assert result["beta"] == pytest.approx(-1.2, abs=1e-5)
+        assert result["gamma"] == pytest.approx(-0.05, abs=1e-5)
+        assert pkg_settings["trip_purpose_dict"][2]["beta"] == result["beta"]
+        assert pkg_settings["trip_purpose_dict"][2]["alpha"] == params_origin["alpha"]
+
+        # the optimum is outside the bounds of gamma
+        result = calibrate_gravity_model(zone_dict, od_matrix, od_counts=od_counts, trip_purpose=2,
+                                         gamma_bounds=(-1.0, -0.1), update_settings=False)
+        assert result["gamma"] == pytest.approx(-0.1)
+    finally:
+        pkg_settings["trip_purpose_dict"][2] = params_origin
+
+    with pytest.raises(ValueError):
+        calibrate_gravity_model(zone_dict, od_matrix)
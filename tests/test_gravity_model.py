@@ -0,0 +1,179 @@
+# -*- coding:utf-8 -*-
+##############################################################
+# Created Date: Saturday, October 17th 2026
+# Contact Info: luoxiangyong01@gmail.com
+# Author/Copyright: Mr. Xiangyong Luo
+##############################################################
+
+
+import copy
+
+import numpy as np
+import pytest
+from grid2demand.func_lib.gen_zone import calc_zone_od_matrix
+from grid2demand.func_lib.gravity_model import (balance_furness, calc_gravity_volume,
+                                                calc_zone_production_attraction,
+                                                calc_zone_production_attraction_matrix, run_gravity_model,
+                                                run_gravity_model_multi_purpose, run_gravity_sweep)
+from grid2demand.func_lib.trip_rate_production_attraction import gen_node_prod_attr, gen_poi_trip_rate
+from grid2demand.utils_lib.net_utils import POI, SparseODMatrix, Zone
+from grid2demand.utils_lib.pkg_settings import pkg_settings
+from grid2demand.utils_lib.utils import create_dataclass_from_dict
+
+
+def _gen_zone_dict() -> dict:
+    return {"Z1": Zone(id=1, name="Z1", x_coord=-112.0, y_coord=33.4, production=100, attraction=50),
+            "Z2": Zone(id=2, name="Z2", x_coord=-111.9, y_coord=33.5, production=0, attraction=80),
+            "Z3": Zone(id=3, name="Z3", x_coord=-111.5, y_coord=33.0, production=40, attraction=0)}
+
+
+def test_calc_gravity_volume():
+    # Test case for the matrix gravity model against the pair-by-pair formula
+    production = np.array([100.0, 0, 40])
+    attraction = np.array([50.0, 80, 0])
+    dist_km = np.array([[0, 10, 30], [10, 0, 20], [30, 20, 0]], dtype=float)
+
+    volume = calc_gravity_volume(production, attraction, dist_km, 28507, -0.02, -0.123)
+
+    dist_nonzero = np.where(dist_km > 0, dist_km, 1)
+    friction = np.where(dist_km > 0, 28507 * dist_nonzero ** -0.02 * np.exp(-0.123 * dist_nonzero), 0)
+    expected = production[:, None] * attraction * friction / (friction * attraction).sum(axis=1)[:, None]
+
+    assert np.allclose(volume, expected)
+    assert np.allclose(np.diag(volume), 0)
+    assert np.allclose(volume.sum(axis=1), production)
+
+
+def test_run_gravity_model_dict_matches_matrix():
+    # Test case for the dict adapter of run_gravity_model
+    zone_dict = _gen_zone_dict()
+    od_matrix = run_gravity_model(zone_dict, calc_zone_od_matrix(zone_dict))
+    od_dict = run_gravity_model(zone_dict, calc_zone_od_matrix(zone_dict, return_dict=True))
+
+    for (o_name, d_name), od in od_dict.items():
+        i, j = od_matrix.zone_index[o_name], od_matrix.zone_index[d_name]
+        assert od["volume"] == pytest.approx(od_matrix.volume[i, j])
+    assert od_dict[("Z1", "Z2")]["volume"] > 0 and od_dict[("Z1", "Z1")]["volume"] == 0
+
+
+def test_balance_furness():
+    # Test case for doubly-constrained balancing of row and column totals
+    rng = np.random.default_rng(0)
+    seed = rng.uniform(0.1, 1, (30, 30))
+    np.fill_diagonal(seed, 0)
+    production = rng.uniform(10, 100, 30)
+    attraction = rng.uniform(10, 100, 30)
+
+    volume, telemetry = balance_furness(seed, production, attraction, tol=1e-9, max_iter=500)
+
+    assert telemetry["converged"] and telemetry["iterations"] == len(telemetry["error_history"])
+    assert np.allclose(volume.sum(axis=1), production, rtol=1e-6)
+    assert np.allclose(volume.sum(axis=0), attraction * production.sum() / attraction.sum(), rtol=1e-6)
+    assert np.allclose(np.diag(volume), 0)
+
+
+def test_run_gravity_model_doubly_constrained():
+    # Test case for doubly-constrained gravity model, attractions are scaled to the production total
+    zone_dict = _gen_zone_dict()
+    zone_dict["Z2"].production = 60
+    zone_dict["Z3"].attraction = 30
+    od_matrix, telemetry = run_gravity_model(zone_dict, calc_zone_od_matrix(zone_dict),
+                                             doubly_constrained=True, return_telemetry=True)
+
+    assert telemetry["converged"]
+    assert np.allclose(od_matrix.volume.sum(axis=1), [100, 60, 40], rtol=1e-5)
+    assert np.allclose(od_matrix.volume.sum(axis=0), np.array([50, 80, 30]) * 200 / 160, rtol=1e-5)
+
+
+def test_run_gravity_model_sparse_matches_dense():
+    # Test case for the sparse OD store against the dense matrix, with a distance cutoff and a volume threshold
+    zone_dict = _gen_zone_dict()
+    zone_dict["Z2"].production = 60
+    zone_dict["Z3"].attraction = 30
+
+    for doubly_constrained in [False, True]:
+        od_dense = run_gravity_model(zone_dict, calc_zone_od_matrix(zone_dict), doubly_constrained=doubly_constrained)
+        od_sparse = run_gravity_model(zone_dict, calc_zone_od_matrix(zone_dict, sparse=True),
+                                      doubly_constrained=doubly_constrained)
+
+        # zero-volume pairs (the diagonal) are dropped
+        assert od_sparse.nnz == 6
+        assert np.allclose(od_sparse.to_dense().volume, od_dense.volume)
+
+    # Z3 is ~60 km from Z1 and Z2, the cutoff leaves Z3 without destinations
+    od_sparse = run_gravity_model(zone_dict, calc_zone_od_matrix(zone_dict, max_dist_km=30))
+    assert sorted(zip(od_sparse.zone_name[od_sparse.o_idx], od_sparse.zone_name[od_sparse.d_idx])) == \
+        [("Z1", "Z2"), ("Z2", "Z1")]
+
+    od_sparse = run_gravity_model(zone_dict, calc_zone_od_matrix(zone_dict, sparse=True), volume_threshold=40)
+    assert (od_sparse.volume >= 40).all() and od_sparse.nnz < 6
+
+
+def test_run_gravity_sweep():
+    # Test case for a grid of gravity parameters against run_gravity_model per scenario
+    zone_dict = _gen_zone_dict()
+    zone_dict["Z2"].production = 60
+    zone_dict["Z3"].attraction = 30
+    params = [(28507, beta, gamma) for beta in [-0.5, -0.02] for gamma in [-0.2, -0.123]]
+
+    for od_matrix in [calc_zone_od_matrix(zone_dict), calc_zone_od_matrix(zone_dict, sparse=True)]:
+        for doubly_constrained in [False, True]:
+            df_summary, volume = run_gravity_sweep(zone_dict, od_matrix, params, return_volume=True,
+                                                   doubly_constrained=doubly_constrained, cpu_cores=2, chunk_size=1)
+
+            for k, (alpha, beta, gamma) in enumerate(params):
+                # trip purpose 0 is not in trip_purpose_dict, so the given parameters are used
+                expected = run_gravity_model(zone_dict, calc_zone_od_matrix(zone_dict), trip_purpose=0,
+                                             alpha=alpha, beta=beta, gamma=gamma,
+                                             doubly_constrained=doubly_constrained).volume
+                if isinstance(od_matrix, SparseODMatrix):
+                    assert np.allclose(volume[k], expected[od_matrix.o_idx, od_matrix.d_idx])
+                else:
+                    assert np.allclose(volume[k], expected)
+                assert df_summary["total_volume"][k] == pytest.approx(expected.sum())
+
+    assert df_summary["converged"].all() and (df_summary["mean_dist_km"] > 0).all()
+
+
+def test_run_gravity_model_multi_purpose():
+    # Test case for all trip purposes in one pass against the single-purpose steps run for each purpose
+    node_dict = {node_id: create_dataclass_from_dict("Node", {"id": node_id, "activity_type": activity_type,
+                                                              "poi_id": poi_id, "_zone_id": -1,
+                                                              "production": 0, "attraction": 0})
+                 for node_id, activity_type, poi_id in [(1, "residential", -1), (2, "poi", 11), (3, "primary", -1),
+                                                        (4, "boundary", -1), (5, "poi", 99), (6, "poi", 12)]}
+    poi_dict = {11: POI(id=11, building="office", area=5000.0), 12: POI(id=12, building="cafe", area=800.0),
+                13: POI(id=13, building="unknown", area=1200.0)}
+    zone_dict = _gen_zone_dict()
+    for zone_name, node_id_list, poi_id_list in [("Z1", [1, 2], [11]), ("Z2", [3, 4, 7], [12, 13]),
+                                                 ("Z3", [5, 6], [])]:
+        zone_dict[zone_name].node_id_list, zone_dict[zone_name].poi_id_list = node_id_list, poi_id_list
+        zone_dict[zone_name].production = zone_dict[zone_name].attraction = 0
+
+    prod_origin, attr_origin = pkg_settings["poi_purpose_prod_dict"], pkg_settings["poi_purpose_attr_dict"]
+    try:
+        pkg_settings["poi_purpose_prod_dict"] = {"office": {1: 2.04, 2: 1.5, 3: 0.7}}
+        pkg_settings["poi_purpose_attr_dict"] = {"cafe": {1: 36.31, 2: 20.0, 3: 12.0}}
+
+        zone_prod_attr = calc_zone_production_attraction_matrix(node_dict, poi_dict, zone_dict)
+        for od_matrix in [calc_zone_od_matrix(zone_dict), calc_zone_od_matrix(zone_dict, sparse=True)]:
+            df_demand = run_gravity_model_multi_purpose(zone_prod_attr, od_matrix, volume_threshold=0)
+
+            for k, trip_purpose in enumerate([1, 2, 3]):
+                nodes, pois, zones = copy.deepcopy(node_dict), copy.deepcopy(poi_dict), copy.deepcopy(zone_dict)
+                gen_poi_trip_rate(pois, trip_purpose=trip_purpose)
+                gen_node_prod_attr(nodes, pois)
+                calc_zone_production_attraction(nodes, pois, zones)
+                assert np.allclose(zone_prod_attr["production"][:, k], [zone.production for zone in zones.values()])
+                assert np.allclose(zone_prod_attr["attraction"][:, k], [zone.attraction for zone in zones.values()])
+
+                expected = run_gravity_model(zones, copy.deepcopy(od_matrix), trip_purpose=trip_purpose,
+                                             volume_threshold=0).to_dataframe()
+                df_purpose = df_demand[df_demand["trip_purpose"] == trip_purpose]
+                assert np.allclose(df_purpose["volume"], expected["volume"])
+                assert (df_purpose["o_zone_name"].to_numpy() == expected["o_zone_name"].to_numpy()).all()
+    finally:
+        pkg_settings["poi_purpose_prod_dict"], pkg_settings["poi_purpose_attr_dict"] = prod_origin, attr_origin
+
+    with pytest.raises(ValueError):
+        run_gravity_model_multi_purpose({**zone_prod_attr, "trip_purposes": [1, 2, 4]}, calc_zone_od_matrix(zone_dict))
@@ -0,0 +1,55 @@
+# -*- coding:utf-8 -*-
+##############################################################
+# Created Date: Saturday, October 17th 2026
+# Contact Info: luoxiangyong01@gmail.com
+# Author/Copyright: Mr. Xiangyong Luo
+##############################################################
+
+
+import numpy as np
+import pandas as pd
+import pytest
+from grid2demand.func_lib.network_impedance import calc_zone_od_network_matrix
+from grid2demand.func_lib.read_node_poi import read_link
+from grid2demand.utils_lib.net_utils import Node, Zone
+
+
+def _gen_network() -> tuple:
+    # nodes on the equator, 0.01 degree (~1.11 km) apart, Z1 is centered on node 2 with node 1 as member
+    node_dict = {i: Node(id=i, x_coord=0.01 * i, y_coord=0.0) for i in range(1, 6)}
+    zone_dict = {"Z1": Zone(id=1, name="Z1", x_coord=0.02, y_coord=0.0, node_id_list=[1]),
+                 "Z2": Zone(id=2, name="Z2", x_coord=0.04, y_coord=0.0, node_id_list=[4]),
+                 "Z3": Zone(id=3, name="Z3", x_coord=0.05, y_coord=0.0, node_id_list=[5])}
+    return node_dict, zone_dict
+
+
+def test_read_link(tmp_path):
+    # Test case for reading directed and two-way links
+    link_file = tmp_path / "link.csv"
+    link_file.write_text("link_id,from_node_id,to_node_id,directed,length,free_speed\n"
+                         "0,1,2,1,1000,60\n1,2,3,0,2000,\n")
+
+    df_link = read_link(link_file)
+
+    assert list(zip(df_link["from_node_id"], df_link["to_node_id"])) == [(1, 2), (2, 3), (3, 2)]
+    assert df_link["free_speed"].tolist() == [60, 30, 30]
+
+
+def test_calc_zone_od_network_matrix():
+    # Test case for multi-source shortest paths from zone connectors
+    node_dict, zone_dict = _gen_network()
+    df_link = pd.DataFrame({"from_node_id": [1, 2, 3, 4], "to_node_id": [2, 3, 4, 3],
+                            "length": [1000.0, 1000.0, 1000.0, 1000.0], "free_speed": [60.0] * 4})
+
+    od_matrix = calc_zone_od_network_matrix(zone_dict, node_dict, df_link)
+    dist_km = od_matrix.dist_km
+
+    # Z1 -> Z2: connector to node 1 (~1.11 km) and 3 links, Z2 -> Z1 has no path, Z3 is not connected
+    assert dist_km[0, 1] == pytest.approx(1.11195 + 3, abs=1e-3)
+    assert np.isnan(dist_km[1, 0]) and np.isnan(dist_km[0, 2]) and (np.diag(dist_km) == 0).all()
+
+    od_matrix = calc_zone_od_network_matrix(zone_dict, node_dict, df_link, impedance="network_time", sparse=True)
+    # pairs with a path: the diagonal and Z1 -> Z2, connectors at 30 km/h, links at 60 km/h (minutes)
+    assert od_matrix.nnz == 4
+    pair = (od_matrix.o_idx == 0) & (od_matrix.d_idx == 1)
+    assert od_matrix.dist_km[pair][0] == pytest.approx(1.11195 * 2 + 3, abs=1e-3)
@@ -0,0 +1,53 @@
+# -*- coding:utf-8 -*-
+##############################################################
+# Created Date: Saturday, October 17th 2026
+# Contact Info: luoxiangyong01@gmail.com
+# Author/Copyright: Mr. Xiangyong Luo
+##############################################################
+
+
+import os
+
+import numpy as np
+from grid2demand.utils_lib.parallel import gen_index_chunks, parallel_map
+
+
+def _sum_index_range(shared: dict, start: int, end: int) -> tuple:
+    return os.getpid(), shared["values"][start:end].sum()
+
+
+def test_gen_index_chunks():
+    # Test case for index ranges capped by chunk size and the number of processes
+    assert gen_index_chunks(10, chunk_size=4) == [(0, 4), (4, 8), (8, 10)]
+    assert gen_index_chunks(10, chunk_size=100, cpu_cores=3) == [(0, 4), (4, 8), (8, 10)]
+    assert gen_index_chunks(0, chunk_size=4) == []
+
+
+def test_parallel_map():
+    # Test case for results in order of index ranges, serial in the current process and in a pool
+    values = np.arange(100)
+    expected = [values[i:i + 10].sum() for i in range(0, 100, 10)]
+
+    serial = parallel_map(_sum_index_range, {"values": values}, len(values), cpu_cores=1, chunk_size=10)
+    assert [total for _, total in serial] == expected
+    assert {pid for pid, _ in serial} == {os.getpid()}
+
+    pooled = parallel_map(_sum_index_range, {"values": values}, len(values), cpu_cores=2, chunk_size=10)
+    assert [total for _, total in pooled] == expected
+    assert os.getpid() not in {pid for pid, _ in pooled}
+
+
+def _square_index_range(shared: dict, start: int, end: int) -> None:
+    shared["out"][start:end] = shared["values"][start:end] ** 2
+
+
+def test_parallel_map_shared_out():
+    # Test case for tasks writing their index ranges of a shared output array
+    values = np.arange(100, dtype=np.float64)
+
+    for cpu_cores in [1, 2]:
+        out = np.zeros(100)
+        results = parallel_map(_square_index_range, {"values": values}, len(values),
+                               cpu_cores=cpu_cores, chunk_size=10, out=out)
+        assert results == [None] * 10
+        assert np.array_equal(out, values ** 2)
@@ -6,6 +6,9 @@
 ##############################################################
 
 
+import shutil
+from pathlib import Path
+
 import pytest
 from grid2demand.func_lib.read_node_poi import read_node
 
@@ -14,3 +17,43 @@ def test_read_node_non_existing_file():
     # Test case for a non-existing node file
     with pytest.raises(FileNotFoundError):
         read_node(node_file="path/to/non_existing_node_file.csv")
+
+
+def test_read_node_columnar_matches_records():
+    # Test case for the column-backed node table against per-node records
+    node_file = Path(__file__).parent.parent / "datasets/demand_from_grid/ASU/auto/node.csv"
+    node_dict = read_node(node_file=str(node_file), use_cache=False)
+    node_table = read_node(node_file=str(node_file), columnar=True, use_cache=False)
+
+    assert list(node_table) == list(node_dict)
+    for node_id in list(node_dict)[:50]:
+        for key in ["x_coord", "y_coord", "_zone_id", "activity_type"]:
+            assert node_table[node_id][key] == node_dict[node_id][key]
+        assert node_table[node_id].geometry.equals(node_dict[node_id].geometry)
+
+    # writes through the lazy view go to the columns
+    node_id = list(node_table)[0]
+    node_table[node_id]["production"] = 10.5
+    assert node_table.column("production")[0] == 10.5
+
+
+def test_read_node_cache_matches_csv(tmp_path, capsys):
+    # Test case for loading node.csv from the parsed table cache
+    pytest.importorskip("pyarrow")
+    node_file = tmp_path / "node.csv"
+    shutil.copy(Path(__file__).parent.parent / "datasets/demand_from_grid/ASU/auto/node.csv", node_file)
+
+    node_table = read_node(node_file=str(node_file), columnar=True, use_cache=False)
+    read_node(node_file=str(node_file), columnar=True)
+    assert len(list((tmp_path / ".grid2demand_cache").glob("node_node_*.feather"))) == 1
+
+    node_table_cached = read_node(node_file=str(node_file), columnar=True, verbose=True)
+    assert "Loaded parsed node table from cache" in capsys.readouterr().out
+    assert node_table_cached.to_dataframe().drop(columns="geometry").equals(
+        node_table.to_dataframe().drop(columns="geometry"))
+
+    # a changed node.csv replaces the outdated cache file
+    with open(node_file, "a") as f:
+        f.write("\n")
+    read_node(node_file=str(node_file), columnar=True)
+    assert len(list((tmp_path / ".grid2demand_cache").glob("node_node_*.feather"))) == 1
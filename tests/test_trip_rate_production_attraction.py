@@ -0,0 +1,103 @@
+# -*- coding:utf-8 -*-
+##############################################################
+# Created Date: Saturday, October 17th 2026
+# Contact Info: luoxiangyong01@gmail.com
+# Author/Copyright: Mr. Xiangyong Luo
+##############################################################
+
+
+import os
+import tempfile
+
+import numpy as np
+import pandas as pd
+import pytest
+from grid2demand.func_lib.trip_rate_production_attraction import gen_node_prod_attr, gen_poi_trip_rate
+from grid2demand.utils_lib.net_utils import POI, NodeTable
+from grid2demand.utils_lib.utils import create_dataclass_from_dict
+
+
+def _gen_poi_dict() -> dict:
+    return {poi_id: POI(id=poi_id, building=building, area=1000.0)
+            for poi_id, building in enumerate(["office", "cafe", "yes", "unknown", "office", np.nan])}
+
+
+def test_gen_poi_trip_rate_default():
+    # Test case for the default trip rate: listed buildings get their rate, others 0.1
+    poi_dict = gen_poi_trip_rate(_gen_poi_dict())
+
+    assert poi_dict[0].trip_rate == {"building": "office", "unit_of_measure": '1,000 Sq. Ft. GFA',
+                                     "trip_purpose": 1, "production_rate1": 2.04, "attraction_rate1": 0.1,
+                                     "production_notes": 1, "attraction_notes": 0}
+    assert poi_dict[2].trip_rate["production_rate1"] == 1.15 and poi_dict[2].trip_rate["attraction_rate1"] == 1.15
+    assert poi_dict[3].trip_rate["production_rate1"] == 0.1 and poi_dict[3].trip_rate["production_notes"] == 0
+    assert poi_dict[5].trip_rate["attraction_rate1"] == 0.1
+
+    # each POI has its own trip rate dict
+    poi_dict[0].trip_rate["production_rate1"] = 0
+    assert poi_dict[4].trip_rate["production_rate1"] == 2.04
+
+
+def test_gen_poi_trip_rate_file_and_columnar():
+    # Test case for the trip rate file and the columnar trip rate arrays
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        trip_rate_file = os.path.join(tmp_dir, "trip_rate.csv")
+        pd.DataFrame({"building": ["office", "cafe", "office"], "trip_purpose": 1,
+                      "production_rate1": [1.0, 2.0, 3.0], "attraction_rate1": [4.0, 5.0, 6.0]}
+                     ).to_csv(trip_rate_file, index=False)
+
+        poi_dict = gen_poi_trip_rate(_gen_poi_dict(), trip_rate_file)
+        poi_trip_rate = gen_poi_trip_rate(_gen_poi_dict(), trip_rate_file, columnar=True)
+
+        # the last row of a building is used, buildings not in the file get no trip rate
+        assert poi_dict[0].trip_rate == {"building": "office", "trip_purpose": 1,
+                                         "production_rate1": 3.0, "attraction_rate1": 6.0}
+        assert poi_dict[1].trip_rate["production_rate1"] == 2.0 and poi_dict[2].trip_rate == {}
+
+        assert poi_trip_rate["poi_id"].tolist() == list(range(6))
+        assert np.allclose(poi_trip_rate["production_rate"], [3, 2, 0, 0, 3, 0])
+        assert np.allclose(poi_trip_rate["attraction_rate"], [6, 5, 0, 0, 6, 0])
+
+        with pytest.raises(ValueError):
+            gen_poi_trip_rate(_gen_poi_dict(), trip_rate_file, trip_purpose=2, columnar=True)
+
+    poi_trip_rate = gen_poi_trip_rate(_gen_poi_dict(), columnar=True)
+    assert np.allclose(poi_trip_rate["production_rate"], [2.04, 0.1, 1.15, 0.1, 2.04, 0.1])
+    assert np.allclose(poi_trip_rate["attraction_rate"], [0.1, 36.31, 1.15, 0.1, 0.1, 0.1])
+
+
+def _gen_df_node() -> pd.DataFrame:
+    # poi node 6 has a POI without trip rate, poi node 7 has no POI, node 8 is in a zone of node.csv
+    return pd.DataFrame({"id": range(1, 9),
+                         "activity_type": ["residential", "boundary", "poi", "poi", "poi", "poi", "poi", ""],
+                         "poi_id": [-1, -1, 0, 1, 4, 2, 99, -1],
+                         "_zone_id": [-1, -1, -1, -1, -1, -1, -1, 3],
+                         "production": 7.0, "attraction": 7.0})
+
+
+def test_gen_node_prod_attr():
+    # Test case for node production and attraction of node records and the NodeTable
+    poi_dict = gen_poi_trip_rate(_gen_poi_dict())
+    poi_dict[2].trip_rate = {}
+
+    df_node = _gen_df_node()
+    node_dict = {row["id"]: create_dataclass_from_dict("Node", row) for row in df_node.to_dict("records")}
+    node_table = NodeTable(df_node)
+
+    expected_production = [10, 1000, 2.04, 0.1, 2.04, 7, 7, 1000]
+    expected_attraction = [10, 1000, 0.1, 36.31, 0.1, 7, 7, 1000]
+    node_dict = gen_node_prod_attr(node_dict, poi_dict)
+    assert np.allclose([node.production for node in node_dict.values()], expected_production)
+    assert np.allclose([node.attraction for node in node_dict.values()], expected_attraction)
+
+    gen_node_prod_attr(node_table, poi_dict)
+    assert np.allclose(node_table.column("production"), expected_production)
+    assert np.allclose(node_table.column("attraction"), expected_attraction)
+
+    # the columnar trip rate, other nodes get the default values
+    node_table = NodeTable(_gen_df_node().assign(_zone_id=-1))
+    gen_node_prod_attr(node_table, poi_dict, residential_production=5, boundary_attraction=500,
+                       default_production=20, default_attraction=30,
+                       poi_trip_rate=gen_poi_trip_rate(_gen_poi_dict(), columnar=True))
+    assert np.allclose(node_table.column("production"), [5, 1000, 2.04, 0.1, 2.04, 1.15, 7, 20])
+    assert np.allclose(node_table.column("attraction"), [10, 500, 0.1, 36.31, 0.1, 1.15, 7, 30])